@@ -2,7 +2,7 @@ import uuid
 import logging
 import httpx
 from fastapi import FastAPI, Depends, status, Request, Query, HTTPException
-from fastapi.responses import Response, RedirectResponse, JSONResponse
+from fastapi.responses import Response, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update
@@ -1008,7 +1008,8 @@ async def proxy_request(
     request: Request,
     service_url: str,
     path: str,
-    current_user: UserModel
+    current_user: UserModel,
+    timeout: float = 30.0
 ):
     """
     Fonction générique pour faire du reverse proxy vers les services backend.
@@ -1026,7 +1027,8 @@ async def proxy_request(
             "User-Agent": "API-Gateway-Proxy/1.0",
             "X-User-ID": str(current_user.id),  # Transmettre l'ID de l'utilisateur connecté
             "X-User-Email": current_user.email,  # Optionnel : email pour debug
-            "X-User-Role": current_user.role  # Transmettre le rôle pour l'autorisation
+            "X-User-Role": current_user.role,  # Transmettre le rôle pour l'autorisation
+            "X-User-Credits": str(current_user.credits)  # Niveau de priorité de l'ordonnanceur du ml-pipeline
         }
         
         # Ne pas forcer Content-Type pour les uploads multipart
@@ -1068,7 +1070,7 @@ async def proxy_request(
                 body = await request.body()
         
         # Faire la requête vers le service backend
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with httpx.AsyncClient(timeout=timeout) as client:
             if files:
                 # Pour les uploads de fichiers
                 response = await client.request(
@@ -1155,6 +1157,79 @@ async def dataset_similar_proxy(dataset_id: str, request: Request, current_user:
     """Proxy vers le service-selection pour récupérer les datasets similaires"""
     return await proxy_request(request, settings.SERVICE_SELECTION_URL, f"datasets/{dataset_id}/similar", current_user)
 
+# Fonction helper pour les uploads par morceaux : le body est relayé en flux
+async def proxy_stream_request(
+    request: Request,
+    service_url: str,
+    path: str,
+    current_user: UserModel
+):
+    """
+    Reverse proxy en streaming pour les corps binaires volumineux.
+    Contrairement à proxy_request, le body n'est jamais parsé ni bufferisé
+    par la gateway : il est transmis au service backend au fil de l'eau.
+    """
+    try:
+        target_url = f"{service_url.rstrip('/')}/{path.lstrip('/')}"
+        
+        headers = {
+            "User-Agent": "API-Gateway-Proxy/1.0",
+            "X-User-ID": str(current_user.id),
+            "X-User-Email": current_user.email,
+            "X-User-Role": current_user.role,
+            "Content-Type": request.headers.get("content-type", "application/octet-stream")
+        }
+        if request.headers.get("content-length"):
+            headers["Content-Length"] = request.headers["content-length"]
+        
+        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, write=300.0)) as client:
+            response = await client.request(
+                method=request.method,
+                url=target_url,
+                params=dict(request.query_params),
+                headers=headers,
+                content=request.stream()
+            )
+            
+            return JSONResponse(
+                status_code=response.status_code,
+                content=response.json() if response.content else None
+            )
+            
+    except httpx.RequestError as e:
+        logger.error(f"Error streaming request to {service_url}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Service temporairement indisponible"
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error in proxy_stream_request: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur interne du serveur"
+        )
+
+# Routes pour l'upload résumable de datasets (service-selection)
+@app.post("/datasets/uploads", tags=["datasets"])
+async def datasets_upload_init_proxy(request: Request, current_user: UserModel = Depends(current_active_user)):
+    """Proxy vers le service-selection pour initialiser un upload résumable"""
+    return await proxy_request(request, settings.SERVICE_SELECTION_URL, "datasets/uploads", current_user)
+
+@app.api_route("/datasets/uploads/{upload_id}", methods=["GET", "DELETE"], tags=["datasets"])
+async def datasets_upload_detail_proxy(upload_id: str, request: Request, current_user: UserModel = Depends(current_active_user)):
+    """Proxy vers le service-selection pour consulter (reprise) ou annuler un upload résumable"""
+    return await proxy_request(request, settings.SERVICE_SELECTION_URL, f"datasets/uploads/{upload_id}", current_user)
+
+@app.put("/datasets/uploads/{upload_id}/parts/{part_number}", tags=["datasets"])
+async def datasets_upload_part_proxy(upload_id: str, part_number: int, request: Request, current_user: UserModel = Depends(current_active_user)):
+    """Proxy en streaming vers le service-selection pour l'envoi d'un morceau"""
+    return await proxy_stream_request(request, settings.SERVICE_SELECTION_URL, f"datasets/uploads/{upload_id}/parts/{part_number}", current_user)
+
+@app.post("/datasets/uploads/{upload_id}/complete", tags=["datasets"])
+async def datasets_upload_complete_proxy(upload_id: str, request: Request, current_user: UserModel = Depends(current_active_user)):
+    """Proxy vers le service-selection pour finaliser un upload résumable (assemblage + ingestion)"""
+    return await proxy_request(request, settings.SERVICE_SELECTION_URL, f"datasets/uploads/{upload_id}/complete", current_user, timeout=600.0)
+
 # Routes pour les projets (service-selection)
 @app.api_route("/projects", methods=["GET", "POST"], tags=["projects"])
 async def projects_proxy(request: Request, current_user: UserModel = Depends(current_active_user)):
@@ -1171,7 +1246,71 @@ async def project_recommendations_proxy(project_id: str, request: Request, curre
     """Proxy vers le service-selection pour récupérer les recommandations d'un projet"""
     return await proxy_request(request, settings.SERVICE_SELECTION_URL, f"projects/{project_id}/recommendations", current_user)
 
+# Fonction helper pour les flux Server-Sent Events (statut des expériences)
+async def proxy_event_stream(
+    request: Request,
+    service_url: str,
+    path: str,
+    current_user: UserModel
+):
+    """
+    Reverse proxy pour les flux Server-Sent Events.
+    La connexion vers le backend reste ouverte sans timeout de lecture et chaque
+    fragment est relayé immédiatement au client.
+    """
+    target_url = f"{service_url.rstrip('/')}/{path.lstrip('/')}"
+    headers = {
+        "User-Agent": "API-Gateway-Proxy/1.0",
+        "X-User-ID": str(current_user.id),
+        "X-User-Email": current_user.email,
+        "X-User-Role": current_user.role,
+        "Accept": "text/event-stream"
+    }
+    
+    client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None))
+    try:
+        upstream = await client.send(
+            client.build_request("GET", target_url, params=dict(request.query_params), headers=headers),
+            stream=True
+        )
+    except httpx.RequestError as e:
+        await client.aclose()
+        logger.error(f"Error opening event stream to {service_url}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Service temporairement indisponible"
+        )
+    
+    if upstream.status_code != 200:
+        # Erreur backend (ex: 404) : la relayer comme une réponse JSON classique
+        content = await upstream.aread()
+        await upstream.aclose()
+        await client.aclose()
+        return Response(content=content, status_code=upstream.status_code, media_type="application/json")
+    
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+            await client.aclose()
+    
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Routes pour ML Pipeline
+@app.get("/api/v1/ml-pipeline/experiments/{experiment_id}/events", tags=["ml-pipeline"])
+async def experiment_events_proxy(experiment_id: str, request: Request, current_user: UserModel = Depends(current_active_user)):
+    """Proxy en streaming vers le ml-pipeline : statut et progression poussés (déclaré avant le proxy générique)"""
+    return await proxy_event_stream(request, settings.ML_PIPELINE_URL, f"experiments/{experiment_id}/events", current_user)
+
+# Endpoints du ml-pipeline réservés aux appels de service à service : jamais exposés aux utilisateurs
+ML_PIPELINE_INTERNAL_PATHS = {"data-quality/precompute", "data-quality/backfill"}
+
 @app.api_route("/api/v1/ml-pipeline/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
 async def proxy_ml_pipeline(
     path: str,
@@ -1179,6 +1318,9 @@ async def proxy_ml_pipeline(
     current_user: UserModel = Depends(current_active_user)
 ):
     """Proxy requests to ML Pipeline service"""
+    normalized_path = "/".join(part for part in path.split("/") if part)
+    if normalized_path in ML_PIPELINE_INTERNAL_PATHS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
     return await proxy_request(request, settings.ML_PIPELINE_URL, path, current_user)
 
 # Route racine simple (optionnel)
@@ -41,6 +41,36 @@ class StorageClient(ABC):
     def list_files(self, prefix: str = "") -> list:
         """List files in storage backend with optional prefix."""
         pass
+    
+    @abstractmethod
+    def get_file_size(self, object_path: str) -> int:
+        """Return the size in bytes of a stored object."""
+        pass
+    
+    @abstractmethod
+    def get_file_etag(self, object_path: str) -> str:
+        """Return the ETag of a stored object (changes whenever its content changes)."""
+        pass
+    
+    @abstractmethod
+    def download_range(self, object_path: str, offset: int, length: int) -> bytes:
+        """Download `length` bytes of an object starting at `offset` (ranged read)."""
+        pass
+    
+    @abstractmethod
+    def upload_part(self, object_path: str, part_number: int, file_data: Union[bytes, BytesIO]) -> str:
+        """Upload one numbered part of a multipart object (resumable uploads)."""
+        pass
+    
+    @abstractmethod
+    def complete_parts(self, object_path: str, part_numbers: list) -> str:
+        """Assemble previously uploaded parts, in order, into the final object."""
+        pass
+    
+    @abstractmethod
+    def abort_parts(self, object_path: str, part_numbers: list) -> None:
+        """Discard the parts of an abandoned multipart upload."""
+        pass
 
 
 class MinIOStorageClient(StorageClient):
@@ -148,6 +178,86 @@ class MinIOStorageClient(StorageClient):
             raise StorageClientError(f"MinIO list error: {str(e)}")
         except Exception as e:
             raise StorageClientError(f"List failed: {str(e)}")
+    
+    def get_file_size(self, object_path: str) -> int:
+        """Return the size of an object in MinIO bucket."""
+        try:
+            return self.client.stat_object(self.container_name, object_path).size
+        except self.S3Error as e:
+            raise StorageClientError(f"MinIO stat error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Stat failed: {str(e)}")
+    
+    def get_file_etag(self, object_path: str) -> str:
+        """Return the ETag of an object in MinIO bucket."""
+        try:
+            return self.client.stat_object(self.container_name, object_path).etag.strip('"')
+        except self.S3Error as e:
+            raise StorageClientError(f"MinIO stat error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Stat failed: {str(e)}")
+    
+    def download_range(self, object_path: str, offset: int, length: int) -> bytes:
+        """Download a byte range of an object from MinIO bucket."""
+        try:
+            response = self.client.get_object(self.container_name, object_path, offset=offset, length=length)
+            data = response.read()
+            response.close()
+            response.release_conn()
+            return data
+        except self.S3Error as e:
+            raise StorageClientError(f"MinIO ranged download error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Ranged download failed: {str(e)}")
+    
+    @staticmethod
+    def _part_object_path(object_path: str, part_number: int) -> str:
+        """Chemin de l'objet temporaire qui contient une partie d'un upload."""
+        return f"{object_path}.parts/{part_number:05d}"
+    
+    def upload_part(self, object_path: str, part_number: int, file_data: Union[bytes, BytesIO]) -> str:
+        """
+        Upload a part as a temporary object next to the final one.
+        
+        Parts are assembled server-side by complete_parts() with compose_object,
+        so every part except the last one must be at least 5 MiB.
+        """
+        return self.upload_file(file_data, self._part_object_path(object_path, part_number))
+    
+    def complete_parts(self, object_path: str, part_numbers: list) -> str:
+        """Compose the parts into the final object without downloading them."""
+        try:
+            from minio.commonconfig import ComposeSource, CopySource
+            
+            part_paths = [self._part_object_path(object_path, n) for n in sorted(part_numbers)]
+            if not part_paths:
+                raise StorageClientError(f"No parts to assemble for {object_path}")
+            
+            if len(part_paths) == 1:
+                # compose_object refuse une source unique < 5 MiB : simple copie côté serveur
+                self.client.copy_object(self.container_name, object_path, CopySource(self.container_name, part_paths[0]))
+            else:
+                sources = [ComposeSource(self.container_name, path) for path in part_paths]
+                self.client.compose_object(self.container_name, object_path, sources)
+            
+            for path in part_paths:
+                self.delete_file(path)
+            
+            storage_path = f"{self.container_name}/{object_path}"
+            logger.info(f"Assembled {len(part_paths)} parts into MinIO object: {storage_path}")
+            return storage_path
+            
+        except StorageClientError:
+            raise
+        except self.S3Error as e:
+            raise StorageClientError(f"MinIO compose error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Compose failed: {str(e)}")
+    
+    def abort_parts(self, object_path: str, part_numbers: list) -> None:
+        """Delete the temporary part objects."""
+        for part_number in part_numbers:
+            self.delete_file(self._part_object_path(object_path, part_number))
 
 
 class AzureBlobStorageClient(StorageClient):
@@ -253,6 +363,99 @@ class AzureBlobStorageClient(StorageClient):
             raise StorageClientError(f"Azure list error: {str(e)}")
         except Exception as e:
             raise StorageClientError(f"List failed: {str(e)}")
+    
+    def get_file_size(self, object_path: str) -> int:
+        """Return the size of a blob in Azure Blob Storage."""
+        try:
+            blob_client = self.client.get_blob_client(
+                container=self.container_name,
+                blob=object_path
+            )
+            return blob_client.get_blob_properties().size
+        except self.AzureError as e:
+            raise StorageClientError(f"Azure stat error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Stat failed: {str(e)}")
+    
+    def get_file_etag(self, object_path: str) -> str:
+        """Return the ETag of a blob in Azure Blob Storage."""
+        try:
+            blob_client = self.client.get_blob_client(
+                container=self.container_name,
+                blob=object_path
+            )
+            return blob_client.get_blob_properties().etag.strip('"')
+        except self.AzureError as e:
+            raise StorageClientError(f"Azure stat error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Stat failed: {str(e)}")
+    
+    def download_range(self, object_path: str, offset: int, length: int) -> bytes:
+        """Download a byte range of a blob from Azure Blob Storage."""
+        try:
+            blob_client = self.client.get_blob_client(
+                container=self.container_name,
+                blob=object_path
+            )
+            return blob_client.download_blob(offset=offset, length=length).readall()
+        except self.AzureError as e:
+            raise StorageClientError(f"Azure ranged download error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Ranged download failed: {str(e)}")
+    
+    @staticmethod
+    def _block_id(part_number: int) -> str:
+        """Azure exige des block ids base64 de longueur identique."""
+        import base64
+        return base64.b64encode(f"{part_number:05d}".encode()).decode()
+    
+    def upload_part(self, object_path: str, part_number: int, file_data: Union[bytes, BytesIO]) -> str:
+        """Stage a part as an uncommitted block of the final blob."""
+        try:
+            blob_client = self.client.get_blob_client(
+                container=self.container_name, 
+                blob=object_path
+            )
+            
+            if isinstance(file_data, BytesIO):
+                file_data.seek(0)
+                data = file_data.read()
+            else:
+                data = file_data
+            
+            blob_client.stage_block(block_id=self._block_id(part_number), data=data)
+            return f"{self.container_name}/{object_path}#{part_number}"
+            
+        except self.AzureError as e:
+            raise StorageClientError(f"Azure stage block error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Stage block failed: {str(e)}")
+    
+    def complete_parts(self, object_path: str, part_numbers: list) -> str:
+        """Commit the staged blocks, in part order, as the final blob."""
+        try:
+            from azure.storage.blob import BlobBlock
+            
+            blob_client = self.client.get_blob_client(
+                container=self.container_name, 
+                blob=object_path
+            )
+            blob_client.commit_block_list(
+                [BlobBlock(block_id=self._block_id(n)) for n in sorted(part_numbers)]
+            )
+            
+            storage_path = f"{self.container_name}/{object_path}"
+            logger.info(f"Committed {len(part_numbers)} blocks into Azure blob: {storage_path}")
+            return storage_path
+            
+        except self.AzureError as e:
+            raise StorageClientError(f"Azure commit block list error: {str(e)}")
+        except Exception as e:
+            raise StorageClientError(f"Commit block list failed: {str(e)}")
+    
+    def abort_parts(self, object_path: str, part_numbers: list) -> None:
+        """Uncommitted blocks are garbage-collected by Azure after 7 days."""
+        logger.info(f"Abandoned {len(part_numbers)} uncommitted blocks for {object_path}")
 
 
 def get_storage_client() -> StorageClient:
@@ -6,8 +6,9 @@ export interface Experiment {
   algorithm: string;
   hyperparameters: Record<string, any>;
   preprocessing_config: Record<string, any>;
-  status: 'pending' | 'running' | 'completed' | 'failed' | 'cancelled';
+  status: 'queued' | 'pending' | 'running' | 'completed' | 'failed' | 'cancelled';
   progress: number;
+  queue_position?: number;  // En attente d'un créneau d'entraînement (statut 'queued')
   metrics?: Record<string, any>;
   model_uri?: string;
   error_message?: string;
@@ -58,6 +59,43 @@ export interface ExperimentCreate {
     column_cleaning_configs?: any[];
     manual_overrides?: Record<string, any>;
   };
+  search_config?: HyperparameterSearchConfig;
+}
+
+export interface HyperparameterSearchConfig {
+  strategy: 'grid' | 'random' | 'halving';
+  // Liste de valeurs, ou intervalle (random / halving)
+  param_space: Record<string, any[] | { low: number; high: number; type?: 'int' | 'float'; log?: boolean }>;
+  n_iter?: number;
+  cv?: number;
+  scoring?: string;
+}
+
+export interface SearchTrial {
+  trial_id: number;
+  params: Record<string, any>;
+  status: 'completed' | 'pruned' | 'failed';
+  fold_scores: number[];
+  mean_score: number | null;
+  std_score: number | null;
+  fit_time: number;
+  n_samples: number;
+  rung?: number;
+  error?: string;
+}
+
+export interface SearchResults {
+  strategy: string;
+  scoring: string;
+  cv: number;
+  best_trial_id: number;
+  best_params: Record<string, any>;
+  best_score: number;
+  n_trials: number;
+  n_pruned: number;
+  n_failed: number;
+  duration: number;
+  trials: SearchTrial[];
 }
 
 export interface ExperimentStatus {
@@ -66,6 +104,7 @@ export interface ExperimentStatus {
   progress: number;
   algorithm: string;  // ⚠️ FIX : Ajouter l'algorithme manquant
   error_message?: string;
+  queue_position?: number;
   created_at: string;
   updated_at?: string;
 }
@@ -76,6 +115,7 @@ export interface ExperimentResults {
   model_uri?: string;
   visualizations: Record<string, string>;
   feature_importance: Record<string, number>;
+  search_results?: SearchResults;
   created_at: string;
   completed_at: string;
   roc_curve?: { fpr: number[]; tpr: number[]; auc: number };
@@ -213,6 +253,16 @@ export interface DataQualityAnalysis {
   preprocessing_recommendations: PreprocessingRecommendations;
 }
 
+// Analyse calculée en arrière-plan (réponse 202 de /data-quality/analyze)
+export interface DataQualityJob {
+  job_id: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  status_url?: string;
+  deduplicated?: boolean;
+  error?: string;
+  analysis?: DataQualityAnalysis;
+}
+
 export interface PreprocessingStrategyRequest {
   dataset_id: string;
   target_column: string;
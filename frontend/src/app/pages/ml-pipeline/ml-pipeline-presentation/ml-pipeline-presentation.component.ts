@@ -220,7 +220,7 @@ export class MlPipelinePresentationComponent implements OnInit, OnDestroy, After
   loadExperiments(): void {
     this.mlPipelineService.getUserExperiments().subscribe({
       next: (experiments) => {
-        this.runningExperiments = experiments.filter(exp => exp.status === 'running' || exp.status === 'pending');
+        this.runningExperiments = experiments.filter(exp => exp.status === 'running' || exp.status === 'pending' || exp.status === 'queued');
         this.completedExperiments = experiments.filter(exp => exp.status === 'completed');
         this.latestExperiment = experiments[0] || null;
 
@@ -326,6 +326,7 @@ export class MlPipelinePresentationComponent implements OnInit, OnDestroy, After
   getExperimentProgress(experiment: ExperimentRead): number {
     // Mock progress based on status
     switch(experiment.status) {
+      case 'queued': return 0;
       case 'pending': return 0;
       case 'running': return Math.floor(Math.random() * 80) + 10; // 10-90%
       case 'completed': return 100;
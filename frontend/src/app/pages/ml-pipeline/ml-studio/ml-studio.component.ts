@@ -24,7 +24,7 @@ import { TranslateModule, TranslateService } from '@ngx-translate/core';
 import { DatasetService } from '../../../services/dataset.service';
 import { MlPipelineService } from '../../../services/ml-pipeline.service';
 import { DatasetDetailView } from '../../../models/dataset.models';
-import { AlgorithmInfo, ExperimentCreate } from '../../../models/ml-pipeline.models';
+import { AlgorithmInfo, ExperimentCreate, ExperimentStatus } from '../../../models/ml-pipeline.models';
 import { interval, Subscription } from 'rxjs';
 import { takeWhile } from 'rxjs/operators';
 
@@ -398,29 +398,45 @@ export class MlStudioComponent implements OnInit {
   }
 
   startProgressTracking() {
+    // Statut poussé par le serveur (SSE) ; polling uniquement si le flux est indisponible
+    this.statusCheckSubscription = this.mlPipelineService.watchExperimentStatus(this.experimentId)
+      .subscribe({
+        next: (status) => this.applyTrainingStatus(status),
+        error: () => this.startStatusPolling(),
+        complete: () => {
+          if (this.isTraining) {
+            this.startStatusPolling();
+          }
+        }
+      });
+  }
+
+  private startStatusPolling() {
     this.statusCheckSubscription = interval(2000)
       .pipe(takeWhile(() => this.isTraining))
       .subscribe(() => {
         this.mlPipelineService.getExperimentStatus(this.experimentId).subscribe({
-          next: (status) => {
-            this.trainingProgress = status.progress || 0;
-
-            switch (status.status) {
-              case 'running':
-                this.updateTrainingStatus();
-                break;
-              case 'completed':
-                this.onTrainingComplete();
-                break;
-              case 'failed':
-                this.onTrainingFailed(status.error_message);
-                break;
-            }
-          }
+          next: (status) => this.applyTrainingStatus(status)
         });
       });
   }
 
+  private applyTrainingStatus(status: ExperimentStatus) {
+    this.trainingProgress = status.progress || 0;
+
+    switch (status.status) {
+      case 'running':
+        this.updateTrainingStatus();
+        break;
+      case 'completed':
+        this.onTrainingComplete();
+        break;
+      case 'failed':
+        this.onTrainingFailed(status.error_message);
+        break;
+    }
+  }
+
   updateTrainingStatus() {
     if (this.trainingProgress < 30) {
       this.trainingStatus = 'ML_STUDIO.TRAINING.LOADING_DATA';
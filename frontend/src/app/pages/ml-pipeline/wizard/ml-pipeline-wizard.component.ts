@@ -529,7 +529,7 @@ export class MlPipelineWizardComponent implements OnInit, AfterViewInit, OnDestr
   };
 
   pollTrainingStatus() {
-    console.log('🔄 Starting training status polling...');
+    console.log('🔄 Starting training status tracking...');
 
     // Réinitialiser les étapes de progression
     this.progressSteps = {
@@ -539,55 +539,33 @@ export class MlPipelineWizardComponent implements OnInit, AfterViewInit, OnDestr
       evaluation: false
     };
 
-    // Nettoyer le polling précédent
-    if (this.pollingInterval) {
-      clearInterval(this.pollingInterval);
-    }
+    // Nettoyer le suivi précédent
+    this.stopStatusTracking();
+
+    // Statut poussé par le serveur à chaque étape (SSE) ; repli sur le polling si le flux échoue
+    this.pollingSubscription = this.mlPipelineService.watchExperimentStatus(this.experimentId)
+      .subscribe({
+        next: (status) => this.applyTrainingStatus(status),
+        error: (error) => {
+          console.warn('⚠️ Status stream unavailable, falling back to polling:', error);
+          this.startStatusPolling();
+        },
+        complete: () => {
+          // Flux coupé avant le statut final (proxy, réseau) : reprendre en polling
+          if (this.isTraining) {
+            this.startStatusPolling();
+          }
+        }
+      });
+  }
 
+  private startStatusPolling() {
     this.pollingInterval = setInterval(() => {
       console.log('🔍 Polling experiment status for:', this.experimentId);
 
       this.mlPipelineService.getExperimentStatus(this.experimentId)
         .subscribe({
-          next: (status) => {
-            console.log('📊 Status received:', status);
-            this.experimentStatus = status;
-
-            // Mise à jour de la progression avec validation ET force UI update
-            if (status.progress !== undefined && status.progress !== null) {
-              const newProgress = Math.max(0, Math.min(100, status.progress));
-              if (newProgress !== this.trainingProgress) {
-                console.log(`📈 Progress updating from ${this.trainingProgress}% to ${newProgress}%`);
-                this.trainingProgress = newProgress;
-
-                // FORCE UI update immediately
-                this.cdr.markForCheck();
-                this.cdr.detectChanges();
-
-                console.log(`✅ Progress UI updated: ${this.trainingProgress}%`);
-
-                // Mise à jour des logs selon la progression
-                this.updateProgressLogs(this.trainingProgress);
-              }
-            }
-
-            if (status.status === 'completed') {
-              console.log('✅ Training completed! Stopping poll and showing completion...');
-              this.handleTrainingCompletion();
-
-            } else if (status.status === 'failed') {
-              console.log('❌ Training failed:', status.error_message);
-              this.handleTrainingFailure(status.error_message);
-
-            } else if (status.status === 'running' || status.status === 'pending') {
-              console.log(`🔄 Training in progress: ${this.trainingProgress}%`);
-              // Continue polling
-            }
-
-            // Force UI update complet
-            this.cdr.markForCheck();
-            this.cdr.detectChanges();
-          },
+          next: (status) => this.applyTrainingStatus(status),
           error: (error) => {
             console.error('❌ Error polling status:', error);
             this.addTrainingLog('error', `Erreur de communication: ${error.message}`);
@@ -597,6 +575,61 @@ export class MlPipelineWizardComponent implements OnInit, AfterViewInit, OnDestr
     }, 1500); // Poll every 1.5 seconds pour plus de réactivité
   }
 
+  private stopStatusTracking() {
+    if (this.pollingSubscription) {
+      this.pollingSubscription.unsubscribe();
+      this.pollingSubscription = null;
+    }
+    if (this.pollingInterval) {
+      clearInterval(this.pollingInterval);
+      this.pollingInterval = null;
+    }
+  }
+
+  private applyTrainingStatus(status: any) {
+    console.log('📊 Status received:', status);
+    this.experimentStatus = status;
+
+    // Mise à jour de la progression avec validation ET force UI update
+    if (status.progress !== undefined && status.progress !== null) {
+      const newProgress = Math.max(0, Math.min(100, status.progress));
+      if (newProgress !== this.trainingProgress) {
+        console.log(`📈 Progress updating from ${this.trainingProgress}% to ${newProgress}%`);
+        this.trainingProgress = newProgress;
+
+        // FORCE UI update immediately
+        this.cdr.markForCheck();
+        this.cdr.detectChanges();
+
+        console.log(`✅ Progress UI updated: ${this.trainingProgress}%`);
+
+        // Mise à jour des logs selon la progression
+        this.updateProgressLogs(this.trainingProgress);
+      }
+    }
+
+    if (status.status === 'completed') {
+      console.log('✅ Training completed! Stopping poll and showing completion...');
+      this.handleTrainingCompletion();
+
+    } else if (status.status === 'failed') {
+      console.log('❌ Training failed:', status.error_message);
+      this.handleTrainingFailure(status.error_message);
+
+    } else if (status.status === 'queued') {
+      console.log(`⏳ Training queued (position ${status.queue_position ?? '?'})`);
+      // Continue polling
+
+    } else if (status.status === 'running' || status.status === 'pending') {
+      console.log(`🔄 Training in progress: ${this.trainingProgress}%`);
+      // Continue polling
+    }
+
+    // Force UI update complet
+    this.cdr.markForCheck();
+    this.cdr.detectChanges();
+  }
+
   updateProgressLogs(progress: number) {
     console.log(`🔄 Updating progress logs for ${progress}%`);
 
@@ -636,12 +669,9 @@ export class MlPipelineWizardComponent implements OnInit, AfterViewInit, OnDestr
     this.trainingProgress = 100;
     this.trainingCompleted = true;
 
-    // ⚠️ ROBUSTESSE : Nettoyer complètement le polling
-    if (this.pollingInterval) {
-      clearInterval(this.pollingInterval);
-      this.pollingInterval = null;
-      console.log('✅ Polling interval cleaned up');
-    }
+    // ⚠️ ROBUSTESSE : Nettoyer complètement le suivi (flux + polling)
+    this.stopStatusTracking();
+    console.log('✅ Status tracking cleaned up');
 
     this.addTrainingLog('success', '🎉 Entraînement terminé avec succès!');
     this.addTrainingLog('success', '💾 Modèle sauvegardé et versionné');
@@ -681,10 +711,8 @@ export class MlPipelineWizardComponent implements OnInit, AfterViewInit, OnDestr
     this.isTraining = false;
     this.trainingCompleted = false;
 
-    // Nettoyer le polling
-    if (this.pollingInterval) {
-      clearInterval(this.pollingInterval);
-    }
+    // Nettoyer le suivi du statut
+    this.stopStatusTracking();
 
     this.addTrainingLog('error', `❌ ÉCHEC: ${errorMessage || 'Erreur inconnue'}`);
     this.addTrainingLog('error', '🔧 Vérifiez votre configuration et réessayez');
@@ -1198,6 +1226,8 @@ export class MlPipelineWizardComponent implements OnInit, AfterViewInit, OnDestr
       'svm': 'scatter_plot',
       'naive_bayes': 'psychology',
       'gradient_boosting': 'auto_graph',
+      'hist_gradient_boosting': 'auto_graph',
+      'extra_trees': 'forest',
       'neural_network': 'device_hub'
     };
     return iconMap[algorithmName] || 'smart_toy';
@@ -1369,10 +1399,7 @@ export class MlPipelineWizardComponent implements OnInit, AfterViewInit, OnDestr
     this.addTrainingLog('info', '🚀 Navigation vers la page de résultats...');
 
     // ⚠️ ROBUSTESSE : Clean state before navigation
-    if (this.pollingInterval) {
-      clearInterval(this.pollingInterval);
-      this.pollingInterval = null;
-    }
+    this.stopStatusTracking();
 
     // Navigation vers la page dédiée experiment-results
     this.router.navigate(['/projects', this.projectId, 'ml-pipeline', 'experiment', this.experimentId]).then(() => {
@@ -1461,10 +1488,8 @@ export class MlPipelineWizardComponent implements OnInit, AfterViewInit, OnDestr
       evaluation: false
     };
 
-    // Nettoyer le polling
-    if (this.pollingInterval) {
-      clearInterval(this.pollingInterval);
-    }
+    // Nettoyer le suivi du statut
+    this.stopStatusTracking();
 
     // Retourner à l'étape 8 (lancement)
     if (this.stepper) {
@@ -1769,9 +1794,7 @@ DIAGNOSTIC :
     if (this.logSimulationTimer) {
       clearInterval(this.logSimulationTimer);
     }
-    if (this.pollingInterval) {
-      clearInterval(this.pollingInterval);
-    }
+    this.stopStatusTracking();
 
     // Cleanup keyboard listener
     document.removeEventListener('keydown', this.handleKeyboardEvents.bind(this));
@@ -1810,11 +1833,8 @@ DIAGNOSTIC :
       evaluation: false
     };
 
-    // Clean any existing polling
-    if (this.pollingInterval) {
-      clearInterval(this.pollingInterval);
-      this.pollingInterval = null;
-    }
+    // Clean any existing status tracking
+    this.stopStatusTracking();
 
     console.log('✅ Wizard state reset complete');
   }
@@ -1897,6 +1917,16 @@ DIAGNOSTIC :
         'Systèmes de recommandation',
         'Classification simple',
         'Données groupées'
+      ],
+      'hist_gradient_boosting': [
+        'Grands jeux de données tabulaires',
+        'Données avec valeurs manquantes',
+        'Compétitions de prédiction'
+      ],
+      'extra_trees': [
+        'Prédiction de prix',
+        'Classification multi-classes',
+        'Entraînement rapide sur gros volumes'
       ]
     };
     return useCases[algorithmName] || ['Usage général'];
@@ -2052,6 +2082,8 @@ DIAGNOSTIC :
       'logistic_regression': 30,
       'naive_bayes': 25,
       'knn': 40,
+      'extra_trees': 50,
+      'hist_gradient_boosting': 55,
       'random_forest': 60,
       'svm': 70,
       'xgboost': 80,
@@ -3346,6 +3378,8 @@ print(f"Dataset nettoyé: {df.shape[0]} lignes, {df.shape[1]} colonnes")`;
       'svm': 'Moyen 🐌',
       'decision_tree': 'Rapide ⚡⚡',
       'xgboost': 'Moyen ⚡',
+      'hist_gradient_boosting': 'Très rapide ⚡⚡⚡',
+      'extra_trees': 'Très rapide ⚡⚡⚡',
       'neural_network': 'Lent 🐌🐌'
     };
     return speedMap[algorithmName] || 'Variable';
@@ -3359,6 +3393,8 @@ print(f"Dataset nettoyé: {df.shape[0]} lignes, {df.shape[1]} colonnes")`;
       'svm': 'Complexe 🧠🧠',
       'decision_tree': 'Facile 😊😊',
       'xgboost': 'Complexe 🧠🧠',
+      'hist_gradient_boosting': 'Moyen 🧠',
+      'extra_trees': 'Facile 😊',
       'neural_network': 'Très complexe 🧠🧠🧠'
     };
     return complexityMap[algorithmName] || 'Variable';
@@ -3372,6 +3408,8 @@ print(f"Dataset nettoyé: {df.shape[0]} lignes, {df.shape[1]} colonnes")`;
       'svm': 'Très bon 🎯🎯🎯',
       'decision_tree': 'Moyen 🎯',
       'xgboost': 'Excellent 🎯🎯🎯',
+      'hist_gradient_boosting': 'Excellent 🎯🎯🎯',
+      'extra_trees': 'Très bon 🎯🎯🎯',
       'neural_network': 'Variable 🎯🎯'
     };
     return accuracyMap[algorithmName] || 'Variable';
@@ -1,8 +1,9 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpHeaders, HttpParams } from '@angular/common/http';
-import { Observable, throwError } from 'rxjs';
-import { catchError, map } from 'rxjs/operators';
+import { Observable, throwError, timer } from 'rxjs';
+import { catchError, filter, map, switchMap, take, timeout } from 'rxjs/operators';
 import { environment } from '../../environments/environment';
+import { AuthService } from './auth.service';
 import {
   ExperimentRead,
   ExperimentCreate,
@@ -11,6 +12,7 @@ import {
   AlgorithmInfo,
   DataQualityAnalysisRequest,
   DataQualityAnalysis,
+  DataQualityJob,
   PreprocessingStrategyRequest,
   PreprocessingStrategy
 } from '../models/ml-pipeline.models';
@@ -21,7 +23,7 @@ import {
 export class MlPipelineService {
   private apiUrl = environment.apiUrl + '/api/v1/ml-pipeline';
 
-  constructor(private http: HttpClient) {}
+  constructor(private http: HttpClient, private authService: AuthService) {}
 
   /**
    * Create a new ML experiment
@@ -43,6 +45,79 @@ export class MlPipelineService {
       );
   }
 
+  /**
+   * Suit le statut d'une expérience en temps réel (Server-Sent Events).
+   *
+   * EventSource ne permet pas d'envoyer l'en-tête Authorization : le flux est lu
+   * via fetch. L'observable se termine au statut final (ou à la fermeture du flux)
+   * et passe en erreur si le flux est indisponible, l'appelant peut alors revenir
+   * au polling de getExperimentStatus.
+   */
+  watchExperimentStatus(experimentId: string): Observable<ExperimentStatus> {
+    return new Observable<ExperimentStatus>(subscriber => {
+      const controller = new AbortController();
+      const token = this.authService.getToken();
+      const headers: Record<string, string> = { 'Accept': 'text/event-stream' };
+      if (token) {
+        headers['Authorization'] = `Bearer ${token}`;
+      }
+
+      fetch(`${this.apiUrl}/experiments/${experimentId}/events`, { headers, signal: controller.signal })
+        .then(async response => {
+          if (!response.ok || !response.body) {
+            throw new Error(`Event stream unavailable (HTTP ${response.status})`);
+          }
+          const reader = response.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer = '';
+
+          while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+              break;
+            }
+            buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+
+            // Un événement SSE se termine par une ligne vide
+            let separator = buffer.indexOf('\n\n');
+            while (separator !== -1) {
+              const frame = buffer.slice(0, separator);
+              buffer = buffer.slice(separator + 2);
+              separator = buffer.indexOf('\n\n');
+
+              const data = frame.split('\n')
+                .filter(line => line.startsWith('data:'))
+                .map(line => line.slice(5).trim())
+                .join('\n');
+              if (data) {
+                subscriber.next(this.toExperimentStatus(JSON.parse(data)));
+              }
+            }
+          }
+          subscriber.complete();
+        })
+        .catch(error => {
+          if (!controller.signal.aborted) {
+            subscriber.error(error);
+          }
+        });
+
+      return () => controller.abort();
+    });
+  }
+
+  private toExperimentStatus(event: any): ExperimentStatus {
+    return {
+      id: event.experiment_id,
+      status: event.status,
+      progress: event.progress,
+      algorithm: event.algorithm,
+      error_message: event.status === 'failed' ? event.message : undefined,
+      created_at: event.timestamp,
+      updated_at: event.timestamp
+    };
+  }
+
   /**
    * Get the results of a completed experiment
    */
@@ -96,10 +171,32 @@ export class MlPipelineService {
    * Analyser la qualité des données d'un dataset
    */
   analyzeDataQuality(request: DataQualityAnalysisRequest): Observable<DataQualityAnalysis> {
-    return this.http.post<DataQualityAnalysis>(`${this.apiUrl}/data-quality/analyze`, request)
-      .pipe(
-        catchError(this.handleError)
-      );
+    return this.http.post<DataQualityAnalysis | DataQualityJob>(
+      `${this.apiUrl}/data-quality/analyze`, request, { observe: 'response' }
+    ).pipe(
+      switchMap(response => response.status === 202
+        ? this.waitForDataQualityJob((response.body as DataQualityJob).job_id)
+        : [response.body as DataQualityAnalysis]),
+      catchError(this.handleError)
+    );
+  }
+
+  /**
+   * Suivre une analyse calculée en arrière-plan jusqu'à son résultat
+   */
+  private waitForDataQualityJob(jobId: string, intervalMs = 1500, timeoutMs = 300000): Observable<DataQualityAnalysis> {
+    return timer(0, intervalMs).pipe(
+      switchMap(() => this.http.get<DataQualityJob>(`${this.apiUrl}/data-quality/jobs/${jobId}`)),
+      filter(job => job.status === 'completed' || job.status === 'failed'),
+      take(1),
+      timeout(timeoutMs),
+      map(job => {
+        if (job.status === 'failed' || !job.analysis) {
+          throw new Error(job.error || 'Data quality analysis failed');
+        }
+        return job.analysis;
+      })
+    );
   }
 
   /**
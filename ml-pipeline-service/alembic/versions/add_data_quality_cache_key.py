@@ -0,0 +1,33 @@
+"""Add content-addressed cache key to data quality analyses
+
+Revision ID: add_data_quality_cache_key
+Revises: add_model_versions
+Create Date: 2025-02-24 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_data_quality_cache_key'
+down_revision: Union[str, None] = 'add_model_versions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add cache_key with a unique index"""
+    # Les analyses existantes sont indexées par dataset_id seul (cible et échantillon ignorés) :
+    # elles ne correspondent à aucune clé et sont supprimées
+    op.execute("DELETE FROM data_quality_analyses")
+    op.add_column('data_quality_analyses', sa.Column('cache_key', sa.String(64), nullable=True))
+    op.create_index('ix_data_quality_analyses_cache_key', 'data_quality_analyses', ['cache_key'], unique=True)
+    op.create_index('ix_data_quality_analyses_expires_at', 'data_quality_analyses', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Remove cache_key"""
+    op.drop_index('ix_data_quality_analyses_expires_at', table_name='data_quality_analyses')
+    op.drop_index('ix_data_quality_analyses_cache_key', table_name='data_quality_analyses')
+    op.drop_column('data_quality_analyses', 'cache_key')
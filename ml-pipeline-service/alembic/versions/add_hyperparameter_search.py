@@ -0,0 +1,29 @@
+"""Add hyperparameter search columns to experiments
+
+Revision ID: add_hyperparameter_search
+Revises: add_data_quality_analysis
+Create Date: 2025-02-10 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_hyperparameter_search'
+down_revision: Union[str, None] = 'add_data_quality_analysis'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add search_config and search_results to experiments"""
+    op.add_column('experiments', sa.Column('search_config', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('experiments', sa.Column('search_results', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove hyperparameter search columns"""
+    op.drop_column('experiments', 'search_results')
+    op.drop_column('experiments', 'search_config')
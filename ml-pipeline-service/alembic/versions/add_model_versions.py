@@ -0,0 +1,73 @@
+"""Add model_versions registry table
+
+Revision ID: add_model_versions
+Revises: add_hyperparameter_search
+Create Date: 2025-02-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_model_versions'
+down_revision: Union[str, None] = 'add_hyperparameter_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create model_versions table and backfill it from completed experiments"""
+    
+    op.create_table('model_versions',
+        # Identification
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('experiment_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('project_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('version', sa.String(50), nullable=False),
+        
+        # Artefact
+        sa.Column('artifact_path', sa.String(500), nullable=False),
+        sa.Column('manifest_path', sa.String(500), nullable=True),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=True),
+        sa.Column('sha256', sa.String(64), nullable=True),
+        sa.Column('compression', sa.String(20), nullable=True),
+        
+        # Instantané des résultats
+        sa.Column('algorithm', sa.String(50), nullable=False),
+        sa.Column('metrics', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        
+        # Timestamps
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        
+        sa.ForeignKeyConstraint(['experiment_id'], ['experiments.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('experiment_id', 'version', name='uq_model_versions_experiment_version')
+    )
+    
+    # Create indexes
+    op.create_index('ix_model_versions_experiment_id_created_at', 'model_versions', ['experiment_id', 'created_at'], unique=False)
+    op.create_index('ix_model_versions_user_id', 'model_versions', ['user_id'], unique=False)
+    op.create_index('ix_experiments_user_id_created_at', 'experiments', ['user_id', 'created_at'], unique=False)
+    
+    # Versions existantes : modèle courant des expériences terminées (taille inconnue)
+    op.execute("""
+        INSERT INTO model_versions (id, experiment_id, user_id, project_id, version, artifact_path,
+                                    algorithm, metrics, created_at)
+        SELECT gen_random_uuid(), id, user_id, project_id,
+               COALESCE(substring(artifact_uri from '_v([0-9_]+)\\.joblib$'), to_char(updated_at, 'YYYYMMDD_HH24MISS')),
+               artifact_uri, algorithm, metrics, updated_at
+        FROM experiments
+        WHERE status = 'completed' AND artifact_uri IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Drop model_versions table"""
+    
+    op.drop_index('ix_experiments_user_id_created_at', table_name='experiments')
+    op.drop_index('ix_model_versions_user_id', table_name='model_versions')
+    op.drop_index('ix_model_versions_experiment_id_created_at', table_name='model_versions')
+    op.drop_table('model_versions')
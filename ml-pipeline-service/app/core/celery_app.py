@@ -1,5 +1,9 @@
 from celery import Celery
 from app.core.config import settings
+from app.core.cpu_budget import worker_concurrency
+from app.core.workloads import (
+    HEAVY_QUEUE, DATA_QUALITY_QUEUE, worker_max_tasks_per_child, worker_max_memory_per_child
+)
 
 celery_app = Celery(
     'ml_pipeline',
@@ -25,14 +29,25 @@ celery_app.conf.update(
     task_soft_time_limit=7200,  # 2 hours soft limit for complex ML tasks
     task_time_limit=7500,       # 2 hours 5 minutes hard limit
     
-    # Task routing
+    # Task routing (train_model : ml_queue ou ml_light_queue choisie à la création de l'expérience)
     task_routes={
-        'app.tasks.train_model': {'queue': 'ml_queue'},
+        'train_model': {'queue': HEAVY_QUEUE},
+        'precompute_data_quality': {'queue': DATA_QUALITY_QUEUE},
     },
     
-    # Worker configuration
+    # Worker configuration selon CELERY_WORKER_CLASS (heavy / light, voir app/core/workloads.py)
+    # Un processus par part du quota CPU du conteneur (le défaut Celery, os.cpu_count(), ignore les cgroups)
+    worker_concurrency=worker_concurrency(),
     worker_prefetch_multiplier=1,
-    worker_max_tasks_per_child=1,  # Restart worker after each task to free memory
+    # heavy : processus redémarré après chaque tâche pour libérer la mémoire ; light : processus réutilisés
+    worker_max_tasks_per_child=worker_max_tasks_per_child(),
+    
+    # Priorités sur le broker Redis (0 servie en premier, voir app/core/data_quality_jobs.py)
+    broker_transport_options={
+        'priority_steps': [0, 3, 6, 9],
+        'queue_order_strategy': 'priority',
+    },
+    task_default_priority=6,
     
     # Result backend configuration
     result_expires=3600 * 24,  # Results expire after 24 hours
@@ -66,6 +81,7 @@ celery_app.conf.update(
     worker_disable_rate_limits=False,
     
     # Optimisation de la mémoire pour les tâches ML
-    worker_max_memory_per_child=2048000,  # 2GB limit par worker
+    # heavy : 2 GB ; light : 1 GB, les processus (deux par cœur) doivent tenir ensemble dans la limite du pod
+    worker_max_memory_per_child=worker_max_memory_per_child(),
     worker_proc_alive_timeout=4.0,
 ) 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     # Database
@@ -8,6 +8,7 @@ class Settings(BaseSettings):
     # Celery
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    PROGRESS_EVENTS_REDIS_URL: Optional[str] = None  # pub/sub des événements de progression (défaut: broker)
     
     # Storage
     STORAGE_TYPE: str = "minio"  # or "azure"
@@ -19,11 +20,85 @@ class Settings(BaseSettings):
     
     # Service URLs
     SERVICE_SELECTION_URL: str = "http://service-selection-service:80"
+    # Jeton partagé des appels de service à service (précalcul des analyses) ; vide = endpoints internes refusés
+    INTERNAL_SERVICE_TOKEN: Optional[str] = None
+    
+    # Cache des manifestes de datasets (storage_path + fichiers)
+    MANIFEST_CACHE_TTL: int = 300  # secondes
+    MANIFEST_CACHE_MAX_ENTRIES: int = 1024
+    MANIFEST_CACHE_REDIS_URL: Optional[str] = None  # ex: redis://redis:6379/1 pour partager entre workers
+    
+    # Cache local des fichiers de datasets (workers) : répertoire partagé par nœud, None = désactivé
+    LOCAL_DATASET_CACHE_DIR: Optional[str] = None
+    LOCAL_DATASET_CACHE_MAX_BYTES: int = 20 * 1024 * 1024 * 1024  # 20 GiB
+    
+    # Cache local des données prétraitées (pipeline ajusté + matrices train/test), None = désactivé
+    PREPROCESSING_CACHE_DIR: Optional[str] = None
+    PREPROCESSING_CACHE_MAX_BYTES: int = 10 * 1024 * 1024 * 1024  # 10 GiB
     
     # ML Configuration
     MODEL_STORAGE_PATH: str = "ibis-x-models"
     MAX_TRAINING_TIME: int = 3600  # 1 hour
     DEFAULT_TEST_SIZE: float = 0.2
+    # Mémoire disponible pour un entraînement ; au-delà, mode incrémental ou sous-échantillon
+    TRAINING_MEMORY_BUDGET_BYTES: int = 1536 * 1024 * 1024  # worker_max_memory_per_child heavy = 2 GB
+    
+    # Recherche d'hyperparamètres
+    HYPERPARAMETER_SEARCH_N_JOBS: int = -1  # processus joblib pour les essais (-1 = budget CPU de la tâche)
+    
+    # Budget CPU des workers (app/core/cpu_budget.py) : None = déduit du quota cgroup du conteneur
+    ML_WORKER_CONCURRENCY: Optional[int] = None  # processus par worker Celery d'entraînement lourd
+    ML_TASK_CPU_CORES: Optional[int] = None  # cœurs alloués à chaque entraînement
+    HYPERPARAMETER_SEARCH_MAX_TRIALS: int = 200
+    
+    # Structure d'arbre affichée (experiment.visualizations) ; la structure complète est un artefact à part
+    TREE_VIZ_MAX_DEPTH: Optional[int] = None  # None = défaut du modèle (8, 4 pour les forêts)
+    TREE_VIZ_MAX_NODES: int = 255
+    
+    # Classes de charge des workers Celery (app/core/workloads.py)
+    CELERY_WORKER_CLASS: str = "heavy"  # heavy : ml_queue ; light : data_quality_queue + ml_light_queue
+    ML_HEAVY_WORKER_MAX_TASKS_PER_CHILD: int = 1  # processus recyclé après chaque entraînement lourd
+    ML_LIGHT_WORKER_MAX_TASKS_PER_CHILD: int = 200  # processus réutilisés (imports et connexions déjà chauds)
+    ML_LIGHT_WORKER_CONCURRENCY: Optional[int] = None  # None = 2 processus par cœur disponible
+    # Mémoire résidente (KiB) au-delà de laquelle un processus est remplacé après sa tâche.
+    # light : concurrence x limite + processus principal doit tenir dans la limite du pod (3Gi, 1 CPU)
+    ML_HEAVY_WORKER_MAX_MEMORY_PER_CHILD_KB: int = 2048000
+    ML_LIGHT_WORKER_MAX_MEMORY_PER_CHILD_KB: int = 1024000
+    # Un entraînement reste léger sous ces seuils (sans recherche d'hyperparamètres)
+    LIGHT_TRAINING_MAX_ROWS: int = 50000
+    LIGHT_TRAINING_MAX_CELLS: int = 1000000  # lignes x colonnes
+    LIGHT_TRAINING_MAX_BYTES: int = 32 * 1024 * 1024  # si le nombre de colonnes est inconnu
+    
+    # Ordonnancement équitable des entraînements (app/scheduler.py)
+    SCHEDULER_REDIS_URL: Optional[str] = None  # None = CELERY_BROKER_URL
+    # Entraînements simultanés par file ; None = processus des workers en ligne qui la consomment
+    SCHEDULER_HEAVY_SLOTS: Optional[int] = None  # ml_queue (workers heavy)
+    SCHEDULER_LIGHT_SLOTS: Optional[int] = None  # ml_light_queue (workers light)
+    SCHEDULER_PUMP_INTERVAL: int = 30  # secondes entre deux passes de l'ordonnanceur
+    SCHEDULER_SLOT_TIMEOUT: int = 7800  # créneau libéré d'office au-delà (time_limit de train_model + marge)
+    SCHEDULER_SEARCH_COST: float = 3.0  # coût d'une recherche d'hyperparamètres (1 pour un entraînement)
+    # Poids par niveau : à coût égal, un niveau de poids 2 est servi deux fois plus souvent qu'un niveau de poids 1
+    SCHEDULER_TIER_WEIGHTS: Dict[str, float] = {'priority': 4.0, 'standard': 2.0, 'best_effort': 1.0}
+    
+    # Quotas d'expériences par utilisateur
+    EXPERIMENT_QUOTA_PER_DAY: int = 20  # expériences créées sur 24h glissantes
+    EXPERIMENT_QUOTA_TOTAL: int = 100
+    MODEL_STORAGE_QUOTA_MB: int = 1000
+    
+    # Artefacts de modèle (app/ml/artifacts.py) : lz4, zlib, gzip, lzma ou none (relu en memory-map)
+    MODEL_ARTIFACT_COMPRESSION: str = "lz4"
+    MODEL_ARTIFACT_COMPRESSION_LEVEL: int = 3
+    
+    # Cache des analyses de qualité des données
+    DATA_QUALITY_CACHE_TTL_DAYS: int = 7
+    DATA_QUALITY_CACHE_SWEEP_INTERVAL: int = 3600  # secondes entre deux purges des analyses expirées
+    
+    # Prédictions (POST /experiments/{id}/predict)
+    PREDICTION_MODEL_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024  # modèles chargés en mémoire (LRU)
+    PREDICTION_WORKERS: int = 4  # threads d'inférence
+    PREDICTION_BATCH_WINDOW_MS: float = 5.0  # fenêtre de regroupement des petites requêtes
+    PREDICTION_MAX_BATCH_ROWS: int = 10000
+    PREDICTION_MAX_ROWS: int = 100000  # lignes max par requête
     
     # API Configuration
     API_V1_STR: str = "/api/v1"
@@ -0,0 +1,124 @@
+"""
+Budget CPU des workers ML.
+
+Par défaut, scikit-learn (n_jobs=-1), joblib et les bibliothèques BLAS / OpenMP
+utilisent tous les cœurs visibles. Plusieurs entraînements concurrents sur un
+même nœud se les disputent alors, et os.cpu_count() ignore la limite CPU du
+conteneur (cgroup) : le débit total s'effondre.
+
+Chaque tâche reçoit une part fixe des cœurs réellement disponibles :
+
+    cœurs disponibles = min(affinité CPU du processus, quota cgroup arrondi au supérieur)
+    cœurs par tâche   = cœurs disponibles // processus du worker (ML_TASK_CPU_CORES pour forcer)
+
+Les workers light (app/core/workloads.py) lancent deux processus par cœur : leurs
+tâches courtes passent une bonne part de leur temps à lire le stockage.
+
+Cette part sert de n_jobs aux modèles et de limite threadpoolctl aux pools BLAS
+et OpenMP du processus.
+"""
+
+import os
+import math
+import logging
+from typing import Any, Dict, Optional
+
+from threadpoolctl import threadpool_limits
+
+from app.core.config import settings
+from app.core.workloads import worker_class
+
+logger = logging.getLogger(__name__)
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_DIRS = ("/sys/fs/cgroup/cpu", "/sys/fs/cgroup/cpu,cpuacct")
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """Quota CPU du conteneur en nombre de cœurs (ex: 1.5), None si illimité ou inconnu."""
+    try:
+        with open(CGROUP_V2_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    for cgroup_dir in CGROUP_V1_DIRS:
+        try:
+            with open(os.path.join(cgroup_dir, "cpu.cfs_quota_us")) as f:
+                quota = int(f.read())
+            with open(os.path.join(cgroup_dir, "cpu.cfs_period_us")) as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            continue
+        if quota > 0 and period > 0:
+            return quota / period
+        return None
+    return None
+
+
+def available_cpus() -> int:
+    """Cœurs utilisables par le processus (affinité et quota cgroup)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def worker_concurrency() -> int:
+    """Nombre de processus d'un worker Celery (une tâche par processus)."""
+    if worker_class() == 'light':
+        return settings.ML_LIGHT_WORKER_CONCURRENCY or 2 * available_cpus()
+    return settings.ML_WORKER_CONCURRENCY or available_cpus()
+
+
+class CPUBudget:
+    """Part des cœurs allouée à une tâche d'entraînement."""
+
+    def __init__(self, task_cores: Optional[int] = None, concurrency: Optional[int] = None):
+        self._task_cores = task_cores
+        self._concurrency = concurrency
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency or worker_concurrency()
+
+    @property
+    def cores(self) -> int:
+        if self._task_cores:
+            return self._task_cores
+        return max(1, available_cpus() // self.concurrency)
+
+    def n_jobs(self, requested: Optional[int] = None) -> int:
+        """n_jobs borné par le budget (None ou -1 = tout le budget)."""
+        if requested is None or requested < 1:
+            return self.cores
+        return min(requested, self.cores)
+
+    def apply(self):
+        """
+        Limite les pools de threads BLAS / OpenMP du processus au budget.
+
+        Returns:
+            le limiteur threadpoolctl (restore_original_limits() pour lever la limite)
+        """
+        return threadpool_limits(limits=self.cores)
+
+    def allocation(self) -> Dict[str, Any]:
+        """Allocation courante, exposée dans les métadonnées de la tâche."""
+        limit = cgroup_cpu_limit()
+        return {
+            'cores': self.cores,
+            'available_cpus': available_cpus(),
+            'cgroup_cpu_limit': round(limit, 2) if limit is not None else None,
+            'worker_concurrency': self.concurrency
+        }
+
+
+cpu_budget = CPUBudget(task_cores=settings.ML_TASK_CPU_CORES)
@@ -0,0 +1,113 @@
+"""
+File de calcul des analyses de qualité des données.
+
+Les analyses manquantes dans le cache sont calculées par la tâche Celery
+precompute_data_quality, sur la file data_quality_queue des workers light
+(app.core.workloads) : une analyse n'attend jamais un entraînement lourd. Les
+priorités Redis ordonnent la file : une analyse demandée par un utilisateur
+passe devant les précalculs d'ingestion, eux-mêmes devant les rattrapages en masse.
+
+Une seule tâche par clé de cache : les demandes suivantes reçoivent le même
+identifiant de job, sauf si la tâche en attente est moins prioritaire.
+"""
+
+import uuid
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import redis
+from celery.result import AsyncResult
+
+from app.core.config import settings
+from app.core.celery_app import celery_app
+from app.core.workloads import DATA_QUALITY_QUEUE
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_TASK_NAME = 'precompute_data_quality'
+
+# Priorités Redis : 0 est servie en premier
+PRIORITIES = {
+    'interactive': 0,  # Un utilisateur attend le résultat
+    'ingest': 3,       # Nouveau dataset (précalcul à l'ingestion)
+    'backfill': 9      # Rattrapage en masse (imports, changement de version de l'analyseur)
+}
+
+JOB_KEY_TEMPLATE = "ibis-x:data-quality:jobs:{cache_key}"
+JOB_KEY_TTL = 1800  # Au-delà, une nouvelle demande relance une tâche
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def _get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _redis_client
+
+
+def _pending_job(cache_key: str, priority: int) -> Optional[str]:
+    """Job déjà soumis pour cette clé et au moins aussi prioritaire, sinon None (et réservation de la clé)."""
+    client = _get_redis()
+    key = JOB_KEY_TEMPLATE.format(cache_key=cache_key)
+    existing = client.get(key)
+    if existing:
+        job_id, job_priority = existing.decode().rsplit(':', 1)
+        state = AsyncResult(job_id, app=celery_app).state
+        # Tâche en cours ou en attente à une priorité suffisante : on la réutilise
+        if state in ('STARTED', 'RETRY') or (state == 'PENDING' and int(job_priority) <= priority):
+            return job_id
+    return None
+
+
+def submit_analysis_job(dataset_id: str,
+                        target_column: Optional[str] = None,
+                        sample_size: Optional[int] = None,
+                        isolation_forest: bool = False,
+                        priority: str = 'interactive',
+                        cache_key: Optional[str] = None,
+                        force: bool = False) -> Tuple[str, bool]:
+    """
+    Soumet le calcul d'une analyse.
+
+    Returns:
+        (identifiant du job, True si un job existant a été réutilisé)
+    """
+    level = PRIORITIES[priority]
+    if cache_key and not force:
+        try:
+            job_id = _pending_job(cache_key, level)
+            if job_id:
+                return job_id, True
+        except Exception as e:
+            logger.warning(f"Déduplication des analyses de qualité indisponible: {str(e)}")
+
+    job_id = str(uuid.uuid4())
+    celery_app.send_task(
+        PRECOMPUTE_TASK_NAME,
+        args=[dataset_id, target_column, sample_size, isolation_forest, force],
+        task_id=job_id,
+        queue=DATA_QUALITY_QUEUE,
+        priority=level
+    )
+    if cache_key:
+        try:
+            _get_redis().setex(JOB_KEY_TEMPLATE.format(cache_key=cache_key), JOB_KEY_TTL, f"{job_id}:{level}")
+        except Exception as e:
+            logger.warning(f"Enregistrement du job {job_id} impossible: {str(e)}")
+    logger.info(f"Analyse de qualité soumise pour le dataset {dataset_id} (job {job_id}, priorité {priority})")
+    return job_id, False
+
+
+def analysis_job_status(job_id: str) -> Dict[str, Any]:
+    """
+    État d'un job : queued, running, completed (avec cache_key) ou failed.
+
+    Un identifiant inconnu est vu comme queued (Celery ne distingue pas les deux).
+    """
+    result = AsyncResult(job_id, app=celery_app)
+    if result.state == 'SUCCESS':
+        return {'job_id': job_id, 'status': 'completed', 'cache_key': (result.result or {}).get('cache_key')}
+    if result.state == 'FAILURE':
+        return {'job_id': job_id, 'status': 'failed', 'error': str(result.result)}
+    return {'job_id': job_id, 'status': 'running' if result.state in ('STARTED', 'RETRY') else 'queued'}
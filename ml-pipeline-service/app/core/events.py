@@ -0,0 +1,114 @@
+"""
+Événements de progression des expériences (Redis pub/sub).
+
+Le worker publie un événement à chaque étape de l'entraînement ; l'API les relaie
+aux clients (SSE). Le dernier événement est aussi conservé dans une clé Redis
+pour qu'un client qui se connecte en cours de route reçoive l'état courant.
+
+Format d'un événement :
+    {"experiment_id", "status", "progress", "stage", "message", "timestamp", ...}
+"""
+
+import json
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_TEMPLATE = "ibis-x:experiments:{experiment_id}:events"
+LAST_EVENT_TEMPLATE = "ibis-x:experiments:{experiment_id}:last"
+LAST_EVENT_TTL = 24 * 3600
+# Un commentaire SSE est envoyé à cet intervalle pour garder la connexion ouverte
+HEARTBEAT_INTERVAL = 15.0
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def _events_redis_url() -> str:
+    return settings.PROGRESS_EVENTS_REDIS_URL or settings.CELERY_BROKER_URL
+
+
+def _get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(_events_redis_url(), socket_timeout=2, socket_connect_timeout=2)
+    return _redis_client
+
+
+def publish_experiment_event(experiment_id: str,
+                             status: str,
+                             progress: int,
+                             stage: str,
+                             message: Optional[str] = None,
+                             **extra: Any) -> None:
+    """
+    Publie un événement de progression.
+
+    Ne lève jamais : un Redis indisponible ne doit pas faire échouer un entraînement.
+    """
+    event = {
+        'experiment_id': str(experiment_id),
+        'status': status,
+        'progress': progress,
+        'stage': stage,
+        'message': message,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        **extra
+    }
+    payload = json.dumps(event, default=str)
+    try:
+        client = _get_redis()
+        pipeline = client.pipeline(transaction=False)
+        pipeline.setex(LAST_EVENT_TEMPLATE.format(experiment_id=experiment_id), LAST_EVENT_TTL, payload)
+        pipeline.publish(CHANNEL_TEMPLATE.format(experiment_id=experiment_id), payload)
+        pipeline.execute()
+    except Exception as e:
+        logger.warning(f"Publication de l'événement {stage} impossible pour l'expérience {experiment_id}: {str(e)}")
+
+
+async def stream_experiment_events(experiment_id: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Itère sur les événements d'une expérience jusqu'à un statut terminal.
+
+    Le dernier événement connu est émis en premier. None est produit toutes les
+    HEARTBEAT_INTERVAL secondes sans événement (à convertir en keep-alive).
+    """
+    import redis.asyncio as aioredis
+
+    client = aioredis.Redis.from_url(_events_redis_url())
+    pubsub = client.pubsub()
+    try:
+        # S'abonner avant de lire le dernier état : aucun événement ne peut être manqué entre les deux
+        await pubsub.subscribe(CHANNEL_TEMPLATE.format(experiment_id=experiment_id))
+
+        last = await client.get(LAST_EVENT_TEMPLATE.format(experiment_id=experiment_id))
+        if last is not None:
+            event = json.loads(last)
+            yield event
+            if event.get('status') in TERMINAL_STATUSES:
+                return
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=HEARTBEAT_INTERVAL)
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message['data'])
+            yield event
+            if event.get('status') in TERMINAL_STATUSES:
+                return
+    finally:
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+            await client.close()
+        except (asyncio.CancelledError, Exception):
+            pass
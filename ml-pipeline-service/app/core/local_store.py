@@ -0,0 +1,193 @@
+"""
+Cache local (par nœud) des fichiers de datasets pour les workers Celery.
+
+Chaque fichier Parquet / Arrow IPC est téléchargé une seule fois par nœud dans
+un répertoire partagé (hostPath en Kubernetes), puis ouvert en memory-map :
+les expériences concurrentes sur le même dataset partagent le page cache au
+lieu de garder chacune une copie en mémoire.
+
+- les téléchargements sont écrits dans un fichier temporaire puis renommés
+  (un lecteur ne voit jamais de fichier partiel)
+- un verrou fcntl par entrée évite que plusieurs processus téléchargent le même fichier
+- éviction LRU (date de dernière utilisation) au-delà de LOCAL_DATASET_CACHE_MAX_BYTES ; supprimer
+  un fichier encore mappé par un autre processus est sans danger sous Linux, une entrée
+  évincée entre fetch et son ouverture est retéléchargée (open)
+- le fichier de verrou d'une entrée est supprimé avec elle, s'il est libre
+"""
+
+import os
+import fcntl
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import pyarrow as pa
+
+from app.core.config import settings
+from common.storage_client import get_storage_client
+
+logger = logging.getLogger(__name__)
+
+# Taille des plages téléchargées : le fichier n'est jamais entièrement en mémoire
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Ouvertures tentées si l'entrée est évincée par un autre processus avant son memory-map
+MAX_OPEN_ATTEMPTS = 3
+
+
+class LocalDatasetStore:
+    """Répertoire de cache des fichiers de datasets, partagé entre processus d'un même nœud."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def fetch(self, object_path: str, version: str = "") -> str:
+        """
+        Chemin local d'un objet, téléchargé si absent du cache.
+
+        Args:
+            object_path: chemin de l'objet dans le stockage
+            version: jeton de version (ex: updated_at du dataset) ; un nouveau jeton
+                     produit une nouvelle entrée, l'ancienne finit évincée
+        """
+        size = get_storage_client().get_file_size(object_path)
+        key = hashlib.sha256(f"{object_path}|{size}|{version}".encode()).hexdigest()
+        extension = os.path.splitext(object_path)[1]
+        path = os.path.join(self.cache_dir, key + extension)
+
+        if self._hit(path):
+            return path
+
+        with entry_lock(path + ".lock"):
+            # Un autre processus a pu terminer le téléchargement pendant l'attente du verrou
+            if self._hit(path):
+                return path
+            self._evict(size)
+            self._download(object_path, size, path)
+        return path
+
+    def open(self, object_path: str, version: str = "") -> pa.MemoryMappedFile:
+        """Ouvre un objet du cache en memory-map (lecture seule)."""
+        for attempt in range(MAX_OPEN_ATTEMPTS):
+            path = self.fetch(object_path, version)
+            try:
+                # Une fois mappé, le fichier reste lisible même s'il est évincé
+                return pa.memory_map(path, 'r')
+            except FileNotFoundError:
+                if attempt == MAX_OPEN_ATTEMPTS - 1:
+                    raise
+                logger.info(f"Entrée du cache local évincée avant ouverture, nouvel essai: {path}")
+
+    def _hit(self, path: str) -> bool:
+        try:
+            # utime met mtime à jour : sert d'horloge LRU, indépendamment des montages noatime
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _download(self, object_path: str, size: int, path: str) -> None:
+        storage_client = get_storage_client()
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for offset in range(0, size, DOWNLOAD_CHUNK_SIZE):
+                    out.write(storage_client.download_range(object_path, offset, min(DOWNLOAD_CHUNK_SIZE, size - offset)))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.info(f"Dataset mis en cache local: {object_path} -> {path} ({size} bytes)")
+
+    def _evict(self, incoming: int) -> None:
+        evict_lru_entries(self.cache_dir, self.max_bytes, incoming)
+
+
+@contextmanager
+def entry_lock(lock_path: str) -> Iterator[None]:
+    """
+    Verrou exclusif (fcntl) sur le fichier lock_path.
+
+    Si le fichier a été supprimé pendant l'attente (éviction), le verrou obtenu
+    porte sur un fichier orphelin : il est repris sur le fichier courant.
+    """
+    while True:
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                current = os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            try:
+                if current:
+                    yield
+                    return
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _remove_lock_file(lock_path: str) -> None:
+    """Supprime un fichier de verrou s'il n'est pas tenu (un verrou en cours est laissé en place)."""
+    try:
+        fd = os.open(lock_path, os.O_WRONLY)
+    except FileNotFoundError:
+        return
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.remove(lock_path)
+    except (BlockingIOError, FileNotFoundError):
+        pass
+    finally:
+        os.close(fd)
+
+
+def evict_lru_entries(cache_dir: str, max_bytes: int, incoming: int) -> None:
+    """
+    Supprime les entrées les moins récemment utilisées (mtime) d'un répertoire de cache
+    jusqu'à pouvoir accueillir incoming octets sans dépasser max_bytes, ainsi que
+    leurs fichiers de verrou et ceux d'entrées absentes (téléchargement échoué).
+    """
+    entries = []
+    names = set(os.listdir(cache_dir))
+    for name in names:
+        if name.endswith(".lock"):
+            if name[:-len(".lock")] not in names:
+                _remove_lock_file(os.path.join(cache_dir, name))
+            continue
+        if name.endswith(".part"):
+            continue
+        full_path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, full_path))
+
+    used = sum(size for _, size, _ in entries)
+    for _, size, full_path in sorted(entries):
+        if used + incoming <= max_bytes:
+            break
+        try:
+            os.remove(full_path)
+            used -= size
+            logger.info(f"Éviction du cache local: {full_path}")
+        except FileNotFoundError:
+            continue
+        _remove_lock_file(full_path + ".lock")
+
+
+_local_dataset_store: Optional[LocalDatasetStore] = None
+
+
+def get_local_dataset_store() -> Optional[LocalDatasetStore]:
+    """Store local si LOCAL_DATASET_CACHE_DIR est configuré (workers), sinon None."""
+    global _local_dataset_store
+    if not settings.LOCAL_DATASET_CACHE_DIR:
+        return None
+    if _local_dataset_store is None:
+        _local_dataset_store = LocalDatasetStore(settings.LOCAL_DATASET_CACHE_DIR, settings.LOCAL_DATASET_CACHE_MAX_BYTES)
+    return _local_dataset_store
@@ -0,0 +1,214 @@
+"""
+Résolution des manifestes de datasets (storage_path + fichiers) auprès de service-selection.
+
+- session HTTP partagée (pool de connexions keep-alive, retries sur erreurs 5xx)
+- cache en mémoire TTL + LRU par processus
+- cache Redis optionnel partagé entre workers (MANIFEST_CACHE_REDIS_URL)
+- résolution groupée via POST /datasets/manifests
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Un dataset inconnu est mémorisé brièvement pour ne pas réinterroger le catalogue en boucle
+NEGATIVE_CACHE_TTL = 30
+REDIS_KEY_PREFIX = "ibis-x:manifest:"
+
+
+class DatasetManifestResolver:
+    """
+    Résout et met en cache les manifestes de datasets.
+
+    Un manifeste est un dict {'id', 'storage_path', 'updated_at', 'instances_number',
+    'features_number', 'files': [...]}, chaque fichier portant file_name_in_storage,
+    format, logical_role, size_bytes et row_count.
+    """
+
+    def __init__(self, base_url: str, ttl: int, max_entries: int, redis_url: Optional[str] = None):
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._redis = None
+
+    # --- Accès public ---
+
+    def get(self, dataset_id: str, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Manifeste d'un dataset, ou None s'il est inconnu / le catalogue injoignable."""
+        dataset_id = str(dataset_id)
+        if force_refresh:
+            self.invalidate(dataset_id)
+        return self.get_many([dataset_id]).get(dataset_id)
+
+    def get_many(self, dataset_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Manifestes de plusieurs datasets ; les inconnus sont absents du résultat."""
+        result: Dict[str, Dict[str, Any]] = {}
+        pending: List[str] = []
+
+        for dataset_id in dict.fromkeys(str(i) for i in dataset_ids):
+            hit, manifest = self._get_local(dataset_id)
+            if hit:
+                if manifest is not None:
+                    result[dataset_id] = manifest
+            else:
+                pending.append(dataset_id)
+
+        if pending:
+            for dataset_id, manifest in self._get_redis(pending).items():
+                self._set_local(dataset_id, manifest)
+                result[dataset_id] = manifest
+            pending = [i for i in pending if i not in result]
+
+        if pending:
+            fetched = self._fetch(pending)
+            if fetched is not None:
+                for dataset_id in pending:
+                    manifest = fetched.get(dataset_id)
+                    self._set_local(dataset_id, manifest)
+                    if manifest is not None:
+                        result[dataset_id] = manifest
+                self._set_redis(fetched)
+        return result
+
+    def invalidate(self, dataset_id: Optional[str] = None) -> None:
+        """Oublie un manifeste (ou tous), localement et dans Redis."""
+        with self._lock:
+            if dataset_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(str(dataset_id), None)
+
+        client = self._redis_client()
+        if client is not None and dataset_id is not None:
+            try:
+                client.delete(REDIS_KEY_PREFIX + str(dataset_id))
+            except Exception as e:
+                logger.warning(f"Invalidation Redis du manifeste {dataset_id} impossible: {str(e)}")
+
+    # --- Cache local TTL + LRU ---
+
+    def _get_local(self, dataset_id: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(dataset_id)
+            if entry is None:
+                return False, None
+            expires_at, manifest = entry
+            if expires_at < now:
+                del self._cache[dataset_id]
+                return False, None
+            self._cache.move_to_end(dataset_id)
+            return True, manifest
+
+    def _set_local(self, dataset_id: str, manifest: Optional[Dict[str, Any]]) -> None:
+        ttl = self.ttl if manifest is not None else NEGATIVE_CACHE_TTL
+        with self._lock:
+            self._cache[dataset_id] = (time.monotonic() + ttl, manifest)
+            self._cache.move_to_end(dataset_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    # --- Cache Redis partagé ---
+
+    def _redis_client(self):
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis
+
+    def _get_redis(self, dataset_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        client = self._redis_client()
+        if client is None:
+            return {}
+        try:
+            values = client.mget([REDIS_KEY_PREFIX + i for i in dataset_ids])
+        except Exception as e:
+            logger.warning(f"Lecture Redis des manifestes impossible: {str(e)}")
+            return {}
+        return {i: json.loads(v) for i, v in zip(dataset_ids, values) if v is not None}
+
+    def _set_redis(self, manifests: Dict[str, Dict[str, Any]]) -> None:
+        client = self._redis_client()
+        if client is None or not manifests:
+            return
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for dataset_id, manifest in manifests.items():
+                pipeline.setex(REDIS_KEY_PREFIX + dataset_id, self.ttl, json.dumps(manifest))
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Écriture Redis des manifestes impossible: {str(e)}")
+
+    # --- Appels à service-selection ---
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            retry = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+                          allowed_methods=frozenset(['GET', 'POST']))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    def _fetch(self, dataset_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Interroge service-selection ; None si le catalogue est injoignable
+        (rien n'est alors mis en cache négatif).
+        """
+        try:
+            response = self.session.post(f"{self.base_url}/datasets/manifests",
+                                         json={"dataset_ids": dataset_ids}, timeout=10)
+            if response.status_code in (404, 405):
+                # service-selection antérieur à l'endpoint groupé
+                return self._fetch_one_by_one(dataset_ids)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"service-selection injoignable pour les manifestes {dataset_ids}: {str(e)}")
+            return None
+
+        return {str(m['id']): m for m in response.json().get('manifests', [])}
+
+    def _fetch_one_by_one(self, dataset_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        manifests = {}
+        for dataset_id in dataset_ids:
+            response = self.session.get(f"{self.base_url}/datasets/{dataset_id}", timeout=10)
+            if response.status_code == 200:
+                dataset = response.json()
+                manifests[dataset_id] = {
+                    'id': dataset_id,
+                    'storage_path': dataset.get('storage_path'),
+                    'updated_at': dataset.get('updated_at'),
+                    'instances_number': dataset.get('instances_number'),
+                    'features_number': dataset.get('features_number'),
+                    'files': dataset.get('files', [])
+                }
+        return manifests
+
+
+# Instance globale (une par processus, partagée par les requêtes et les tâches Celery)
+manifest_resolver = DatasetManifestResolver(
+    base_url=settings.SERVICE_SELECTION_URL,
+    ttl=settings.MANIFEST_CACHE_TTL,
+    max_entries=settings.MANIFEST_CACHE_MAX_ENTRIES,
+    redis_url=settings.MANIFEST_CACHE_REDIS_URL
+)
@@ -0,0 +1,112 @@
+"""
+Classes de charge des tâches Celery et des pools de workers.
+
+Deux pools de workers consomment des files distinctes :
+
+- light (CELERY_WORKER_CLASS=light) : analyses de qualité (data_quality_queue) et
+  petits entraînements (ml_light_queue). Les processus prefork sont réutilisés
+  (ML_LIGHT_WORKER_MAX_TASKS_PER_CHILD) : une tâche de quelques secondes ne paie
+  ni le fork ni les imports de scikit-learn et pandas.
+- heavy (CELERY_WORKER_CLASS=heavy, défaut) : entraînements volumineux et
+  recherches d'hyperparamètres (ml_queue), processus recyclé après chaque tâche
+  pour rendre la mémoire.
+
+Une tâche courte n'attend ainsi jamais derrière un entraînement de deux heures.
+L'entraînement est routé à la création de l'expérience d'après la taille du
+dataset connue du catalogue (manifeste) ; une taille inconnue part en heavy.
+"""
+
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.manifests import manifest_resolver
+
+logger = logging.getLogger(__name__)
+
+HEAVY_QUEUE = 'ml_queue'
+LIGHT_QUEUE = 'ml_light_queue'
+DATA_QUALITY_QUEUE = 'data_quality_queue'
+
+# Files consommées par chaque classe de worker (--queues des déploiements)
+WORKER_CLASSES = {
+    'heavy': [HEAVY_QUEUE],
+    'light': [DATA_QUALITY_QUEUE, LIGHT_QUEUE]
+}
+
+
+def worker_class() -> str:
+    """Classe du worker courant (CELERY_WORKER_CLASS), heavy si la valeur est inconnue."""
+    value = (settings.CELERY_WORKER_CLASS or 'heavy').lower()
+    if value not in WORKER_CLASSES:
+        logger.warning(f"CELERY_WORKER_CLASS inconnue ({value}) : worker heavy")
+        return 'heavy'
+    return value
+
+
+def worker_max_tasks_per_child() -> int:
+    """Tâches exécutées par un processus avant son remplacement."""
+    if worker_class() == 'light':
+        return settings.ML_LIGHT_WORKER_MAX_TASKS_PER_CHILD
+    return settings.ML_HEAVY_WORKER_MAX_TASKS_PER_CHILD
+
+
+def worker_max_memory_per_child() -> int:
+    """Mémoire résidente (KiB) d'un processus au-delà de laquelle il est remplacé après sa tâche."""
+    if worker_class() == 'light':
+        return settings.ML_LIGHT_WORKER_MAX_MEMORY_PER_CHILD_KB
+    return settings.ML_HEAVY_WORKER_MAX_MEMORY_PER_CHILD_KB
+
+
+def dataset_shape(dataset_id: str) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """
+    Taille d'un dataset d'après son manifeste, sans lire le fichier.
+
+    Returns:
+        (lignes, colonnes, octets du fichier principal), None pour chaque valeur inconnue
+    """
+    # Import local : dataset_loader dépend de pyarrow, inutile au démarrage du worker
+    from app.ml.dataset_loader import select_main_file
+
+    manifest = manifest_resolver.get(dataset_id)
+    if not manifest:
+        return None, None, None
+    main_file = select_main_file(manifest) or {}
+    rows = main_file.get('row_count') or manifest.get('instances_number')
+    return rows, manifest.get('features_number'), main_file.get('size_bytes')
+
+
+def training_workload(dataset_id: str, search_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Classe de charge d'un entraînement.
+
+    Returns:
+        {'workload': 'light' | 'heavy', 'queue', 'rows', 'columns', 'reason'}
+    """
+    try:
+        rows, columns, size_bytes = dataset_shape(dataset_id)
+    except Exception as e:
+        logger.warning(f"Taille du dataset {dataset_id} inconnue: {str(e)}")
+        rows, columns, size_bytes = None, None, None
+
+    def decision(workload: str, reason: str) -> Dict[str, Any]:
+        return {
+            'workload': workload,
+            'queue': LIGHT_QUEUE if workload == 'light' else HEAVY_QUEUE,
+            'rows': rows,
+            'columns': columns,
+            'reason': reason
+        }
+
+    if search_config:
+        return decision('heavy', 'hyperparameter_search')
+    if rows is None:
+        return decision('heavy', 'unknown_size')
+    if rows > settings.LIGHT_TRAINING_MAX_ROWS:
+        return decision('heavy', 'rows')
+    if columns is not None:
+        if rows * columns > settings.LIGHT_TRAINING_MAX_CELLS:
+            return decision('heavy', 'cells')
+    elif size_bytes is None or size_bytes > settings.LIGHT_TRAINING_MAX_BYTES:
+        return decision('heavy', 'bytes')
+    return decision('light', 'small_dataset')
@@ -1,9 +1,13 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, status, Header, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Request, Query
 import io
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 import time
+import asyncio
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -12,17 +16,34 @@ import sys
 import os
 import pandas as pd
 import uuid
+import json
+import hmac
 
 from app.core.config import settings
-from app.database import engine, get_db, Base
-from app.models import Experiment, DataQualityAnalysis as DataQualityAnalysisModel
+from app.database import engine, get_db, Base, SessionLocal
+from app.models import Experiment
 from app.schemas import (
     ExperimentCreate, ExperimentRead, ExperimentStatus, 
     ExperimentResults, AlgorithmInfo, DataQualityAnalysisRequest,
-    DataQualityAnalysis, PreprocessingStrategyRequest, PreprocessingStrategy
+    DataQualityAnalysis, PreprocessingStrategyRequest, PreprocessingStrategy,
+    PredictionRequest, PredictionResponse, DataQualityPrecomputeRequest,
+    DataQualityBackfillRequest, DataQualityJob
 )
 from app.tasks import train_model
 from app.core.celery_app import celery_app
+from app.core.events import publish_experiment_event, stream_experiment_events, TERMINAL_STATUSES
+from common.storage_client import get_storage_client
+from app.ml.tree_structure import deserialize_tree_arrays, build_nested_tree, DEFAULT_MAX_NODES
+from app.ml.serving import get_prediction_service
+from app.ml.data_quality_cache import (
+    analysis_cache_key, find_cached_analysis, sweep_expired_analyses, suggested_target_column,
+    DEFAULT_SAMPLE_SIZE, WIZARD_SAMPLE_SIZE
+)
+from app.core.data_quality_jobs import submit_analysis_job, analysis_job_status
+from app.core.workloads import training_workload, HEAVY_QUEUE, LIGHT_QUEUE, DATA_QUALITY_QUEUE
+from app.scheduler import experiment_scheduler, user_tier
+from app.model_registry import list_model_versions, latest_model_version, user_model_storage_bytes, model_version_to_dict
+from pydantic import ValidationError
 
 # Configure logging
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
@@ -31,12 +52,41 @@ logger = logging.getLogger(__name__)
 # Database tables are managed by Alembic migrations
 # Base.metadata.create_all(bind=engine)  # Removed - causes startup issues
 
+def _sweep_data_quality_cache() -> None:
+    db = SessionLocal()
+    try:
+        sweep_expired_analyses(db)
+    finally:
+        db.close()
+
+async def _scheduler_pump():
+    """Passe périodique de l'ordonnanceur (expériences absentes de Redis, créneaux libérés pendant une autre passe, workers perdus)"""
+    while True:
+        try:
+            await run_in_threadpool(experiment_scheduler.pump)
+        except Exception as e:
+            logger.warning(f"Passe de l'ordonnanceur impossible: {str(e)}")
+        await asyncio.sleep(settings.SCHEDULER_PUMP_INTERVAL)
+
+async def _data_quality_cache_sweeper():
+    """Purge périodique des analyses de qualité expirées (requête DELETE indexée sur expires_at)"""
+    while True:
+        try:
+            await run_in_threadpool(_sweep_data_quality_cache)
+        except Exception as e:
+            logger.warning(f"Purge du cache de qualité des données impossible: {str(e)}")
+        await asyncio.sleep(settings.DATA_QUALITY_CACHE_SWEEP_INTERVAL)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("ML Pipeline service starting up...")
+    sweeper = asyncio.create_task(_data_quality_cache_sweeper())
+    pump = asyncio.create_task(_scheduler_pump())
     yield
     # Shutdown
+    sweeper.cancel()
+    pump.cancel()
     logger.info("ML Pipeline service shutting down...")
 
 app = FastAPI(
@@ -107,6 +157,31 @@ def get_current_user_id(x_user_id: str = Header(..., alias="X-User-ID")) -> uuid
             detail="Missing or invalid X-User-ID header"
         )
 
+def get_current_user_tier(
+    x_user_role: Optional[str] = Header(None, alias="X-User-Role"),
+    x_user_credits: Optional[str] = Header(None, alias="X-User-Credits")
+) -> str:
+    """Niveau de priorité de l'utilisateur pour l'ordonnanceur (rôle et crédits transmis par l'API Gateway)"""
+    try:
+        credits = int(x_user_credits) if x_user_credits is not None else None
+    except ValueError:
+        credits = None
+    return user_tier(x_user_role, credits)
+
+def require_internal_service(x_internal_token: Optional[str] = Header(None, alias="X-Internal-Token")) -> None:
+    """
+    Réserve un endpoint aux autres services (jeton INTERNAL_SERVICE_TOKEN).
+    
+    Ces endpoints ne sont pas destinés aux utilisateurs : sans jeton configuré,
+    ils sont refusés.
+    """
+    expected = settings.INTERNAL_SERVICE_TOKEN
+    if not expected or not x_internal_token or not hmac.compare_digest(x_internal_token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Endpoint réservé aux appels de service à service"
+        )
+
 @app.get("/")
 def read_root():
     return {"service": "ML Pipeline", "status": "operational"}
@@ -218,16 +293,22 @@ def celery_status():
             db = int(port_db[1]) if len(port_db) > 1 else 0
             
             r = redis.Redis(host=host, port=port, db=db)
-            queue_length = r.llen('ml_queue')
+            # Avec les priorités Redis, chaque file est répartie sur une liste par niveau de priorité
+            queue_lengths = {
+                queue: sum(r.llen(queue if step == 0 else f"{queue}\x06\x16{step}") for step in (0, 3, 6, 9))
+                for queue in (HEAVY_QUEUE, LIGHT_QUEUE, DATA_QUALITY_QUEUE)
+            }
         else:
-            queue_length = -1
+            queue_lengths = {}
         
         return {
             "celery_status": "connected",
             "active_workers": list(active_workers.keys()) if active_workers else [],
             "worker_stats": stats,
             "active_queues": queues,
-            "ml_queue_length": queue_length
+            "ml_queue_length": queue_lengths.get(HEAVY_QUEUE, -1),
+            "queue_lengths": queue_lengths,
+            "scheduler": experiment_scheduler.stats()
         }
     except Exception as e:
         logger.error(f"Error checking Celery status: {str(e)}")
@@ -240,9 +321,15 @@ def celery_status():
 def create_experiment(
     experiment: ExperimentCreate,
     db: Session = Depends(get_db),
-    current_user_id: uuid.UUID = Depends(get_current_user_id)
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    tier: str = Depends(get_current_user_tier)
 ):
-    """Create a new ML experiment and queue training task"""
+    """
+    Create a new ML experiment and queue training task
+    
+    L'expérience est créée au statut 'queued' et confiée à l'ordonnanceur équitable
+    (app/scheduler.py), qui l'envoie aux workers quand un créneau se libère.
+    """
     try:
         # Validation de sécurité supplémentaire
         if not experiment.dataset_id:
@@ -257,16 +344,16 @@ def create_experiment(
                 detail="Project ID is required"
             )
         
-        # Vérifier que l'utilisateur n'a pas trop d'expériences en cours
-        active_experiments = db.query(Experiment).filter(
+        # Quota quotidien (24h glissantes) ; la concurrence est réglée par l'ordonnanceur
+        experiments_last_24h = db.query(Experiment).filter(
             Experiment.user_id == current_user_id,
-            Experiment.status.in_(['pending', 'running'])
+            Experiment.created_at >= datetime.utcnow() - timedelta(hours=24)
         ).count()
         
-        if active_experiments >= 5:  # Limite de 5 expériences simultanées
+        if experiments_last_24h >= settings.EXPERIMENT_QUOTA_PER_DAY:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many active experiments. Please wait for some to complete."
+                detail=f"Daily experiment quota reached ({settings.EXPERIMENT_QUOTA_PER_DAY} per 24h)."
             )
         
         logger.info(f"Creating experiment with data: {experiment.dict()}")
@@ -279,7 +366,8 @@ def create_experiment(
             algorithm=experiment.algorithm,
             hyperparameters=experiment.hyperparameters,
             preprocessing_config=experiment.preprocessing_config,
-            status="pending",
+            search_config=experiment.search_config.dict() if experiment.search_config else None,
+            status="queued",
             progress=0
         )
         db.add(db_experiment)
@@ -288,20 +376,32 @@ def create_experiment(
         
         logger.info(f"Created experiment in DB with ID: {db_experiment.id}")
         
-        # Queue training task
-        logger.info(f"Queueing training task for experiment {db_experiment.id}")
-        task = train_model.apply_async(
-            args=[str(db_experiment.id)],
-            queue='ml_queue'
-        )
-        
-        logger.info(f"Task queued with ID: {task.id}")
+        # Queue training task : petits datasets sur les workers light, le reste sur ml_queue
+        workload = training_workload(str(experiment.dataset_id), db_experiment.search_config)
+        logger.info(f"Queueing training task for experiment {db_experiment.id} on {workload['queue']} "
+                    f"({workload['reason']}, rows={workload['rows']}, columns={workload['columns']}, tier={tier})")
+        queue_position = None
+        try:
+            cost = settings.SCHEDULER_SEARCH_COST if db_experiment.search_config else 1.0
+            queue_position = experiment_scheduler.submit(db_experiment.id, current_user_id, workload['queue'],
+                                                         tier=tier, cost=cost)
+        except Exception as scheduler_error:
+            # Ordonnanceur indisponible : envoi direct à Celery
+            logger.warning(f"Scheduler unavailable, queueing directly: {str(scheduler_error)}")
+            db_experiment.status = 'pending'
+            db.commit()
+            task = train_model.apply_async(args=[str(db_experiment.id)], queue=workload['queue'])
+            db_experiment.task_id = task.id
+            db.commit()
         
-        # Update experiment with task ID
-        db_experiment.task_id = task.id
-        db.commit()
+        db.refresh(db_experiment)
+        if queue_position:
+            publish_experiment_event(str(db_experiment.id), status='queued', progress=0, stage='queued',
+                                     message=f"En attente d'un créneau (position {queue_position})",
+                                     algorithm=db_experiment.algorithm, queue_position=queue_position)
         
-        logger.info(f"Successfully created experiment {db_experiment.id} with task {task.id}")
+        logger.info(f"Successfully created experiment {db_experiment.id} "
+                    f"(status {db_experiment.status}, task {db_experiment.task_id}, position {queue_position})")
         
         # Log d'audit de sécurité
         logger.info(f"[SECURITY] User {current_user_id} created experiment {db_experiment.id} with algorithm {experiment.algorithm}")
@@ -309,7 +409,9 @@ def create_experiment(
         # Métriques dans les logs
         logger.info(f"[METRICS] Experiment created - Algorithm: {experiment.algorithm} - User: {current_user_id}")
         
-        return db_experiment
+        return ExperimentRead.model_validate(db_experiment).model_copy(update={'queue_position': queue_position})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating experiment: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -342,14 +444,9 @@ def get_experiment_status(
             task = celery_app.AsyncResult(experiment.task_id)
             logger.debug(f"Celery task state for {experiment.task_id}: {task.state}")
             
-            # Seulement mettre à jour si Celery indique un état plus avancé
-            if task.state == 'PROGRESS':
-                task_progress = task.info.get('current', 0) if task.info else 0
-                if task_progress > 0:
-                    experiment.status = 'running'
-                    experiment.progress = task_progress
-                    logger.info(f"[SYNC] Updated from Celery: {task_progress}%")
-            elif task.state == 'SUCCESS':
+            # Seulement mettre à jour si Celery indique un état terminal
+            # (la progression passe par la base et les événements, plus par update_state)
+            if task.state == 'SUCCESS':
                 experiment.status = 'completed'
                 experiment.progress = 100
                 logger.info(f"[SYNC] Updated from Celery: completed")
@@ -361,16 +458,79 @@ def get_experiment_status(
             logger.error(f"Error getting task status: {str(e)}")
             # En cas d'erreur Celery, garder l'état de la BDD
     
+    # Position dans la file de l'ordonnanceur tant que l'expérience attend un créneau
+    queue_position = None
+    if experiment.status == 'queued':
+        try:
+            queue_position = experiment_scheduler.position(experiment_id)
+        except Exception as e:
+            logger.warning(f"Queue position unavailable for {experiment_id}: {str(e)}")
+    
     return ExperimentStatus(
         id=experiment.id,
         status=experiment.status,
         progress=experiment.progress,
         algorithm=experiment.algorithm,  # ⚠️ FIX : Ajouter l'algorithme manquant
         error_message=experiment.error_message,
+        queue_position=queue_position,
         created_at=experiment.created_at,
         updated_at=experiment.updated_at
     )
 
+def _format_sse(event: dict) -> str:
+    """Sérialise un événement au format Server-Sent Events"""
+    return f"event: progress\ndata: {json.dumps(event, default=str)}\n\n"
+
+@app.get("/experiments/{experiment_id}/events")
+def stream_experiment_progress(experiment_id: str):
+    """
+    Flux SSE des étapes d'entraînement d'une expérience.
+    
+    Le premier événement reflète l'état en base ; les suivants sont relayés depuis
+    le pub/sub Redis alimenté par le worker. Le flux se ferme au statut terminal.
+    Le rythme d'affichage des étapes est laissé au client.
+    
+    La session n'est pas une dépendance (Depends(get_db)) : sa fermeture n'aurait
+    lieu qu'à la fin du flux et chaque client garderait une connexion du pool
+    pendant tout l'entraînement. Elle est fermée dès la lecture de l'état initial.
+    """
+    db = SessionLocal()
+    try:
+        experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        if not experiment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Experiment not found"
+            )
+        
+        snapshot = {
+            'experiment_id': str(experiment.id),
+            'status': experiment.status,
+            'progress': experiment.progress,
+            'stage': 'snapshot',
+            'algorithm': experiment.algorithm,
+            'message': experiment.error_message,
+            'timestamp': (experiment.updated_at or experiment.created_at).isoformat()
+        }
+    finally:
+        db.close()
+    
+    async def event_stream():
+        yield _format_sse(snapshot)
+        if snapshot['status'] in TERMINAL_STATUSES:
+            return
+        async for event in stream_experiment_events(experiment_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield _format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/experiments/{experiment_id}/force-complete")
 def force_complete_experiment(
     experiment_id: str,
@@ -436,6 +596,7 @@ def get_experiment_results(
         model_uri=experiment.artifact_uri,
         visualizations=experiment.visualizations or {},
         feature_importance=experiment.feature_importance or {},
+        search_results=experiment.search_results,
         created_at=experiment.created_at,
         completed_at=experiment.updated_at
     )
@@ -482,6 +643,137 @@ async def get_visualization_image(
             detail=f"Error retrieving visualization: {str(e)}"
         )
 
+@app.get("/experiments/{experiment_id}/tree-structure")
+def get_tree_structure(
+    experiment_id: str,
+    max_depth: Optional[int] = Query(None, ge=1, le=100),
+    max_nodes: int = Query(DEFAULT_MAX_NODES, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Structure d'arbre reconstruite depuis l'artefact complet, avec d'autres plafonds
+    de profondeur et de nœuds que la vue stockée dans experiment.visualizations.
+    """
+    experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+    if not experiment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found"
+        )
+    
+    tree_view = (experiment.visualizations or {}).get('tree_structure') or {}
+    tree_path = tree_view.get('metadata', {}).get('full_structure_uri')
+    if not tree_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No tree structure stored for this experiment"
+        )
+    
+    try:
+        arrays = deserialize_tree_arrays(get_storage_client().download_file(tree_path))
+    except Exception as e:
+        logger.error(f"Error loading tree structure for experiment {experiment_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error retrieving tree structure: {str(e)}"
+        )
+    
+    # Les forêts affichent un arbre représentatif avec des libellés courts
+    is_forest = 'tree_index' in tree_view['metadata']
+    structure = build_nested_tree(arrays, max_depth=max_depth, max_nodes=max_nodes, short_labels=is_forest)
+    structure['metadata'].update({
+        key: tree_view['metadata'][key]
+        for key in ('tree_index', 'n_estimators', 'note', 'full_structure_uri')
+        if key in tree_view['metadata']
+    })
+    return structure
+
+PARQUET_CONTENT_TYPES = ('application/vnd.apache.parquet', 'application/x-parquet', 'application/octet-stream')
+
+async def _read_prediction_input(request: Request):
+    """
+    Lignes à prédire : JSON {"records", "return_probabilities"}, fichier Parquet en
+    multipart (champ "file", transmis tel quel par l'API Gateway) ou corps Parquet brut.
+    """
+    content_type = request.headers.get('content-type', '')
+    try:
+        if content_type.startswith('multipart/'):
+            form = await request.form()
+            upload = form.get('file')
+            if upload is None or not hasattr(upload, 'read'):
+                raise ValueError("Multipart requests must contain a Parquet 'file' field")
+            df = pd.read_parquet(io.BytesIO(await upload.read()))
+            return df, str(form.get('return_probabilities', 'false')).lower() == 'true'
+        if content_type.startswith(PARQUET_CONTENT_TYPES):
+            df = pd.read_parquet(io.BytesIO(await request.body()))
+            return df, request.query_params.get('return_probabilities', 'false').lower() == 'true'
+        payload = PredictionRequest.model_validate_json(await request.body())
+        return pd.DataFrame.from_records(payload.records), payload.return_probabilities
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors())
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid prediction input: {str(e)}")
+
+@app.post("/experiments/{experiment_id}/predict", response_model=PredictionResponse)
+async def predict(
+    experiment_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user_id: uuid.UUID = Depends(get_current_user_id)
+):
+    """
+    Prédictions avec le modèle d'une expérience terminée.
+    
+    Les modèles chargés restent en cache mémoire (LRU) et les petites requêtes
+    simultanées sur un même modèle sont regroupées en un seul appel au modèle.
+    Les classes prédites sont les valeurs d'origine de la cible (décodées si elle a été encodée).
+    """
+    experiment = db.query(Experiment).filter(
+        Experiment.id == experiment_id,
+        Experiment.user_id == current_user_id
+    ).first()
+    if not experiment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found or access denied"
+        )
+    if experiment.status != 'completed' or not experiment.artifact_uri:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Experiment has no trained model. Current status: {experiment.status}"
+        )
+    
+    df, return_probabilities = await _read_prediction_input(request)
+    if len(df) == 0 or len(df) > settings.PREDICTION_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 1 and {settings.PREDICTION_MAX_ROWS} rows are accepted per request"
+        )
+    target_column = (experiment.preprocessing_config or {}).get('target_column')
+    if target_column in df.columns:
+        df = df.drop(columns=[target_column])
+    
+    started = time.perf_counter()
+    try:
+        result = await get_prediction_service().predict(experiment.artifact_uri, df, return_probabilities)
+    except Exception as e:
+        logger.error(f"Prediction failed for experiment {experiment_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+    
+    probabilities = result.get('probabilities')
+    return PredictionResponse(
+        experiment_id=experiment.id,
+        model_uri=experiment.artifact_uri,
+        n_rows=len(df),
+        predictions=result['predictions'].tolist(),
+        probabilities=probabilities.tolist() if probabilities is not None else None,
+        classes=result.get('classes'),
+        duration_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
+
 @app.get("/algorithms", response_model=List[AlgorithmInfo])
 def get_available_algorithms():
     """Get list of available algorithms and their configurations"""
@@ -556,6 +848,154 @@ def get_available_algorithms():
                     "description": "Whether bootstrap samples are used when building trees"
                 }
             }
+        ),
+        AlgorithmInfo(
+            name="extra_trees",
+            display_name="Extra Trees",
+            description="An ensemble of randomized decision trees; faster to train than a random forest",
+            supports_classification=True,
+            supports_regression=True,
+            hyperparameters={
+                "n_estimators": {
+                    "type": "number",
+                    "min": 10,
+                    "max": 500,
+                    "default": 100,
+                    "description": "Number of trees in the forest"
+                },
+                "max_depth": {
+                    "type": "number",
+                    "min": 1,
+                    "max": 50,
+                    "default": 10,
+                    "description": "Maximum depth of the trees"
+                },
+                "min_samples_split": {
+                    "type": "number",
+                    "min": 2,
+                    "max": 100,
+                    "default": 2,
+                    "description": "Minimum samples required to split an internal node"
+                },
+                "min_samples_leaf": {
+                    "type": "number",
+                    "min": 1,
+                    "max": 50,
+                    "default": 1,
+                    "description": "Minimum samples required to be at a leaf node"
+                }
+            }
+        ),
+        AlgorithmInfo(
+            name="hist_gradient_boosting",
+            display_name="Histogram Gradient Boosting",
+            description="Gradient boosted trees on binned features; fast on large tabular data and handles missing values natively",
+            supports_classification=True,
+            supports_regression=True,
+            hyperparameters={
+                "learning_rate": {
+                    "type": "number",
+                    "min": 0.001,
+                    "max": 1,
+                    "default": 0.1,
+                    "description": "Shrinkage applied to each tree"
+                },
+                "max_iter": {
+                    "type": "number",
+                    "min": 10,
+                    "max": 1000,
+                    "default": 100,
+                    "description": "Maximum number of boosting iterations"
+                },
+                "max_leaf_nodes": {
+                    "type": "number",
+                    "min": 2,
+                    "max": 256,
+                    "default": 31,
+                    "description": "Maximum number of leaves per tree"
+                },
+                "l2_regularization": {
+                    "type": "number",
+                    "min": 0,
+                    "max": 10,
+                    "default": 0,
+                    "description": "L2 regularization of leaf values"
+                }
+            }
+        ),
+        AlgorithmInfo(
+            name="logistic_regression",
+            display_name="Linear Model",
+            description="Logistic regression (saga solver) or ridge regression (auto solver); supports sparse features",
+            supports_classification=True,
+            supports_regression=True,
+            hyperparameters={
+                "penalty": {
+                    "type": "select",
+                    "options": ["l2", "l1", "elasticnet"],
+                    "default": "l2",
+                    "description": "Regularization term (classification)"
+                },
+                "C": {
+                    "type": "number",
+                    "min": 0.001,
+                    "max": 100,
+                    "default": 1.0,
+                    "description": "Inverse of regularization strength"
+                },
+                "max_iter": {
+                    "type": "number",
+                    "min": 100,
+                    "max": 5000,
+                    "default": 1000,
+                    "description": "Maximum number of solver iterations"
+                }
+            }
+        ),
+        AlgorithmInfo(
+            name="sgd",
+            display_name="SGD Linear Model",
+            description="A linear model trained by stochastic gradient descent; trains in batches on datasets larger than memory",
+            supports_classification=True,
+            supports_regression=True,
+            hyperparameters={
+                "penalty": {
+                    "type": "select",
+                    "options": ["l2", "l1", "elasticnet"],
+                    "default": "l2",
+                    "description": "Regularization term"
+                },
+                "alpha": {
+                    "type": "number",
+                    "min": 0.000001,
+                    "max": 1,
+                    "default": 0.0001,
+                    "description": "Regularization strength"
+                },
+                "max_iter": {
+                    "type": "number",
+                    "min": 1,
+                    "max": 1000,
+                    "default": 1000,
+                    "description": "Maximum number of passes over the data (in-memory training)"
+                }
+            }
+        ),
+        AlgorithmInfo(
+            name="naive_bayes",
+            display_name="Naive Bayes",
+            description="Gaussian Naive Bayes classifier; trains in batches on datasets larger than memory",
+            supports_classification=True,
+            supports_regression=False,
+            hyperparameters={
+                "var_smoothing": {
+                    "type": "number",
+                    "min": 1e-12,
+                    "max": 1,
+                    "default": 1e-9,
+                    "description": "Portion of the largest variance added to variances for stability"
+                }
+            }
         )
     ]
     return algorithms
@@ -597,7 +1037,7 @@ def cancel_experiment(
                 detail="Experiment not found or access denied"
             )
         
-        if experiment.status not in ['pending', 'running']:
+        if experiment.status not in ['queued', 'pending', 'running']:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Cannot cancel experiment in {experiment.status} state"
@@ -611,11 +1051,20 @@ def cancel_experiment(
             except Exception as celery_error:
                 logger.warning(f"Could not cancel Celery task: {str(celery_error)}")
         
+        # Retirer l'expérience de la file d'attente ou libérer son créneau
+        try:
+            experiment_scheduler.release(experiment_id)
+        except Exception as scheduler_error:
+            logger.warning(f"Could not release scheduler slot: {str(scheduler_error)}")
+        
         # Mettre à jour le statut
         experiment.status = 'cancelled'
         experiment.error_message = f"Cancelled by user at {datetime.utcnow()}"
         experiment.updated_at = datetime.utcnow()
         db.commit()
+        publish_experiment_event(experiment_id, status='cancelled', progress=experiment.progress or 0,
+                                 stage='cancelled', message=experiment.error_message,
+                                 algorithm=experiment.algorithm)
         
         logger.info(f"[SECURITY] User {current_user_id} cancelled experiment {experiment_id}")
         logger.info(f"[AUDIT] Experiment {experiment_id} cancelled by user {current_user_id}")
@@ -631,86 +1080,66 @@ def cancel_experiment(
             detail=f"Error cancelling experiment: {str(e)}"
         )
 
-@app.post("/data-quality/analyze", response_model=DataQualityAnalysis)
+def _cached_analysis_to_schema(cached_analysis) -> DataQualityAnalysis:
+    """Analyse en cache (ligne data_quality_analyses) au format de l'API"""
+    return DataQualityAnalysis(
+        dataset_overview=cached_analysis.analysis_data['dataset_overview'],
+        column_types=cached_analysis.analysis_data['column_types'],
+        missing_data_analysis=cached_analysis.analysis_data['missing_data_analysis'],
+        outliers_analysis=cached_analysis.analysis_data['outliers_analysis'],
+        data_quality_score=cached_analysis.quality_score,
+        preprocessing_recommendations=cached_analysis.analysis_data['preprocessing_recommendations']
+    )
+
+@app.post("/data-quality/analyze", response_model=DataQualityAnalysis,
+          responses={202: {"model": DataQualityJob}})
 def analyze_data_quality(
     request: DataQualityAnalysisRequest,
     db: Session = Depends(get_db),
     current_user_id: uuid.UUID = Depends(get_current_user_id)
 ):
-    """Analyser la qualité des données d'un dataset avec système de cache"""
-    import pandas as pd
-    import time
+    """
+    Analyser la qualité des données d'un dataset avec système de cache.
+    
+    Servie depuis le cache si possible ; sinon l'analyse est soumise en priorité
+    interactive sur la file data_quality_queue et la réponse 202 donne le job à
+    suivre via GET /data-quality/jobs/{job_id}.
+    """
     from app.ml.preprocessing import analyze_dataset_quality
-    from common.storage_client import StorageClient
+    from app.ml.dataset_loader import DatasetLoadError
     
     try:
-        # 1. Vérifier si on a déjà une analyse en cache
-        cached_analysis = db.query(DataQualityAnalysisModel).filter(
-            DataQualityAnalysisModel.dataset_id == request.dataset_id,
-            DataQualityAnalysisModel.expires_at > datetime.utcnow()
-        ).order_by(DataQualityAnalysisModel.created_at.desc()).first()
+        # 1. Clé de cache : contenu du fichier (ETag), cible, échantillon, options, version de l'analyseur
+        try:
+            cache_key, _ = analysis_cache_key(
+                request.dataset_id, request.target_column, request.sample_size, bool(request.isolation_forest)
+            )
+        except DatasetLoadError:
+            # Dataset introuvable : analyse des données de démonstration, jamais mise en cache
+            cache_key = None
         
+        cached_analysis = find_cached_analysis(db, cache_key) if cache_key else None
         if cached_analysis and not request.force_refresh:
             logger.info(f"Utilisation du cache pour l'analyse du dataset {request.dataset_id}")
             # Retourner l'analyse depuis le cache
-            return DataQualityAnalysis(
-                dataset_overview=cached_analysis.analysis_data['dataset_overview'],
-                column_types=cached_analysis.analysis_data['column_types'],
-                missing_data_analysis=cached_analysis.analysis_data['missing_data_analysis'],
-                outliers_analysis=cached_analysis.analysis_data['outliers_analysis'],
-                data_quality_score=cached_analysis.quality_score,
-                preprocessing_recommendations=cached_analysis.analysis_data['preprocessing_recommendations']
+            return _cached_analysis_to_schema(cached_analysis)
+        
+        # 2. Sinon, calcul par un worker (un seul job par clé de cache)
+        if cache_key:
+            job_id, deduplicated = submit_analysis_job(
+                request.dataset_id, request.target_column, request.sample_size,
+                bool(request.isolation_forest), priority='interactive',
+                cache_key=cache_key, force=bool(request.force_refresh)
             )
+            job = DataQualityJob(job_id=job_id, status='queued',
+                                 status_url=f"/data-quality/jobs/{job_id}", deduplicated=deduplicated)
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.model_dump(exclude_none=True))
         
-        # 2. Sinon, effectuer l'analyse
-        logger.info(f"Nouvelle analyse pour le dataset {request.dataset_id}")
-        start_time = time.time()
-        
-        # Charger un échantillon du dataset pour l'analyse
-        sample_data = _load_dataset_sample(request.dataset_id, request.sample_size)
-        
-        # Effectuer l'analyse de qualité
-        analysis_result = analyze_dataset_quality(sample_data, request.target_column)
-        
-        # Calculer le temps d'analyse
-        analysis_duration = time.time() - start_time
-        
-        # 3. Sauvegarder en cache avec nettoyage JSON
-        import json
-        
-        # Nettoyer les NaN du résultat d'analyse avant sauvegarde
-        import numpy as np  # Import manquant ajouté
-        
-        def clean_nan_for_json(obj):
-            """Remplace récursivement les NaN, Infinity par des valeurs sérialisables"""
-            if isinstance(obj, dict):
-                return {k: clean_nan_for_json(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [clean_nan_for_json(item) for item in obj]
-            elif isinstance(obj, float):
-                if np.isnan(obj):
-                    return None
-                elif np.isinf(obj):
-                    return 999999.0 if obj > 0 else -999999.0  # Remplacer ±Infinity par des valeurs finies
-                else:
-                    return obj
-            return obj
-        
-        cleaned_analysis = clean_nan_for_json(analysis_result)
-        cleaned_strategies = clean_nan_for_json(analysis_result.get('preprocessing_recommendations', {}).get('missing_values_strategy', {}))
-        
-        new_analysis = DataQualityAnalysisModel(
-            dataset_id=request.dataset_id,
-            analysis_data=cleaned_analysis,
-            column_strategies=cleaned_strategies,
-            quality_score=analysis_result['data_quality_score'],
-            total_rows=analysis_result['dataset_overview']['total_rows'],
-            total_columns=analysis_result['dataset_overview']['total_columns'],
-            analysis_duration_seconds=analysis_duration,
-            expires_at=datetime.utcnow() + timedelta(days=7)  # Cache pour 7 jours
-        )
-        db.add(new_analysis)
-        db.commit()
+        # 3. Données de démonstration : analyse immédiate d'un petit échantillon
+        logger.info(f"Analyse des données de démonstration pour le dataset {request.dataset_id}")
+        sample_data = _load_dataset_sample(request.dataset_id, request.sample_size, request.target_column)
+        analysis_result = analyze_dataset_quality(sample_data, request.target_column,
+                                                  isolation_forest=bool(request.isolation_forest))
         
         # Convertir le résultat en format Pydantic
         return _convert_analysis_to_schema(analysis_result)
@@ -722,6 +1151,79 @@ def analyze_data_quality(
             detail=f"Error analyzing data quality: {str(e)}"
         )
 
+@app.get("/data-quality/jobs/{job_id}", response_model=DataQualityJob)
+def get_data_quality_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user_id: uuid.UUID = Depends(get_current_user_id)
+):
+    """État d'une analyse soumise ; l'analyse est incluse une fois le job terminé"""
+    job_status = analysis_job_status(job_id)
+    job = DataQualityJob(job_id=job_id, status=job_status['status'], error=job_status.get('error'))
+    
+    if job.status == 'completed':
+        cached_analysis = find_cached_analysis(db, job_status['cache_key']) if job_status.get('cache_key') else None
+        if not cached_analysis:
+            # Analyse expirée ou supprimée depuis la fin du job
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Analysis no longer available")
+        job.analysis = _cached_analysis_to_schema(cached_analysis)
+    
+    return job
+
+@app.post("/data-quality/precompute", response_model=DataQualityJob, status_code=status.HTTP_202_ACCEPTED,
+          dependencies=[Depends(require_internal_service)])
+def precompute_data_quality(request: DataQualityPrecomputeRequest):
+    """
+    Précalcule l'analyse de qualité d'un dataset (appelé par service-selection à l'ingestion).
+    
+    L'analyse tourne dans un worker data_quality_queue (priorité 'ingest' par
+    défaut) et alimente le cache : la première ouverture du dataset par un
+    utilisateur est servie depuis le cache. Sans cible, l'analyse demandée à
+    l'ouverture du wizard (cible proposée, WIZARD_SAMPLE_SIZE lignes) est
+    précalculée en plus.
+    """
+    from app.ml.dataset_loader import DatasetLoadError, dataset_columns
+    
+    sample_size = request.sample_size or DEFAULT_SAMPLE_SIZE
+    try:
+        cache_key, _ = analysis_cache_key(request.dataset_id, request.target_column, sample_size)
+    except DatasetLoadError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    
+    if request.target_column is None:
+        try:
+            wizard_target = suggested_target_column(dataset_columns(request.dataset_id) or [])
+            if wizard_target:
+                wizard_key, _ = analysis_cache_key(request.dataset_id, wizard_target, WIZARD_SAMPLE_SIZE)
+                submit_analysis_job(request.dataset_id, wizard_target, WIZARD_SAMPLE_SIZE,
+                                    priority=request.priority, cache_key=wizard_key)
+        except Exception as e:
+            logger.warning(f"Précalcul de l'analyse du wizard impossible pour {request.dataset_id}: {str(e)}")
+    
+    job_id, deduplicated = submit_analysis_job(
+        request.dataset_id, request.target_column, sample_size,
+        priority=request.priority, cache_key=cache_key
+    )
+    return DataQualityJob(job_id=job_id, status='queued',
+                          status_url=f"/data-quality/jobs/{job_id}", deduplicated=deduplicated)
+
+@app.post("/data-quality/backfill", status_code=status.HTTP_202_ACCEPTED,
+          dependencies=[Depends(require_internal_service)])
+def backfill_data_quality(request: DataQualityBackfillRequest):
+    """
+    Rattrapage en masse des analyses (import de datasets, nouvelle version de l'analyseur).
+    
+    Les jobs passent en priorité 'backfill' : ils ne retardent ni les analyses
+    demandées par les utilisateurs ni les précalculs d'ingestion.
+    """
+    sample_size = request.sample_size or DEFAULT_SAMPLE_SIZE
+    jobs = []
+    for dataset_id in request.dataset_ids:
+        # Pas de clé de cache ici (une lecture de stockage par dataset) : le worker ignore les analyses déjà en cache
+        job_id, _ = submit_analysis_job(dataset_id, sample_size=sample_size, priority='backfill')
+        jobs.append({'dataset_id': dataset_id, 'job_id': job_id})
+    return {'submitted': len(jobs), 'jobs': jobs}
+
 @app.post("/data-quality/suggest-strategy", response_model=PreprocessingStrategy)
 def suggest_preprocessing_strategy(
     request: PreprocessingStrategyRequest,
@@ -733,7 +1235,7 @@ def suggest_preprocessing_strategy(
     
     try:
         # Charger le dataset
-        sample_data = _load_dataset_sample(request.dataset_id, 5000)
+        sample_data = _load_dataset_sample(request.dataset_id, 5000, request.target_column)
         
         # Analyser la qualité
         analysis = analyze_dataset_quality(sample_data, request.target_column)
@@ -750,71 +1252,12 @@ def suggest_preprocessing_strategy(
             detail=f"Error generating preprocessing strategy: {str(e)}"
         )
 
-def _load_dataset_sample(dataset_id: str, sample_size: int = 5000) -> pd.DataFrame:
-    """Charger un échantillon du dataset depuis MinIO"""
-    import numpy as np
-    import requests
-    from io import BytesIO
+def _load_dataset_sample(dataset_id: str, sample_size: int = 5000, target_column: Optional[str] = None) -> pd.DataFrame:
+    """Charger un échantillon du dataset (une passe, stratifié sur la cible si fournie)"""
+    from app.ml.dataset_loader import sample_dataset
     
     try:
-        # 1. Récupérer les métadonnées du dataset depuis service-selection
-        service_selection_url = os.environ.get("SERVICE_SELECTION_URL", "http://service-selection-service.ibis-x.svc.cluster.local")
-        response = requests.get(f"{service_selection_url}/datasets/{dataset_id}", timeout=10)
-        
-        if response.status_code != 200:
-            logger.warning(f"Dataset {dataset_id} non trouvé dans service-selection, utilisation de données de fallback")
-            return _generate_fallback_data(sample_size)
-        
-        dataset_info = response.json()
-        
-        # 2. Charger le fichier depuis MinIO
-        from common.storage_client import get_storage_client
-        storage_client = get_storage_client()
-        
-        # Construire le chemin vers le fichier principal
-        storage_path = dataset_info.get('storage_path', f'ibis-x-datasets/{dataset_id}')
-        
-        # Essayer de trouver un fichier Parquet
-        files = dataset_info.get('files', [])
-        main_file = None
-        
-        for file_info in files:
-            if file_info.get('format') == 'parquet' and file_info.get('logical_role') in ['data_file', 'training_data', None]:
-                main_file = file_info
-                break
-        
-        if not main_file and files:
-            main_file = files[0]  # Prendre le premier fichier disponible
-        
-        if not main_file:
-            logger.warning(f"Aucun fichier trouvé pour dataset {dataset_id}")
-            return _generate_fallback_data(sample_size)
-        
-        # Construire le chemin complet
-        object_path = f"{storage_path.rstrip('/')}/{main_file['file_name_in_storage']}"
-        
-        logger.info(f"Chargement du dataset depuis: {object_path}")
-        
-        # Télécharger et lire le fichier
-        file_data = storage_client.download_file(object_path)
-        
-        if main_file.get('format') == 'parquet':
-            parquet_buffer = BytesIO(file_data)
-            df = pd.read_parquet(parquet_buffer)
-        else:
-            # Fallback pour CSV
-            csv_buffer = BytesIO(file_data)
-            df = pd.read_csv(csv_buffer)
-        
-        logger.info(f"Dataset chargé avec succès: {len(df)} lignes, {len(df.columns)} colonnes")
-        
-        # Échantillonner si le dataset est trop gros
-        if len(df) > sample_size:
-            df = df.sample(n=sample_size, random_state=42)
-            logger.info(f"Échantillon pris: {len(df)} lignes")
-        
-        return df
-        
+        return sample_dataset(dataset_id, sample_size, target_column=target_column, random_state=42)
     except Exception as e:
         logger.error(f"Erreur lors du chargement du dataset {dataset_id}: {str(e)}")
         logger.info("Utilisation de données de fallback pour la démonstration")
@@ -888,7 +1331,8 @@ def _convert_analysis_to_schema(analysis: dict) -> DataQualityAnalysis:
         ),
         outliers_analysis=OutliersAnalysis(
             iqr_method=iqr_converted,
-            zscore_method=zscore_converted
+            zscore_method=zscore_converted,
+            isolation_forest=analysis.get('outliers_analysis', {}).get('isolation_forest')
         ),
         data_quality_score=analysis['data_quality_score'],
         preprocessing_recommendations=PreprocessingRecommendations(**analysis['preprocessing_recommendations'])
@@ -934,7 +1378,7 @@ def get_experiment_versions(
     db: Session = Depends(get_db),
     current_user_id: uuid.UUID = Depends(get_current_user_id)
 ):
-    """Get all versions of models for an experiment"""
+    """Get all versions of models for an experiment (registre model_versions)"""
     try:
         # Vérifier que l'expérience appartient à l'utilisateur
         experiment = db.query(Experiment).filter(
@@ -948,47 +1392,14 @@ def get_experiment_versions(
                 detail="Experiment not found or access denied"
             )
         
-        # Lister les versions depuis le stockage
-        from common.storage_client import get_storage_client
-        storage_client = get_storage_client()
+        # Plus récente en premier (index experiment_id, created_at)
+        versions = [model_version_to_dict(v) for v in list_model_versions(db, experiment.id)]
         
-        # Construire le préfixe de recherche
-        prefix = f"ibis-x-models/{experiment.project_id}/{experiment.id}/"
-        
-        try:
-            # Liste des fichiers de modèles
-            model_files = storage_client.list_files(prefix)
-            
-            versions = []
-            for file_path in model_files:
-                if file_path.endswith('.joblib'):
-                    # Extraire la version du nom de fichier
-                    filename = file_path.split('/')[-1]
-                    if '_v' in filename:
-                        version = filename.split('_v')[1].split('.')[0]
-                        versions.append({
-                            'version': version,
-                            'file_path': file_path,
-                            'created_at': version  # La version contient le timestamp
-                        })
-            
-            # Trier par version décroissante (plus récent en premier)
-            versions.sort(key=lambda x: x['version'], reverse=True)
-            
-            return {
-                'experiment_id': experiment_id,
-                'versions': versions,
-                'total_versions': len(versions)
-            }
-            
-        except Exception as storage_error:
-            logger.error(f"Error listing model versions: {str(storage_error)}")
-            return {
-                'experiment_id': experiment_id,
-                'versions': [],
-                'total_versions': 0,
-                'error': 'Could not access storage'
-            }
+        return {
+            'experiment_id': experiment_id,
+            'versions': versions,
+            'total_versions': len(versions)
+        }
             
     except HTTPException:
         raise
@@ -999,24 +1410,46 @@ def get_experiment_versions(
             detail=f"Error getting experiment versions: {str(e)}"
         )
 
+@app.get("/experiments/{experiment_id}/versions/latest")
+def get_latest_experiment_version(
+    experiment_id: str,
+    db: Session = Depends(get_db),
+    current_user_id: uuid.UUID = Depends(get_current_user_id)
+):
+    """Dernière version du modèle d'une expérience"""
+    experiment = db.query(Experiment).filter(
+        Experiment.id == experiment_id,
+        Experiment.user_id == current_user_id
+    ).first()
+    if not experiment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found or access denied"
+        )
+    
+    latest = latest_model_version(db, experiment.id)
+    if latest is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No model version for this experiment"
+        )
+    return {'experiment_id': experiment_id, **model_version_to_dict(latest)}
+
 @app.get("/users/quotas")
 def get_user_quotas(
     db: Session = Depends(get_db),
-    current_user_id: uuid.UUID = Depends(get_current_user_id)
+    current_user_id: uuid.UUID = Depends(get_current_user_id),
+    tier: str = Depends(get_current_user_tier)
 ):
     """Get user quotas and current usage"""
     try:
         from collections import defaultdict
         from datetime import timedelta
         
-        # Compter les expériences par statut
-        experiment_counts = db.query(Experiment).filter(
+        # Compter les expériences par statut (agrégé en base)
+        status_counts = defaultdict(int, db.query(Experiment.status, func.count(Experiment.id)).filter(
             Experiment.user_id == current_user_id
-        ).all()
-        
-        status_counts = defaultdict(int)
-        for exp in experiment_counts:
-            status_counts[exp.status] += 1
+        ).group_by(Experiment.status).all())
         
         # Calculer l'usage des 24 dernières heures
         yesterday = datetime.utcnow() - timedelta(hours=24)
@@ -1025,20 +1458,21 @@ def get_user_quotas(
             Experiment.created_at >= yesterday
         ).count()
         
-        # Quotas définis (à terme, ces valeurs pourraient venir d'une table de configuration)
+        # Quotas (config) ; max_experiments_per_day est appliqué à la création des expériences
         quotas = {
-            'max_concurrent_experiments': 5,
-            'max_experiments_per_day': 20,
-            'max_total_experiments': 100,
-            'max_model_storage_mb': 1000
+            'max_experiments_per_day': settings.EXPERIMENT_QUOTA_PER_DAY,
+            'max_total_experiments': settings.EXPERIMENT_QUOTA_TOTAL,
+            'max_model_storage_mb': settings.MODEL_STORAGE_QUOTA_MB
         }
         
         # Usage actuel
         current_usage = {
             'concurrent_experiments': status_counts['pending'] + status_counts['running'],
+            'queued_experiments': status_counts['queued'],
+            'experiments_per_day': recent_experiments,
             'experiments_last_24h': recent_experiments,
-            'total_experiments': len(experiment_counts),
-            'model_storage_mb': 0  # À calculer en interrogeant le stockage
+            'total_experiments': sum(status_counts.values()),
+            'model_storage_mb': round(user_model_storage_bytes(db, current_user_id) / (1024 * 1024), 2)
         }
         
         # Pourcentages d'usage
@@ -1050,13 +1484,13 @@ def get_user_quotas(
         
         return {
             'user_id': str(current_user_id),
+            'tier': tier,
             'quotas': quotas,
             'current_usage': current_usage,
             'usage_percentages': usage_percentages,
             'status_breakdown': dict(status_counts),
             'warnings': [
                 warning for warning in [
-                    'Quota concurrent experiments proche de la limite' if usage_percentages.get('max_concurrent_experiments', 0) > 80 else None,
                     'Quota quotidien proche de la limite' if usage_percentages.get('max_experiments_per_day', 0) > 80 else None
                 ] if warning
             ]
@@ -1,11 +1,44 @@
 from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.ensemble import (RandomForestClassifier, RandomForestRegressor,
+                              ExtraTreesClassifier, ExtraTreesRegressor,
+                              HistGradientBoostingClassifier, HistGradientBoostingRegressor)
+from sklearn.linear_model import SGDClassifier, SGDRegressor, LogisticRegression, Ridge
+from sklearn.naive_bayes import GaussianNB
+from threadpoolctl import threadpool_limits
+from app.ml.tree_structure import tree_arrays, build_nested_tree, DEFAULT_MAX_DEPTH, DEFAULT_MAX_NODES
 import numpy as np
+import scipy.sparse as sp
 from typing import Dict, Any, Optional, Union
 
+
+# Les forêts n'affichent qu'un arbre représentatif, moins détaillé
+FOREST_MAX_DEPTH = 4
+
+
+def _dense(X):
+    """Densifie une matrice creuse (modèles qui n'acceptent pas le format CSR)"""
+    return X.toarray() if sp.issparse(X) else X
+
+
+def _coefficient_importance(coef) -> Dict[str, Any]:
+    """Importance des modèles linéaires = valeur absolue des coefficients (moyenne sur les classes)"""
+    importance = np.abs(np.atleast_2d(coef)).mean(axis=0)
+    indices = np.argsort(importance)[::-1]
+    return {
+        'features': [f'feature_{i}' for i in indices],
+        'importance': importance[indices].tolist()
+    }
+
 class BaseModelWrapper:
     """Base class for sklearn model wrappers"""
     
+    # True si le modèle peut être entraîné par lots (partial_fit, mode incrémental)
+    supports_partial_fit = False
+    # True si le modèle gère nativement les valeurs manquantes (l'imputation numérique est alors omise)
+    handles_missing_values = False
+    # True si l'estimateur sklearn refuse les matrices creuses (le wrapper densifie à chaque appel)
+    requires_dense_input = False
+    
     def __init__(self, **kwargs):
         self.model = None
         self.hyperparameters = kwargs
@@ -16,6 +49,17 @@ class BaseModelWrapper:
         self.model.fit(X, y)
         self.is_fitted = True
         return self
+    
+    def partial_fit(self, X, y, classes=None):
+        """Train the model on one batch (incremental mode)"""
+        if not self.supports_partial_fit:
+            raise NotImplementedError(f"{type(self).__name__} doesn't support incremental training")
+        if classes is not None and getattr(self.model, '_estimator_type', None) == 'classifier':
+            self.model.partial_fit(X, y, classes=classes)
+        else:
+            self.model.partial_fit(X, y)
+        self.is_fitted = True
+        return self
         
     def predict(self, X):
         """Make predictions"""
@@ -44,13 +88,13 @@ class BaseModelWrapper:
             }
         return None
     
-    def get_tree_structure(self) -> Optional[Dict[str, Any]]:
+    def get_tree_arrays(self) -> Optional[Dict[str, Any]]:
+        """Get the full tree structure as per-node arrays (for tree models only)"""
+        return None
+    
+    def get_tree_structure(self, max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+                           max_nodes: Optional[int] = DEFAULT_MAX_NODES) -> Optional[Dict[str, Any]]:
         """Get tree structure for visualization (for decision trees only)"""
-        if not self.is_fitted:
-            return None
-        
-        # Cette méthode peut être implémentée pour extraire la structure d'arbre
-        # Pour l'instant, placeholder pour évaluation de faisabilité
         return None
 
 class DecisionTreeWrapper(BaseModelWrapper):
@@ -80,79 +124,27 @@ class DecisionTreeWrapper(BaseModelWrapper):
             
         self.task_type = task_type
     
-    def get_tree_structure(self) -> Optional[Dict[str, Any]]:
-        """Extrait la structure d'arbre pour visualisation ECharts"""
+    def get_tree_arrays(self) -> Optional[Dict[str, Any]]:
+        """Structure complète de l'arbre (tableaux par nœud), stockée comme artefact"""
         if not self.is_fitted or not hasattr(self.model, 'tree_'):
             return None
-            
-        tree = self.model.tree_
-        feature_names = [f'feature_{i}' for i in range(tree.n_features)]
-        
-        def build_tree_node(node_id: int) -> Dict[str, Any]:
-            """Construit récursivement un nœud d'arbre pour ECharts"""
-            
-            # Informations du nœud
-            is_leaf = tree.children_left[node_id] == tree.children_right[node_id]
-            samples = tree.n_node_samples[node_id]
-            
-            if is_leaf:
-                # Nœud feuille
-                value = tree.value[node_id][0]
-                if self.task_type == 'classification':
-                    predicted_class = np.argmax(value)
-                    name = f"Classe {predicted_class}"
-                    condition = f"Échantillons: {samples}"
-                else:
-                    predicted_value = value[0]
-                    name = f"Valeur: {predicted_value:.3f}"
-                    condition = f"Échantillons: {samples}"
-                    
-                return {
-                    "name": name,
-                    "condition": condition,
-                    "samples": samples,
-                    "is_leaf": True,
-                    "value": predicted_value if self.task_type == 'regression' else predicted_class
-                }
-            else:
-                # Nœud interne
-                feature_idx = tree.feature[node_id]
-                threshold = tree.threshold[node_id]
-                feature_name = feature_names[feature_idx] if feature_idx < len(feature_names) else f'feature_{feature_idx}'
-                
-                name = f"{feature_name}"
-                condition = f"≤ {threshold:.3f}"
-                
-                # Construire les enfants récursivement
-                left_child = build_tree_node(tree.children_left[node_id])
-                right_child = build_tree_node(tree.children_right[node_id])
-                
-                return {
-                    "name": name,
-                    "condition": condition,
-                    "samples": samples,
-                    "is_leaf": False,
-                    "feature": feature_name,
-                    "threshold": threshold,
-                    "children": [left_child, right_child]
-                }
-        
-        # Construire l'arbre complet depuis la racine
-        root_node = build_tree_node(0)
-        
-        return {
-            "tree_data": root_node,
-            "metadata": {
-                "max_depth": tree.max_depth,
-                "n_nodes": tree.node_count,
-                "n_features": tree.n_features,
-                "n_classes": tree.n_classes[0] if hasattr(tree, 'n_classes') else 1
-            }
-        }
+        return tree_arrays(self.model.tree_, self.task_type)
+    
+    def get_tree_structure(self, max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+                           max_nodes: Optional[int] = DEFAULT_MAX_NODES) -> Optional[Dict[str, Any]]:
+        """Extrait la structure d'arbre pour visualisation ECharts (plafonnée en profondeur et en nœuds)"""
+        arrays = self.get_tree_arrays()
+        if arrays is None:
+            return None
+        return build_nested_tree(arrays, max_depth=max_depth, max_nodes=max_nodes)
 
 class RandomForestWrapper(BaseModelWrapper):
     """Wrapper for Random Forest models"""
     
+    classifier_class = RandomForestClassifier
+    regressor_class = RandomForestRegressor
+    display_name = "Random Forest"
+    
     def __init__(self, task_type: str = 'classification', **kwargs):
         super().__init__(**kwargs)
         
@@ -171,85 +163,217 @@ class RandomForestWrapper(BaseModelWrapper):
             valid_params['n_jobs'] = -1  # Use all available cores
             
         if task_type == 'classification':
-            self.model = RandomForestClassifier(**valid_params)
+            self.model = self.classifier_class(**valid_params)
         else:
-            self.model = RandomForestRegressor(**valid_params)
+            self.model = self.regressor_class(**valid_params)
             
         self.task_type = task_type
     
-    def get_tree_structure(self) -> Optional[Dict[str, Any]]:
-        """Extrait la structure du premier arbre de la forêt pour visualisation"""
+    def get_tree_arrays(self) -> Optional[Dict[str, Any]]:
+        """Structure complète du premier arbre de la forêt (tableaux par nœud)"""
         if not self.is_fitted or not hasattr(self.model, 'estimators_'):
             return None
-            
+        return tree_arrays(self.model.estimators_[0].tree_, self.task_type)
+    
+    def get_tree_structure(self, max_depth: Optional[int] = FOREST_MAX_DEPTH,
+                           max_nodes: Optional[int] = DEFAULT_MAX_NODES) -> Optional[Dict[str, Any]]:
+        """Extrait la structure du premier arbre de la forêt pour visualisation (simplifiée)"""
+        arrays = self.get_tree_arrays()
+        if arrays is None:
+            return None
         # Utiliser le premier estimateur de la forêt comme représentatif
-        first_tree = self.model.estimators_[0]
-        tree = first_tree.tree_
-        feature_names = [f'feature_{i}' for i in range(tree.n_features)]
+        structure = build_nested_tree(arrays, max_depth=max_depth, max_nodes=max_nodes, short_labels=True)
+        structure["metadata"].update({
+            "tree_index": 0,  # Premier arbre de la forêt
+            "n_estimators": len(self.model.estimators_),
+            "note": f"Premier arbre de la {self.display_name} (représentatif)"
+        })
+        return structure
+
+class ExtraTreesWrapper(RandomForestWrapper):
+    """Wrapper for Extra Trees models (seuils tirés au hasard : plus rapide qu'une Random Forest)"""
+    
+    classifier_class = ExtraTreesClassifier
+    regressor_class = ExtraTreesRegressor
+    display_name = "forêt Extra Trees"
+
+class HistGradientBoostingWrapper(BaseModelWrapper):
+    """Wrapper for histogram-based gradient boosting models"""
+    
+    handles_missing_values = True
+    requires_dense_input = True
+    
+    def __init__(self, task_type: str = 'classification', **kwargs):
+        super().__init__(**kwargs)
         
-        def build_forest_node(node_id: int, depth: int = 0) -> Dict[str, Any]:
-            """Construit un nœud simplifié pour Random Forest (moins détaillé)"""
-            
-            # Limiter la profondeur pour éviter des arbres trop complexes
-            if depth > 4:
-                return {
-                    "name": "...",
-                    "condition": "Profondeur max atteinte",
-                    "is_leaf": True
-                }
-            
-            is_leaf = tree.children_left[node_id] == tree.children_right[node_id]
-            samples = tree.n_node_samples[node_id]
-            
-            if is_leaf:
-                value = tree.value[node_id][0]
-                if self.task_type == 'classification':
-                    predicted_class = np.argmax(value)
-                    name = f"C{predicted_class}"
-                else:
-                    predicted_value = value[0]
-                    name = f"{predicted_value:.2f}"
-                    
-                return {
-                    "name": name,
-                    "condition": f"n={samples}",
-                    "samples": samples,
-                    "is_leaf": True,
-                    "depth": depth
-                }
-            else:
-                feature_idx = tree.feature[node_id]
-                threshold = tree.threshold[node_id]
-                feature_name = f'F{feature_idx}'  # Nom court pour Random Forest
-                
-                # Construire les enfants (limités en profondeur)
-                children = []
-                if depth < 4:
-                    left_child = build_forest_node(tree.children_left[node_id], depth + 1)
-                    right_child = build_forest_node(tree.children_right[node_id], depth + 1)
-                    children = [left_child, right_child]
-                
-                return {
-                    "name": feature_name,
-                    "condition": f"≤ {threshold:.2f}",
-                    "samples": samples,
-                    "is_leaf": False,
-                    "feature": feature_name,
-                    "threshold": threshold,
-                    "depth": depth,
-                    "children": children
-                }
-        
-        # Construire l'arbre simplifié
-        root_node = build_forest_node(0)
+        valid_params = {}
+        for param in ['learning_rate', 'max_iter', 'max_leaf_nodes', 'max_depth',
+                      'min_samples_leaf', 'l2_regularization', 'max_bins',
+                      'early_stopping', 'random_state']:
+            if param in kwargs:
+                valid_params[param] = kwargs[param]
+        
+        if 'random_state' not in valid_params:
+            valid_params['random_state'] = 42
+        # Arrêt précoce sur 10% du jeu d'entraînement au-delà de 10 000 lignes
+        valid_params.setdefault('early_stopping', 'auto')
         
+        if task_type == 'classification':
+            self.model = HistGradientBoostingClassifier(**valid_params)
+        else:
+            self.model = HistGradientBoostingRegressor(**valid_params)
+        
+        # Le boosting parallélise avec OpenMP (pas de paramètre n_jobs) : limite appliquée au fit
+        self.n_jobs = kwargs.get('n_jobs')
+        self.task_type = task_type
+    
+    def fit(self, X, y):
+        X = _dense(X)
+        if self.n_jobs is not None and self.n_jobs > 0:
+            with threadpool_limits(limits=self.n_jobs, user_api='openmp'):
+                return super().fit(X, y)
+        return super().fit(X, y)
+    
+    def predict(self, X):
+        return super().predict(_dense(X))
+    
+    def predict_proba(self, X):
+        return super().predict_proba(_dense(X))
+    
+    def get_feature_importance(self) -> Optional[Dict[str, Any]]:
+        """Importance = gain total des splits par feature, sur tous les arbres"""
+        if not self.is_fitted:
+            return None
+        try:
+            # Pas de feature_importances_ sur ce modèle : les nœuds des arbres sont lus directement
+            importances = np.zeros(self.model.n_features_in_)
+            for iteration in self.model._predictors:
+                for predictor in iteration:
+                    # is_leaf est un uint8 : ~ donnerait 254/255, pas un masque
+                    nodes = predictor.nodes[predictor.nodes['is_leaf'] == 0]
+                    np.add.at(importances, nodes['feature_idx'], nodes['gain'])
+        except (AttributeError, IndexError, ValueError):
+            return None
+        total = importances.sum()
+        if total > 0:
+            importances = importances / total
+        indices = np.argsort(importances)[::-1]
         return {
-            "tree_data": root_node,
-            "metadata": {
-                "tree_index": 0,  # Premier arbre de la forêt
-                "n_estimators": len(self.model.estimators_),
-                "max_depth": tree.max_depth,
-                "n_features": tree.n_features,
-                "note": "Premier arbre de la Random Forest (représentatif)"
-            }
-        } 
\ No newline at end of file
+            'features': [f'feature_{i}' for i in indices],
+            'importance': importances[indices].tolist()
+        }
+
+class LinearModelWrapper(BaseModelWrapper):
+    """Wrapper for linear models: LogisticRegression (solver saga) or Ridge (regression, solver auto)"""
+    
+    def __init__(self, task_type: str = 'classification', **kwargs):
+        super().__init__(**kwargs)
+        
+        valid_params = {}
+        for param in ['C', 'max_iter', 'tol', 'random_state']:
+            if param in kwargs:
+                valid_params[param] = kwargs[param]
+        
+        if 'random_state' not in valid_params:
+            valid_params['random_state'] = 42
+        valid_params.setdefault('max_iter', 1000)
+        if task_type == 'classification':
+            # saga : accepte les matrices creuses et converge vite sur les données standardisées
+            solver = kwargs.get('solver', 'saga')
+            penalty = kwargs.get('penalty', 'l2')
+            if penalty == 'elasticnet':
+                valid_params['l1_ratio'] = kwargs.get('l1_ratio', 0.5)
+            if penalty in ['l1', 'elasticnet'] and solver not in ['saga', 'liblinear']:
+                solver = 'saga'
+            self.model = LogisticRegression(penalty=penalty, solver=solver, **valid_params)
+        else:
+            # Même convention de régularisation que LogisticRegression : alpha = 1 / (2C)
+            alpha = 1.0 / (2 * valid_params.pop('C')) if 'C' in valid_params else 1.0
+            # Ridge + saga refuse l'intercept sur une matrice creuse (CSR de build_preprocessor) :
+            # seuls les solveurs compatibles sont retenus, 'auto' choisit sparse_cg ou cholesky
+            solver = kwargs.get('solver', 'auto')
+            if solver not in ['auto', 'lsqr', 'sparse_cg', 'sag']:
+                solver = 'auto'
+            self.model = Ridge(alpha=alpha, solver=solver, **valid_params)
+        
+        self.task_type = task_type
+    
+    def get_feature_importance(self) -> Optional[Dict[str, Any]]:
+        if not self.is_fitted:
+            return None
+        return _coefficient_importance(self.model.coef_)
+
+
+class SGDWrapper(BaseModelWrapper):
+    """Wrapper for linear models trained by stochastic gradient descent"""
+    
+    supports_partial_fit = True
+    
+    def __init__(self, task_type: str = 'classification', **kwargs):
+        super().__init__(**kwargs)
+        
+        valid_params = {}
+        for param in ['loss', 'penalty', 'alpha', 'l1_ratio', 'learning_rate', 'eta0',
+                      'max_iter', 'random_state']:
+            if param in kwargs:
+                valid_params[param] = kwargs[param]
+        
+        if 'random_state' not in valid_params:
+            valid_params['random_state'] = 42
+        
+        if task_type == 'classification':
+            # log_loss : predict_proba disponible (ROC, AUC)
+            valid_params.setdefault('loss', 'log_loss')
+            self.model = SGDClassifier(**valid_params)
+        else:
+            if valid_params.get('loss') in ['hinge', 'log_loss', 'modified_huber', 'perceptron']:
+                valid_params['loss'] = 'squared_error'
+            self.model = SGDRegressor(**valid_params)
+        
+        self.task_type = task_type
+    
+    def get_feature_importance(self) -> Optional[Dict[str, Any]]:
+        if not self.is_fitted:
+            return None
+        return _coefficient_importance(self.model.coef_)
+
+class NaiveBayesWrapper(BaseModelWrapper):
+    """Wrapper for Gaussian Naive Bayes (classification only)"""
+    
+    supports_partial_fit = True
+    requires_dense_input = True
+    
+    def __init__(self, task_type: str = 'classification', **kwargs):
+        super().__init__(**kwargs)
+        if task_type != 'classification':
+            raise ValueError("Naive Bayes only supports classification")
+        
+        valid_params = {}
+        if 'var_smoothing' in kwargs:
+            valid_params['var_smoothing'] = kwargs['var_smoothing']
+        self.model = GaussianNB(**valid_params)
+        self.task_type = task_type
+    
+    def fit(self, X, y):
+        return super().fit(_dense(X), y)
+    
+    def partial_fit(self, X, y, classes=None):
+        return super().partial_fit(_dense(X), y, classes=classes)
+    
+    def predict(self, X):
+        return super().predict(_dense(X))
+    
+    def predict_proba(self, X):
+        return super().predict_proba(_dense(X))
+
+
+# Wrappers par nom d'algorithme (valeur de Experiment.algorithm)
+ALGORITHM_WRAPPERS = {
+    'decision_tree': DecisionTreeWrapper,
+    'random_forest': RandomForestWrapper,
+    'extra_trees': ExtraTreesWrapper,
+    'hist_gradient_boosting': HistGradientBoostingWrapper,
+    'logistic_regression': LinearModelWrapper,
+    'sgd': SGDWrapper,
+    'naive_bayes': NaiveBayesWrapper,
+}
@@ -0,0 +1,157 @@
+"""
+Format des artefacts de modèle.
+
+Chaque version de modèle est stockée en deux objets :
+
+- model_{id}_v{version}.joblib : {model, preprocessing_pipeline, feature_names,
+  training_config}, sérialisé avec joblib et compressé (MODEL_ARTIFACT_COMPRESSION :
+  lz4 si le paquet est installé, sinon zlib ; 'none' pour un artefact non
+  compressé dont les tableaux NumPy sont relus en memory-map)
+- model_{id}_v{version}.manifest.json : métadonnées (métriques, features, tailles,
+  sha256, versions des bibliothèques). Les listes de versions ne lisent que ce
+  manifeste, jamais le binaire.
+
+joblib détecte la compression à la lecture : les artefacts antérieurs (sans
+compression ni manifeste) restent lisibles.
+"""
+
+import io
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import sklearn
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Incrémenter si le contenu de l'artefact ou du manifeste change
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+COMPRESSION_METHODS = ('lz4', 'zlib', 'gzip', 'lzma', 'none')
+
+
+def _lz4_available() -> bool:
+    try:
+        import lz4.frame  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_compression(method: Optional[str] = None, level: Optional[int] = None) -> Optional[Tuple[str, int]]:
+    """
+    Paramètre compress de joblib.dump, None = pas de compression.
+
+    lz4 (décompression la plus rapide) est remplacé par zlib si le paquet lz4
+    n'est pas installé.
+    """
+    method = (method or settings.MODEL_ARTIFACT_COMPRESSION).lower()
+    level = settings.MODEL_ARTIFACT_COMPRESSION_LEVEL if level is None else level
+    if method not in COMPRESSION_METHODS:
+        raise ValueError(f"Unknown artifact compression: {method}")
+    if method == 'none' or level <= 0:
+        return None
+    if method == 'lz4' and not _lz4_available():
+        logger.warning("Paquet lz4 absent : compression des artefacts en zlib")
+        method = 'zlib'
+    return method, level
+
+
+def manifest_path_for(artifact_path: str) -> str:
+    """Chemin du manifeste associé à un artefact (.joblib)."""
+    base, _ = os.path.splitext(artifact_path)
+    return base + MANIFEST_SUFFIX
+
+
+def dump_model_artifact(artifact: Dict[str, Any],
+                        compression: Optional[str] = None,
+                        level: Optional[int] = None) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Sérialise un artefact.
+
+    Returns:
+        (octets de l'artefact, informations de format pour le manifeste)
+    """
+    compress = resolve_compression(compression, level)
+    started = time.perf_counter()
+    buffer = io.BytesIO()
+    joblib.dump(artifact, buffer, compress=compress or 0)
+    data = buffer.getvalue()
+    elapsed = time.perf_counter() - started
+    logger.info(f"Artefact sérialisé: {len(data)} bytes ({compress[0] if compress else 'non compressé'}) "
+                f"en {elapsed:.2f}s")
+    return data, {
+        'format': ARTIFACT_FORMAT_VERSION,
+        'serializer': 'joblib',
+        'compression': compress[0] if compress else None,
+        'compression_level': compress[1] if compress else None,
+        'memory_mappable': compress is None,
+        'size_bytes': len(data),
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'serialization_seconds': round(elapsed, 3)
+    }
+
+
+def load_model_artifact(data: bytes) -> Dict[str, Any]:
+    """
+    Relit un artefact.
+
+    Un artefact non compressé passe par un fichier temporaire relu en memory-map
+    (mmap_mode='r') : les tableaux NumPy des modèles ne sont pas copiés en mémoire
+    et le fichier est supprimé aussitôt (le mapping garde l'inode).
+    """
+    # Les artefacts compressés commencent par l'en-tête de leur format (zlib, lz4, ...)
+    if not data.startswith(b'\x80'):
+        return joblib.load(io.BytesIO(data))
+
+    fd, path = tempfile.mkstemp(suffix=".joblib")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        return joblib.load(path, mmap_mode='r')
+    finally:
+        os.remove(path)
+
+
+def build_manifest(artifact_path: str,
+                   format_info: Dict[str, Any],
+                   experiment,
+                   metrics: Dict[str, Any],
+                   feature_names: Optional[list],
+                   input_columns: Optional[list],
+                   training_config: Dict[str, Any],
+                   version: str) -> Dict[str, Any]:
+    """Manifeste JSON d'une version de modèle."""
+    return {
+        **format_info,
+        'artifact_path': artifact_path,
+        'version': version,
+        'experiment_id': str(experiment.id),
+        'project_id': str(experiment.project_id),
+        'dataset_id': str(experiment.dataset_id),
+        'algorithm': experiment.algorithm,
+        'task_type': (experiment.preprocessing_config or {}).get('task_type'),
+        'target_column': (experiment.preprocessing_config or {}).get('target_column'),
+        'metrics': metrics,
+        'feature_names': list(feature_names) if feature_names is not None else None,
+        'input_columns': list(input_columns) if input_columns is not None else None,
+        'training_config': training_config,
+        'libraries': {'scikit-learn': sklearn.__version__, 'joblib': joblib.__version__},
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }
+
+
+def serialize_manifest(manifest: Dict[str, Any]) -> bytes:
+    return json.dumps(manifest, default=str, indent=2).encode()
+
+
+def deserialize_manifest(data: bytes) -> Dict[str, Any]:
+    return json.loads(data)
@@ -0,0 +1,168 @@
+"""
+Cache des analyses de qualité des données (table data_quality_analyses).
+
+Clé adressée par le contenu : ETag du fichier lu (à défaut updated_at du
+dataset), colonne cible, taille d'échantillon, options de l'analyse et version
+de l'analyseur. Un fichier remplacé ou une autre cible donnent une autre clé :
+le cache ne renvoie jamais l'analyse d'autres données. La clé est unique en base
+(une ligne par clé, rafraîchie sur place).
+
+Les lignes expirées sont supprimées par sweep_expired_analyses (tâche de fond
+de l'API) ; precompute_analysis est appelée à l'ingestion d'un dataset.
+"""
+
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import DataQualityAnalysis
+from app.ml.dataset_loader import resolve_dataset_file, sample_dataset
+from app.ml.preprocessing import analyze_dataset_quality
+from common.storage_client import get_storage_client
+
+logger = logging.getLogger(__name__)
+
+# Incrémenter si le contenu de l'analyse change : les anciennes entrées ne sont plus servies
+ANALYZER_VERSION = 2
+DEFAULT_SAMPLE_SIZE = 10000
+# Première analyse du wizard (getDatasetRecommendations côté frontend) : précalculée à l'ingestion
+WIZARD_SAMPLE_SIZE = 1000
+# Noms qui désignent la cible proposée par le wizard (à défaut, la dernière colonne)
+TARGET_NAME_HINTS = ('target', 'label', 'class', 'outcome', 'result')
+
+
+def suggested_target_column(columns: List[str]) -> Optional[str]:
+    """Cible proposée par défaut par le wizard (même règle que suggestTargetAndTaskType)."""
+    for column in columns:
+        if any(hint in column.lower() for hint in TARGET_NAME_HINTS):
+            return column
+    return columns[-1] if columns else None
+
+
+def analysis_cache_key(dataset_id: str,
+                       target_column: Optional[str] = None,
+                       sample_size: Optional[int] = DEFAULT_SAMPLE_SIZE,
+                       isolation_forest: bool = False) -> Tuple[str, str]:
+    """
+    Clé de cache d'une analyse ; une cible vide vaut None.
+
+    Returns:
+        (clé sha256, version du dataset enregistrée dans dataset_version)
+
+    Raises:
+        DatasetLoadError: si le fichier du dataset est introuvable
+    """
+    object_path, _, updated_at = resolve_dataset_file(dataset_id)
+    try:
+        dataset_version = get_storage_client().get_file_etag(object_path)
+    except Exception as e:
+        logger.warning(f"ETag indisponible pour {object_path}: {str(e)}")
+        dataset_version = f"{updated_at}:{get_storage_client().get_file_size(object_path)}"
+
+    canonical = json.dumps({
+        'analyzer': ANALYZER_VERSION,
+        'object_path': object_path,
+        'dataset_version': dataset_version,
+        'target_column': target_column or None,
+        'sample_size': sample_size or DEFAULT_SAMPLE_SIZE,
+        'isolation_forest': bool(isolation_forest)
+    }, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest(), dataset_version[:50]
+
+
+def find_cached_analysis(db: Session, cache_key: str) -> Optional[DataQualityAnalysis]:
+    """Analyse en cache non expirée (index unique sur cache_key)."""
+    return db.query(DataQualityAnalysis).filter(
+        DataQualityAnalysis.cache_key == cache_key,
+        DataQualityAnalysis.expires_at > datetime.utcnow()
+    ).first()
+
+
+def clean_nan_for_json(obj):
+    """Remplace récursivement les NaN, Infinity par des valeurs sérialisables"""
+    if isinstance(obj, dict):
+        return {k: clean_nan_for_json(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [clean_nan_for_json(item) for item in obj]
+    elif isinstance(obj, float):
+        if np.isnan(obj):
+            return None
+        elif np.isinf(obj):
+            return 999999.0 if obj > 0 else -999999.0  # Remplacer ±Infinity par des valeurs finies
+        else:
+            return obj
+    return obj
+
+
+def store_analysis(db: Session, dataset_id: str, cache_key: str, dataset_version: str,
+                   analysis: Dict[str, Any], duration_seconds: float) -> None:
+    """Enregistre (ou rafraîchit) l'analyse d'une clé ; une écriture concurrente de la même clé est ignorée."""
+    cleaned_analysis = clean_nan_for_json(analysis)
+    values = dict(
+        dataset_id=dataset_id,
+        dataset_version=dataset_version,
+        analysis_data=cleaned_analysis,
+        column_strategies=cleaned_analysis.get('preprocessing_recommendations', {}).get('missing_values_strategy', {}),
+        quality_score=analysis['data_quality_score'],
+        total_rows=analysis['dataset_overview']['total_rows'],
+        total_columns=analysis['dataset_overview']['total_columns'],
+        analysis_duration_seconds=duration_seconds,
+        created_at=datetime.utcnow(),
+        expires_at=datetime.utcnow() + timedelta(days=settings.DATA_QUALITY_CACHE_TTL_DAYS)
+    )
+    try:
+        existing = db.query(DataQualityAnalysis).filter(DataQualityAnalysis.cache_key == cache_key).first()
+        if existing:
+            for field, value in values.items():
+                setattr(existing, field, value)
+        else:
+            db.add(DataQualityAnalysis(cache_key=cache_key, **values))
+        db.commit()
+    except IntegrityError:
+        # Même clé insérée entre-temps par une autre requête : son résultat est équivalent
+        db.rollback()
+
+
+def precompute_analysis(db: Session, dataset_id: str,
+                        target_column: Optional[str] = None,
+                        sample_size: int = DEFAULT_SAMPLE_SIZE,
+                        isolation_forest: bool = False,
+                        force: bool = False) -> Dict[str, Any]:
+    """
+    Analyse un dataset et la met en cache (sans repli sur des données de démonstration).
+
+    Returns:
+        {'cache_key', 'cached' (déjà en cache), 'quality_score'}
+    """
+    cache_key, dataset_version = analysis_cache_key(dataset_id, target_column, sample_size, isolation_forest)
+    if not force:
+        cached = find_cached_analysis(db, cache_key)
+        if cached:
+            return {'cache_key': cache_key, 'cached': True, 'quality_score': cached.quality_score}
+
+    target_column = target_column or None
+    start_time = time.time()
+    sample_data = sample_dataset(dataset_id, sample_size, target_column=target_column, random_state=42)
+    analysis = analyze_dataset_quality(sample_data, target_column, isolation_forest=isolation_forest)
+    store_analysis(db, dataset_id, cache_key, dataset_version, analysis, time.time() - start_time)
+    logger.info(f"Analyse de qualité mise en cache pour le dataset {dataset_id} ({cache_key[:12]})")
+    return {'cache_key': cache_key, 'cached': False, 'quality_score': analysis['data_quality_score']}
+
+
+def sweep_expired_analyses(db: Session) -> int:
+    """Supprime les analyses expirées ; renvoie le nombre de lignes supprimées."""
+    deleted = db.query(DataQualityAnalysis).filter(
+        DataQualityAnalysis.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    if deleted:
+        logger.info(f"{deleted} analyse(s) de qualité expirée(s) supprimée(s)")
+    return deleted
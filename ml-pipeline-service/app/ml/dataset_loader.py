@@ -0,0 +1,497 @@
+"""
+Chargement des datasets depuis le stockage d'objets.
+
+Point d'entrée unique pour l'entraînement et l'analyse de qualité :
+- résolution du fichier principal via le manifeste du dataset (app.core.manifests)
+- lecture Parquet par plages d'octets : seuls le footer et les colonnes demandées
+  sont téléchargés (projection de colonnes)
+- les row groups dont les statistiques min/max contredisent les filtres ne sont
+  pas lus (predicate pushdown)
+- l'échantillonnage se fait au niveau des row groups avant tout téléchargement
+- sur les workers, les fichiers passent par le cache local du nœud (app.core.local_store)
+"""
+
+import io
+import logging
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.manifests import manifest_resolver
+from app.core.local_store import get_local_dataset_store
+from app.ml.sampling import sample_batches
+from common.storage_client import get_storage_client
+
+logger = logging.getLogger(__name__)
+
+# En dessous de cette taille, un téléchargement complet coûte moins cher que les requêtes de plage
+RANGED_READ_THRESHOLD = 8 * 1024 * 1024
+# Taille du tampon de lecture : regroupe les petites lectures du lecteur Parquet
+RANGED_READ_BUFFER_SIZE = 1024 * 1024
+
+# Nombre de lignes par record batch lors de l'échantillonnage en flux
+SAMPLING_BATCH_SIZE = 65536
+
+# Anciens emplacements testés quand service-selection ne connaît pas le dataset
+LEGACY_FILE_NAMES = ['data.parquet', 'dataset.parquet', 'train.parquet']
+
+# Formats Arrow IPC : lus en entier mais sans copie depuis un memory-map
+IPC_FORMATS = ('arrow', 'feather', 'ipc')
+
+SUPPORTED_FILTER_OPS = ('==', '=', '!=', '<', '<=', '>', '>=', 'in', 'not in')
+
+
+class DatasetLoadError(Exception):
+    """Le dataset n'a pu être localisé ou lu dans le stockage."""
+    pass
+
+
+# --- Manifestes ---
+
+def select_main_file(manifest: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Choisit le fichier de données principal : premier Parquet de données, sinon le premier fichier."""
+    files = manifest.get('files', [])
+    for file_info in files:
+        if file_info.get('format') == 'parquet' and file_info.get('logical_role') in ['data_file', 'training_data', None]:
+            return file_info
+    return files[0] if files else None
+
+
+def resolve_dataset_file(dataset_id: str) -> Tuple[str, str, str]:
+    """
+    Détermine l'objet de stockage à lire pour un dataset.
+
+    Returns:
+        (object_path, format, version) ; version (updated_at du dataset) invalide le cache local
+
+    Raises:
+        DatasetLoadError: si aucun fichier n'est trouvé
+    """
+    manifest = manifest_resolver.get(dataset_id)
+    if manifest:
+        main_file = select_main_file(manifest)
+        if not main_file:
+            raise DatasetLoadError(f"Aucun fichier trouvé pour le dataset {dataset_id}")
+        storage_path = manifest.get('storage_path') or f'ibis-x-datasets/{dataset_id}'
+        object_path = f"{storage_path.rstrip('/')}/{main_file['file_name_in_storage']}"
+        return object_path, main_file.get('format') or 'parquet', str(manifest.get('updated_at') or '')
+
+    # Fallback sur les anciens chemins
+    storage_client = get_storage_client()
+    for file_name in LEGACY_FILE_NAMES:
+        object_path = f"ibis-x-datasets/{dataset_id}/{file_name}"
+        try:
+            storage_client.get_file_size(object_path)
+            return object_path, 'parquet', ''
+        except Exception:
+            continue
+    raise DatasetLoadError(f"Dataset {dataset_id} introuvable dans le stockage")
+
+
+# --- Lecture par plages ---
+
+class RangedStorageFile(io.RawIOBase):
+    """
+    Fichier en lecture seule adossé au stockage d'objets.
+
+    Chaque lecture devient une requête de plage ; pyarrow ne récupère ainsi que le
+    footer et les column chunks nécessaires au lieu de l'objet complet.
+    """
+
+    def __init__(self, storage_client, object_path: str, size: Optional[int] = None):
+        self.storage_client = storage_client
+        self.object_path = object_path
+        self.size = size if size is not None else storage_client.get_file_size(object_path)
+        self.position = 0
+        self.bytes_fetched = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"whence invalide: {whence}")
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        data = self.storage_client.download_range(self.object_path, self.position, length)
+        buffer[:len(data)] = data
+        self.position += len(data)
+        self.bytes_fetched += len(data)
+        return len(data)
+
+
+def _open_parquet(object_path: str, version: str = '') -> Tuple[pq.ParquetFile, Optional[RangedStorageFile]]:
+    """
+    Ouvre un Parquet : depuis le cache local du nœud en memory-map s'il est configuré
+    (workers), sinon à distance, en lecture par plages s'il est assez gros.
+    """
+    store = get_local_dataset_store()
+    if store is not None:
+        return pq.ParquetFile(store.open(object_path, version)), None
+
+    storage_client = get_storage_client()
+    size = storage_client.get_file_size(object_path)
+    if size < RANGED_READ_THRESHOLD:
+        return pq.ParquetFile(io.BytesIO(storage_client.download_file(object_path))), None
+
+    raw = RangedStorageFile(storage_client, object_path, size)
+    return pq.ParquetFile(io.BufferedReader(raw, buffer_size=RANGED_READ_BUFFER_SIZE)), raw
+
+
+def _read_ipc_table(object_path: str, version: str = '') -> pa.Table:
+    """Lit un fichier Arrow IPC ; depuis un memory-map, les colonnes ne sont pas copiées."""
+    store = get_local_dataset_store()
+    if store is not None:
+        source = store.open(object_path, version)
+    else:
+        source = pa.BufferReader(get_storage_client().download_file(object_path))
+    return pa.ipc.open_file(source).read_all()
+
+
+# --- Predicate pushdown ---
+
+def _value_may_match(op: str, value: Any, col_min: Any, col_max: Any) -> bool:
+    """Un row group de bornes [col_min, col_max] peut-il contenir une ligne vérifiant le prédicat ?"""
+    try:
+        if op in ('==', '='):
+            return col_min <= value <= col_max
+        if op == '!=':
+            return not (col_min == col_max == value)
+        if op == '<':
+            return col_min < value
+        if op == '<=':
+            return col_min <= value
+        if op == '>':
+            return col_max > value
+        if op == '>=':
+            return col_max >= value
+        if op == 'in':
+            return any(col_min <= v <= col_max for v in value)
+        if op == 'not in':
+            return not (col_min == col_max and col_min in value)
+    except TypeError:
+        # Types non comparables (ex: timestamp vs str) : impossible de conclure
+        return True
+    return True
+
+
+def _prune_row_groups(metadata: pq.FileMetaData, filters: List[Tuple[str, str, Any]]) -> List[int]:
+    """Indices des row groups dont les statistiques n'excluent aucun filtre."""
+    if metadata.num_row_groups == 0:
+        return []
+
+    first_group = metadata.row_group(0)
+    column_index = {first_group.column(j).path_in_schema: j for j in range(first_group.num_columns)}
+
+    kept = []
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        may_match = True
+        for column, op, value in filters:
+            j = column_index.get(column)
+            if j is None:
+                continue
+            statistics = row_group.column(j).statistics
+            if statistics is None or not statistics.has_min_max:
+                continue
+            if not _value_may_match(op, value, statistics.min, statistics.max):
+                may_match = False
+                break
+        if may_match:
+            kept.append(i)
+    return kept
+
+
+def _validate_filters(filters: Optional[List[Tuple[str, str, Any]]]) -> List[Tuple[str, str, Any]]:
+    """Normalise les filtres au format pyarrow (conjonction de tuples colonne, opérateur, valeur)."""
+    normalized = []
+    for column, op, value in filters or []:
+        if op not in SUPPORTED_FILTER_OPS:
+            raise ValueError(f"Opérateur de filtre non supporté: {op}")
+        normalized.append((column, '==' if op == '=' else op, value))
+    return normalized
+
+
+# --- Chargement ---
+
+def load_dataset(dataset_id: str,
+                 columns: Optional[List[str]] = None,
+                 exclude_columns: Optional[List[str]] = None,
+                 filters: Optional[List[Tuple[str, str, Any]]] = None,
+                 sample_size: Optional[int] = None,
+                 random_state: int = 42) -> pd.DataFrame:
+    """
+    Charge un dataset en ne lisant que ce qui est nécessaire.
+
+    Args:
+        dataset_id: identifiant du dataset dans service-selection
+        columns: colonnes à lire (None = toutes). Les colonnes inconnues sont ignorées.
+        exclude_columns: colonnes à ne pas lire (appliqué après `columns`)
+        filters: conjonction de prédicats (colonne, opérateur, valeur), ex: [('age', '>=', 18)]
+        sample_size: nombre de lignes maximum à retourner (None = toutes)
+        random_state: graine de l'échantillonnage
+
+    Raises:
+        DatasetLoadError: si le dataset est introuvable
+    """
+    filters = _validate_filters(filters)
+    object_path, file_format, version = resolve_dataset_file(dataset_id)
+    logger.info(f"Chargement du dataset {dataset_id} depuis {object_path}")
+
+    if file_format in IPC_FORMATS:
+        table = _read_ipc_table(object_path, version)
+        if filters:
+            table = table.filter(pq.filters_to_expression(filters))
+        df = table.select(_output_columns(table.schema.names, columns, exclude_columns)).to_pandas()
+        if sample_size and len(df) > sample_size:
+            df = df.sample(n=sample_size, random_state=random_state)
+        return df
+
+    if file_format != 'parquet':
+        return _load_flat_file(object_path, columns, exclude_columns, filters, sample_size, random_state)
+
+    parquet_file, raw = _open_parquet(object_path, version)
+    schema_names = parquet_file.schema_arrow.names
+
+    if columns is not None:
+        unknown = [c for c in columns if c not in schema_names]
+        if unknown:
+            logger.warning(f"Colonnes absentes du dataset {dataset_id}: {unknown}")
+    output_columns = _output_columns(schema_names, columns, exclude_columns)
+
+    read_columns = None
+    if output_columns != schema_names:
+        wanted = set(output_columns) | {column for column, _, _ in filters}
+        read_columns = [c for c in schema_names if c in wanted]
+
+    row_groups = _prune_row_groups(parquet_file.metadata, filters) if filters else list(range(parquet_file.num_row_groups))
+    skipped = parquet_file.num_row_groups - len(row_groups)
+    if skipped:
+        logger.info(f"{skipped}/{parquet_file.num_row_groups} row groups exclus par les statistiques")
+
+    if sample_size:
+        table = _read_sampled_row_groups(parquet_file, row_groups, read_columns, filters, sample_size, random_state)
+    elif row_groups:
+        table = parquet_file.read_row_groups(row_groups, columns=read_columns)
+        if filters:
+            table = table.filter(pq.filters_to_expression(filters))
+    else:
+        table = parquet_file.schema_arrow.empty_table()
+        if read_columns is not None:
+            table = table.select(read_columns)
+
+    df = table.to_pandas()
+    if read_columns is not None:
+        df = df[output_columns]
+    if sample_size and len(df) > sample_size:
+        df = df.sample(n=sample_size, random_state=random_state)
+
+    if raw is not None:
+        logger.info(f"Dataset {dataset_id}: {raw.bytes_fetched} / {raw.size} bytes téléchargés")
+    logger.info(f"Dataset chargé: {len(df)} lignes, {len(df.columns)} colonnes")
+    return df
+
+
+def sample_dataset(dataset_id: str,
+                   sample_size: int,
+                   target_column: Optional[str] = None,
+                   columns: Optional[List[str]] = None,
+                   random_state: int = 42) -> pd.DataFrame:
+    """
+    Échantillon représentatif d'un dataset, en une passe et à mémoire bornée.
+
+    Contrairement à l'échantillonnage par row groups de load_dataset, toutes les
+    lignes ont la même probabilité d'être retenues ; si target_column est fourni,
+    l'échantillon est stratifié sur la cible (voir app.ml.sampling).
+
+    Raises:
+        DatasetLoadError: si le dataset est introuvable
+    """
+    object_path, file_format, version = resolve_dataset_file(dataset_id)
+    logger.info(f"Échantillonnage du dataset {dataset_id} depuis {object_path} ({sample_size} lignes)")
+
+    if file_format in IPC_FORMATS:
+        table = _read_ipc_table(object_path, version)
+        if columns is not None:
+            wanted = set(columns) | ({target_column} if target_column else set())
+            table = table.select([c for c in table.schema.names if c in wanted])
+        return sample_batches(table.to_batches(max_chunksize=SAMPLING_BATCH_SIZE), table.schema,
+                              sample_size, target_column, random_state)
+
+    if file_format != 'parquet':
+        # Fallback CSV : pas de lecture par blocs fiable (types inférés par morceau)
+        df = _load_flat_file(object_path, columns, None, [], None, random_state)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        return sample_batches(table.to_batches(max_chunksize=SAMPLING_BATCH_SIZE), table.schema,
+                              sample_size, target_column, random_state)
+
+    parquet_file, raw = _open_parquet(object_path, version)
+    schema = parquet_file.schema_arrow
+    read_columns = None
+    if columns is not None:
+        wanted = set(columns) | ({target_column} if target_column else set())
+        read_columns = [c for c in schema.names if c in wanted]
+        schema = pa.schema([schema.field(c) for c in read_columns])
+
+    batches = parquet_file.iter_batches(batch_size=SAMPLING_BATCH_SIZE, columns=read_columns)
+    df = sample_batches(batches, schema, sample_size, target_column, random_state)
+
+    if raw is not None:
+        logger.info(f"Dataset {dataset_id}: {raw.bytes_fetched} / {raw.size} bytes téléchargés")
+    return df
+
+
+def dataset_columns(dataset_id: str) -> Optional[List[str]]:
+    """
+    Colonnes d'un dataset Parquet dans l'ordre du fichier, lues dans le footer.
+
+    Returns:
+        noms des colonnes, None pour les autres formats
+    """
+    object_path, file_format, version = resolve_dataset_file(dataset_id)
+    if file_format != 'parquet':
+        return None
+    parquet_file, _ = _open_parquet(object_path, version)
+    return parquet_file.schema_arrow.names
+
+
+def estimate_dataset_size(dataset_id: str,
+                          columns: Optional[List[str]] = None,
+                          exclude_columns: Optional[List[str]] = None) -> Optional[Dict[str, int]]:
+    """
+    Taille décompressée des colonnes utiles d'un dataset Parquet, lue dans le footer.
+
+    Returns:
+        {'rows', 'bytes'} ou None si le format ne permet pas d'estimer sans tout lire
+    """
+    object_path, file_format, version = resolve_dataset_file(dataset_id)
+    if file_format != 'parquet':
+        return None
+
+    parquet_file, _ = _open_parquet(object_path, version)
+    metadata = parquet_file.metadata
+    selected = set(_output_columns(parquet_file.schema_arrow.names, columns, exclude_columns))
+
+    total_bytes = 0
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            chunk = row_group.column(j)
+            if chunk.path_in_schema.split('.')[0] in selected:
+                total_bytes += chunk.total_uncompressed_size
+    return {'rows': metadata.num_rows, 'bytes': total_bytes}
+
+
+def iter_dataset_batches(dataset_id: str,
+                         columns: Optional[List[str]] = None,
+                         exclude_columns: Optional[List[str]] = None,
+                         batch_size: int = SAMPLING_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Parcourt un dataset Parquet par lots de batch_size lignes (mémoire bornée).
+
+    Raises:
+        DatasetLoadError: si le dataset est introuvable ou n'est pas au format Parquet
+    """
+    object_path, file_format, version = resolve_dataset_file(dataset_id)
+    if file_format != 'parquet':
+        raise DatasetLoadError(f"Lecture par lots non disponible pour le format {file_format}")
+
+    parquet_file, raw = _open_parquet(object_path, version)
+    output_columns = _output_columns(parquet_file.schema_arrow.names, columns, exclude_columns)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=output_columns):
+        yield batch.to_pandas()
+
+    if raw is not None:
+        logger.info(f"Dataset {dataset_id}: {raw.bytes_fetched} / {raw.size} bytes téléchargés")
+
+
+def _output_columns(schema_names: List[str],
+                    columns: Optional[List[str]],
+                    exclude_columns: Optional[List[str]]) -> List[str]:
+    """Colonnes retournées, dans l'ordre du fichier."""
+    excluded = set(exclude_columns or [])
+    return [c for c in schema_names
+            if (columns is None or c in columns) and c not in excluded]
+
+
+def _read_sampled_row_groups(parquet_file: pq.ParquetFile,
+                             row_groups: List[int],
+                             columns: Optional[List[str]],
+                             filters: List[Tuple[str, str, Any]],
+                             sample_size: int,
+                             random_state: int) -> pa.Table:
+    """
+    Lit des row groups tirés au hasard jusqu'à réunir au moins sample_size lignes.
+
+    Les row groups sont lus par lots dans un ordre aléatoire ; avec des filtres,
+    le nombre de lignes retenues n'est connu qu'après lecture, d'où la boucle.
+    """
+    metadata = parquet_file.metadata
+    rng = np.random.default_rng(random_state)
+    order = list(rng.permutation(row_groups)) if row_groups else []
+    expression = pq.filters_to_expression(filters) if filters else None
+
+    tables = []
+    collected = 0
+    while order and collected < sample_size:
+        batch = []
+        batch_rows = 0
+        while order and collected + batch_rows < sample_size:
+            index = int(order.pop(0))
+            batch.append(index)
+            batch_rows += metadata.row_group(index).num_rows
+
+        table = parquet_file.read_row_groups(sorted(batch), columns=columns)
+        if expression is not None:
+            table = table.filter(expression)
+        tables.append(table)
+        collected += table.num_rows
+
+    if not tables:
+        table = parquet_file.schema_arrow.empty_table()
+        return table.select(columns) if columns is not None else table
+    return pa.concat_tables(tables)
+
+
+def _load_flat_file(object_path: str,
+                    columns: Optional[List[str]],
+                    exclude_columns: Optional[List[str]],
+                    filters: List[Tuple[str, str, Any]],
+                    sample_size: Optional[int],
+                    random_state: int) -> pd.DataFrame:
+    """Fallback CSV : téléchargement complet mais parsing limité aux colonnes utiles."""
+    file_data = get_storage_client().download_file(object_path)
+
+    filter_columns = {column for column, _, _ in filters}
+    excluded = set(exclude_columns or [])
+    usecols = None
+    if columns is not None or excluded:
+        usecols = lambda c: c in filter_columns or ((columns is None or c in columns) and c not in excluded)
+
+    df = pd.read_csv(io.BytesIO(file_data), usecols=usecols)
+    if filters:
+        table = pa.Table.from_pandas(df, preserve_index=False).filter(pq.filters_to_expression(filters))
+        df = table.to_pandas()
+    df = df[_output_columns(list(df.columns), columns, exclude_columns)]
+    if sample_size and len(df) > sample_size:
+        df = df.sample(n=sample_size, random_state=random_state)
+    return df
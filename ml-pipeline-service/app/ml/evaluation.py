@@ -1,100 +1,206 @@
 import numpy as np
 import pandas as pd
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    confusion_matrix, classification_report, roc_auc_score, roc_curve,
-    mean_absolute_error, mean_squared_error, r2_score
-)
+from sklearn.metrics import roc_auc_score, roc_curve
 from sklearn.model_selection import cross_val_score, StratifiedKFold, KFold
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
 import io
-import base64
+import logging
+from joblib import Parallel, delayed
 from typing import Dict, Any, Optional, Union, List
 
-def evaluate_classification_model(model, X_test, y_test, average='weighted') -> Dict[str, Any]:
+class EvaluationContext:
+    """
+    Évaluation d'un modèle sur le jeu de test en une seule passe d'inférence.
+    
+    Prédictions, probabilités, matrice de confusion et importance des features
+    sont calculées une fois puis partagées par les métriques, les visualisations
+    et l'extraction de l'importance. Quand le modèle fournit predict_proba, les
+    prédictions en sont déduites (argmax) au lieu d'un second appel à predict.
+    """
+    
+    def __init__(self, model, X_test, y_test, task_type: str = 'classification'):
+        self.model = model
+        self.task_type = task_type
+        self.y_test = np.asarray(y_test)
+        self.y_proba = None
+        self._feature_importance = None
+        self._feature_importance_loaded = False
+        
+        if task_type == 'classification':
+            self.y_proba = self._predict_proba(X_test)
+            classes = getattr(model.model, 'classes_', None)
+            if self.y_proba is not None and classes is not None:
+                self.y_pred = classes.take(np.argmax(self.y_proba, axis=1))
+            else:
+                self.y_pred = model.predict(X_test)
+            self.labels, self.confusion_matrix = self._confusion_matrix()
+        else:
+            self.y_pred = np.asarray(model.predict(X_test))
+            self.labels, self.confusion_matrix = None, None
+    
+    def _predict_proba(self, X_test) -> Optional[np.ndarray]:
+        if not hasattr(self.model, 'predict_proba'):
+            return None
+        try:
+            return self.model.predict_proba(X_test)
+        except (NotImplementedError, AttributeError):
+            return None
+    
+    def _confusion_matrix(self):
+        """Labels (union vrais / prédits, triés) et matrice de confusion par bincount."""
+        labels, encoded = np.unique(np.concatenate([self.y_test, self.y_pred]), return_inverse=True)
+        n = len(self.y_test)
+        n_labels = len(labels)
+        counts = np.bincount(encoded[:n] * n_labels + encoded[n:], minlength=n_labels * n_labels)
+        return labels, counts.reshape(n_labels, n_labels)
+    
+    @property
+    def y_scores(self) -> Optional[np.ndarray]:
+        """Probabilité de la classe positive (classification binaire uniquement)."""
+        if self.y_proba is None or self.y_proba.shape[1] != 2:
+            return None
+        return self.y_proba[:, 1]
+    
+    @property
+    def feature_importance(self) -> Optional[Dict[str, Any]]:
+        if not self._feature_importance_loaded:
+            if hasattr(self.model, 'get_feature_importance'):
+                try:
+                    self._feature_importance = self.model.get_feature_importance()
+                except Exception as e:
+                    # Métadonnée facultative : ne fait jamais échouer l'entraînement
+                    logging.getLogger(__name__).warning(f"Feature importance unavailable: {str(e)}")
+            self._feature_importance_loaded = True
+        return self._feature_importance
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Division élément par élément, 0 là où le dénominateur est nul (zero_division=0)."""
+    result = np.zeros(len(numerator), dtype=float)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
+
+def classification_metrics_from_confusion(cm: np.ndarray, labels) -> Dict[str, Any]:
+    """
+    Accuracy, précision / rappel / F1 par classe, moyennes macro et pondérée
+    (mêmes valeurs que sklearn avec zero_division=0), dérivées de la matrice de confusion.
+    """
+    tp = np.diag(cm).astype(float)
+    support = cm.sum(axis=1).astype(float)
+    predicted = cm.sum(axis=0).astype(float)
+    total = support.sum()
+    
+    precision = _safe_divide(tp, predicted)
+    recall = _safe_divide(tp, support)
+    f1 = _safe_divide(2 * precision * recall, precision + recall)
+    weights = support / total if total else support
+    
+    def averages(w):
+        return {
+            'precision': float(precision @ w),
+            'recall': float(recall @ w),
+            'f1-score': float(f1 @ w),
+            'support': float(total)
+        }
+    
+    report = {
+        str(label): {
+            'precision': float(precision[i]),
+            'recall': float(recall[i]),
+            'f1-score': float(f1[i]),
+            'support': float(support[i])
+        }
+        for i, label in enumerate(labels)
+    }
+    report['accuracy'] = float(tp.sum() / total) if total else 0.0
+    report['macro avg'] = averages(np.full(len(labels), 1.0 / len(labels)))
+    report['weighted avg'] = averages(weights)
+    return report
+
+def evaluate_classification_model(model, X_test, y_test, average='weighted',
+                                  context: Optional[EvaluationContext] = None) -> Dict[str, Any]:
     """
     Evaluate a classification model
     
     Returns:
         Dict with metrics: accuracy, precision, recall, f1, confusion_matrix, etc.
     """
-    y_pred = model.predict(X_test)
+    if context is None:
+        context = EvaluationContext(model, X_test, y_test, 'classification')
     
+    report = classification_metrics_from_confusion(context.confusion_matrix, context.labels)
+    summary = report['weighted avg' if average == 'weighted' else 'macro avg']
     metrics = {
-        'accuracy': float(accuracy_score(y_test, y_pred)),
-        'precision': float(precision_score(y_test, y_pred, average=average, zero_division=0)),
-        'recall': float(recall_score(y_test, y_pred, average=average, zero_division=0)),
-        'f1_score': float(f1_score(y_test, y_pred, average=average, zero_division=0)),
-        'confusion_matrix': confusion_matrix(y_test, y_pred).tolist()
+        'accuracy': report['accuracy'],
+        'precision': summary['precision'],
+        'recall': summary['recall'],
+        'f1_score': summary['f1-score'],
+        'confusion_matrix': context.confusion_matrix.tolist(),
+        'classification_report': report
     }
     
     # Add ROC AUC if binary classification and model supports probabilities
-    if len(np.unique(y_test)) == 2 and hasattr(model, 'predict_proba'):
+    if context.y_scores is not None and len(np.unique(context.y_test)) == 2:
         try:
-            y_proba = model.predict_proba(X_test)[:, 1]
-            metrics['roc_auc'] = float(roc_auc_score(y_test, y_proba))
-        except:
+            metrics['roc_auc'] = float(roc_auc_score(context.y_test, context.y_scores))
+        except ValueError:
             pass
     
-    # Add classification report - Convert NumPy types
-    try:
-        report = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
-        # Convertir récursivement les types NumPy dans le rapport
-        def convert_numpy_recursive(obj):
-            if isinstance(obj, np.number):
-                return float(obj)
-            elif isinstance(obj, dict):
-                return {k: convert_numpy_recursive(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_numpy_recursive(item) for item in obj]
-            else:
-                return obj
-        metrics['classification_report'] = convert_numpy_recursive(report)
-    except:
-        pass
-    
     return metrics
 
-def evaluate_regression_model(model, X_test, y_test) -> Dict[str, Any]:
+def evaluate_regression_model(model, X_test, y_test,
+                              context: Optional[EvaluationContext] = None) -> Dict[str, Any]:
     """
     Evaluate a regression model
     
     Returns:
         Dict with metrics: mae, mse, rmse, r2
     """
-    y_pred = model.predict(X_test)
+    if context is None:
+        context = EvaluationContext(model, X_test, y_test, 'regression')
+    
+    y_true = context.y_test.astype(float)
+    residuals = y_true - context.y_pred
+    mse = float(np.mean(residuals ** 2))
+    total_variance = float(np.sum((y_true - y_true.mean()) ** 2))
     
     metrics = {
-        'mae': float(mean_absolute_error(y_test, y_pred)),
-        'mse': float(mean_squared_error(y_test, y_pred)),
-        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
-        'r2': float(r2_score(y_test, y_pred))
+        'mae': float(np.mean(np.abs(residuals))),
+        'mse': mse,
+        'rmse': float(np.sqrt(mse)),
+        # Même convention que r2_score pour une cible constante
+        'r2': 1.0 - float(np.sum(residuals ** 2)) / total_variance if total_variance else (1.0 if mse == 0 else 0.0)
     }
     
     return metrics
 
-def evaluate_model(model, X_test, y_test, task_type='classification') -> Dict[str, Any]:
+def evaluate_model(model, X_test, y_test, task_type='classification',
+                   context: Optional[EvaluationContext] = None) -> Dict[str, Any]:
     """
     Evaluate a model based on task type
     """
     if task_type == 'classification':
-        return evaluate_classification_model(model, X_test, y_test)
+        return evaluate_classification_model(model, X_test, y_test, context=context)
     else:
-        return evaluate_regression_model(model, X_test, y_test)
+        return evaluate_regression_model(model, X_test, y_test, context=context)
+
+def get_cv_strategy(y, task_type='classification', cv=5, random_state=42):
+    """
+    Découpage de validation croisée : stratifié en classification, sauf si une
+    classe compte moins de cv exemples (KFold simple dans ce cas).
+    """
+    if task_type == 'classification' and np.unique(y, return_counts=True)[1].min() >= cv:
+        return StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    return KFold(n_splits=cv, shuffle=True, random_state=random_state)
 
 def cross_validate_model(model, X, y, task_type='classification', cv=5) -> Dict[str, Any]:
     """
     Perform cross-validation
     """
-    if task_type == 'classification':
-        cv_strategy = StratifiedKFold(n_splits=cv, shuffle=True, random_state=42)
-        scoring = 'accuracy'
-    else:
-        cv_strategy = KFold(n_splits=cv, shuffle=True, random_state=42)
-        scoring = 'neg_mean_squared_error'
+    cv_strategy = get_cv_strategy(y, task_type, cv)
+    scoring = 'accuracy' if task_type == 'classification' else 'neg_mean_squared_error'
     
     scores = cross_val_score(model, X, y, cv=cv_strategy, scoring=scoring)
     
@@ -104,155 +210,163 @@ def cross_validate_model(model, X, y, task_type='classification', cv=5) -> Dict[
         'cv_std': float(scores.std())
     }
 
-def plot_confusion_matrix(y_true, y_pred, labels=None) -> str:
+# Rendu des figures : API objet de matplotlib (Figure, sans l'état global de pyplot),
+# utilisable dans des processus joblib ; les PNG sont produits directement en bytes
+VISUALIZATION_DPI = 100
+VISUALIZATION_FORMAT = 'png'
+# Au-delà, le nuage de points de régression est tracé sur un échantillon
+REGRESSION_PLOT_MAX_POINTS = 5000
+
+def _figure_bytes(fig: Figure) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=VISUALIZATION_FORMAT, dpi=VISUALIZATION_DPI, bbox_inches='tight')
+    return buffer.getvalue()
+
+def plot_confusion_matrix(cm, labels=None) -> bytes:
     """
-    Plot confusion matrix and return as base64 encoded image
+    Plot a confusion matrix (counts) and return PNG bytes
     """
-    cm = confusion_matrix(y_true, y_pred)
-    
-    plt.figure(figsize=(8, 6))
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=labels, yticklabels=labels)
-    plt.title('Matrice de Confusion')
-    plt.ylabel('Vraie Classe')
-    plt.xlabel('Classe Prédite')
-    
-    # Save to buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-    plt.close()
-    
-    # Encode to base64
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode()
+                xticklabels=labels if labels is not None else 'auto',
+                yticklabels=labels if labels is not None else 'auto', ax=ax)
+    ax.set_title('Matrice de Confusion')
+    ax.set_ylabel('Vraie Classe')
+    ax.set_xlabel('Classe Prédite')
     
-    return image_base64
+    return _figure_bytes(fig)
 
-def plot_feature_importance(feature_importance: Dict[str, float], top_n=20) -> str:
+def plot_feature_importance(feature_importance: Dict[str, float], top_n=20) -> bytes:
     """
-    Plot feature importance and return as base64 encoded image
+    Plot feature importance and return PNG bytes
     """
     # Sort features by importance
     sorted_features = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:top_n]
     features, importance = zip(*sorted_features) if sorted_features else ([], [])
     
-    plt.figure(figsize=(10, 8))
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
     y_pos = np.arange(len(features))
-    plt.barh(y_pos, importance, align='center')
-    plt.yticks(y_pos, features)
-    plt.xlabel('Importance')
-    plt.title(f'Top {top_n} Features les Plus Importantes')
-    plt.tight_layout()
-    
-    # Save to buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-    plt.close()
+    ax.barh(y_pos, importance, align='center')
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(features)
+    ax.set_xlabel('Importance')
+    ax.set_title(f'Top {top_n} Features les Plus Importantes')
+    fig.tight_layout()
     
-    # Encode to base64
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode()
-    
-    return image_base64
+    return _figure_bytes(fig)
 
-def plot_roc_curve(y_true, y_scores) -> str:
+def plot_roc_curve(y_true, y_scores) -> bytes:
     """
     Plot ROC curve for binary classification
     """
     fpr, tpr, _ = roc_curve(y_true, y_scores)
     roc_auc = roc_auc_score(y_true, y_scores)
     
-    plt.figure(figsize=(8, 6))
-    plt.plot(fpr, tpr, color='darkorange', lw=2, 
-             label=f'Courbe ROC (AUC = {roc_auc:.2f})')
-    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('Taux de Faux Positifs')
-    plt.ylabel('Taux de Vrais Positifs')
-    plt.title('Courbe ROC (Receiver Operating Characteristic)')
-    plt.legend(loc="lower right")
-    
-    # Save to buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-    plt.close()
-    
-    # Encode to base64
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode()
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    ax.plot(fpr, tpr, color='darkorange', lw=2, 
+            label=f'Courbe ROC (AUC = {roc_auc:.2f})')
+    ax.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
+    ax.set_xlim([0.0, 1.0])
+    ax.set_ylim([0.0, 1.05])
+    ax.set_xlabel('Taux de Faux Positifs')
+    ax.set_ylabel('Taux de Vrais Positifs')
+    ax.set_title('Courbe ROC (Receiver Operating Characteristic)')
+    ax.legend(loc="lower right")
     
-    return image_base64
+    return _figure_bytes(fig)
 
-def plot_regression_results(y_true, y_pred) -> str:
+def plot_regression_results(y_true, y_pred, max_points=REGRESSION_PLOT_MAX_POINTS) -> bytes:
     """
     Plot regression results: actual vs predicted
     """
-    plt.figure(figsize=(8, 6))
-    plt.scatter(y_true, y_pred, alpha=0.5)
-    plt.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], 
-             'r--', lw=2)
-    plt.xlabel('Valeurs Réelles')
-    plt.ylabel('Valeurs Prédites')
-    plt.title('Prédictions vs Valeurs Réelles')
-    
-    # Save to buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-    plt.close()
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    low, high = y_true.min(), y_true.max()
+    if len(y_true) > max_points:
+        # Un échantillon suffit à l'allure du nuage ; les bornes restent celles des données complètes
+        sample = np.random.default_rng(0).choice(len(y_true), max_points, replace=False)
+        y_true, y_pred = y_true[sample], y_pred[sample]
     
-    # Encode to base64
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode()
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    ax.scatter(y_true, y_pred, alpha=0.5, rasterized=True)
+    ax.plot([low, high], [low, high], 'r--', lw=2)
+    ax.set_xlabel('Valeurs Réelles')
+    ax.set_ylabel('Valeurs Prédites')
+    ax.set_title('Prédictions vs Valeurs Réelles')
     
-    return image_base64
+    return _figure_bytes(fig)
+
+def _render(name: str, plot, args) -> Optional[bytes]:
+    """Rend une figure ; une figure en échec n'empêche pas les autres"""
+    try:
+        return plot(*args)
+    except Exception as e:
+        print(f"Error generating visualization {name}: {str(e)}")
+        return None
 
 def generate_visualizations(model, X_test, y_test, feature_names=None, 
-                          task_type='classification') -> Dict[str, Dict[str, str]]:
+                          task_type='classification',
+                          context: Optional[EvaluationContext] = None,
+                          n_jobs: int = 1) -> Dict[str, Dict[str, Any]]:
     """
     Generate all visualizations for the model
     
+    Les figures sont rendues en parallèle (processus joblib) si n_jobs > 1, à
+    partir du contexte d'évaluation (aucune inférence supplémentaire).
+    
     Returns:
-        Dict with visualization names as keys and dict with 'image' key containing base64 data
+        Dict with visualization names as keys and dict with 'data' (image bytes)
+        and 'format' keys
     """
-    visualizations = {}
+    jobs = []
     
     try:
+        if context is None:
+            context = EvaluationContext(model, X_test, y_test, task_type)
+        
         if task_type == 'classification':
             # Confusion matrix
-            y_pred = model.predict(X_test)
-            cm_image = plot_confusion_matrix(y_test, y_pred)
-            visualizations['confusion_matrix'] = {'image': cm_image}
+            jobs.append(('confusion_matrix', plot_confusion_matrix, (context.confusion_matrix, context.labels)))
             
             # ROC curve for binary classification
-            if len(np.unique(y_test)) == 2 and hasattr(model, 'predict_proba'):
-                y_scores = model.predict_proba(X_test)[:, 1]
-                roc_image = plot_roc_curve(y_test, y_scores)
-                visualizations['roc_curve'] = {'image': roc_image}
+            if context.y_scores is not None and len(np.unique(context.y_test)) == 2:
+                jobs.append(('roc_curve', plot_roc_curve, (context.y_test, context.y_scores)))
         else:
             # Regression plots
-            y_pred = model.predict(X_test)
-            reg_image = plot_regression_results(y_test, y_pred)
-            visualizations['regression_plot'] = {'image': reg_image}
+            jobs.append(('regression_plot', plot_regression_results, (context.y_test, context.y_pred)))
         
         # Feature importance
-        if hasattr(model, 'get_feature_importance'):
-            importance_data = model.get_feature_importance()
-            if importance_data is not None:
-                features = importance_data.get('features', [])
-                importance = importance_data.get('importance', [])
-                
-                # Use actual feature names if provided
-                if feature_names is not None and len(feature_names) == len(features):
-                    feature_importance_dict = dict(zip(feature_names, importance))
-                else:
-                    feature_importance_dict = dict(zip(features, importance))
-                
-                if feature_importance_dict:
-                    fi_image = plot_feature_importance(feature_importance_dict)
-                    visualizations['feature_importance'] = {'image': fi_image}
+        importance_data = context.feature_importance
+        if importance_data is not None:
+            features = importance_data.get('features', [])
+            importance = importance_data.get('importance', [])
+            
+            # Use actual feature names if provided
+            if feature_names is not None and len(feature_names) == len(features):
+                feature_importance_dict = dict(zip(feature_names, importance))
+            else:
+                feature_importance_dict = dict(zip(features, importance))
+            
+            if feature_importance_dict:
+                jobs.append(('feature_importance', plot_feature_importance, (feature_importance_dict,)))
     
     except Exception as e:
         print(f"Error generating visualizations: {str(e)}")
     
-    return visualizations 
\ No newline at end of file
+    if not jobs:
+        return {}
+    
+    if n_jobs > 1 and len(jobs) > 1:
+        images = Parallel(n_jobs=min(n_jobs, len(jobs)))(delayed(_render)(name, plot, args) for name, plot, args in jobs)
+    else:
+        images = [_render(name, plot, args) for name, plot, args in jobs]
+    
+    return {
+        name: {'data': image, 'format': VISUALIZATION_FORMAT}
+        for (name, _, _), image in zip(jobs, images)
+        if image is not None
+    }
@@ -0,0 +1,207 @@
+"""
+Entraînement de datasets plus grands que la mémoire d'un worker.
+
+Trois modes, choisis automatiquement d'après la taille estimée du dataset
+(footer Parquet) et le budget mémoire du worker :
+
+- in_memory : chemin habituel (DataFrame complet, preprocess_data)
+- incremental : pour les modèles à partial_fit (SGD, Naive Bayes). Le
+  preprocessing est ajusté sur un échantillon stratifié, puis les record
+  batches Parquet sont transformés et passés au modèle un par un ; le jeu de
+  test est prélevé au fil du flux (taille bornée)
+- subsample : pour les autres modèles (arbres), entraînement en mémoire sur un
+  échantillon stratifié dont la taille tient dans le budget
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.preprocessing import LabelEncoder
+
+from app.ml.algorithms import ALGORITHM_WRAPPERS
+from app.ml.dataset_loader import iter_dataset_batches, sample_dataset
+from app.ml.preprocessing import build_preprocessor
+from app.ml.sampling import MAX_STRATA, MIN_ROWS_PER_STRATUM
+
+logger = logging.getLogger(__name__)
+
+TRAINING_MODES = ('auto', 'in_memory', 'incremental', 'subsample')
+
+# Mémoire occupée par l'entraînement en mémoire, rapportée à la taille décompressée
+# des données : DataFrame pandas, copies train/test, matrices transformées
+MEMORY_EXPANSION_FACTOR = 4
+MIN_SUBSAMPLE_ROWS = 10000
+# Échantillon sur lequel le preprocessing est ajusté en mode incrémental
+PREPROCESSING_FIT_ROWS = 50000
+INCREMENTAL_BATCH_SIZE = 50000
+# Taille maximale du jeu de test prélevé au fil du flux
+HOLDOUT_MAX_ROWS = 100000
+
+
+def choose_training_mode(algorithm: str,
+                         estimate: Optional[Dict[str, int]],
+                         memory_budget: int,
+                         requested: str = 'auto',
+                         needs_in_memory: bool = False) -> str:
+    """
+    Mode d'entraînement effectif.
+
+    Args:
+        estimate: {'rows', 'bytes'} (estimate_dataset_size), None si inconnu
+        requested: preprocessing_config['training_mode']
+        needs_in_memory: la recherche d'hyperparamètres exige les données en mémoire
+    """
+    wrapper_class = ALGORITHM_WRAPPERS.get(algorithm)
+    incremental_supported = wrapper_class is not None and wrapper_class.supports_partial_fit and not needs_in_memory
+
+    if requested not in TRAINING_MODES:
+        raise ValueError(f"Unknown training mode: {requested}")
+    if requested == 'incremental' and not incremental_supported:
+        raise ValueError(f"Incremental training is not available for {algorithm}")
+    if requested != 'auto':
+        return requested
+
+    if estimate is None or estimate['bytes'] * MEMORY_EXPANSION_FACTOR <= memory_budget:
+        return 'in_memory'
+    mode = 'incremental' if incremental_supported else 'subsample'
+    logger.info(f"Dataset estimé à {estimate['bytes']} bytes ({estimate['rows']} lignes), "
+                f"budget {memory_budget} bytes : mode {mode}")
+    return mode
+
+
+def subsample_rows(estimate: Optional[Dict[str, int]], memory_budget: int, max_rows: Optional[int] = None) -> int:
+    """
+    Nombre de lignes qui tient dans le budget mémoire (mode subsample).
+
+    L'échantillonneur stratifié garde en plus une réserve par classe rare
+    (MAX_STRATA * MIN_ROWS_PER_STRATUM lignes au plus), déduite du budget.
+    """
+    if max_rows:
+        return max_rows
+    if not estimate or not estimate['rows']:
+        return MIN_SUBSAMPLE_ROWS
+    bytes_per_row = max(1, estimate['bytes'] / estimate['rows'])
+    rows = int(memory_budget / (MEMORY_EXPANSION_FACTOR * bytes_per_row)) - MAX_STRATA * MIN_ROWS_PER_STRATUM
+    return min(estimate['rows'], max(MIN_SUBSAMPLE_ROWS, rows))
+
+
+def _missing_columns_to_drop(df: pd.DataFrame, missing_config: Dict[str, Any], target_column: str) -> List[str]:
+    """Colonnes écartées par handle_missing_values (seuil de valeurs manquantes), décidé sur l'échantillon."""
+    threshold = missing_config.get('threshold', 0.8)
+    missing_ratio = df.isnull().mean()
+    return [c for c in missing_ratio[missing_ratio > threshold].index if c != target_column]
+
+
+def _stack(blocks: List[Any]):
+    if any(sp.issparse(block) for block in blocks):
+        return sp.vstack(blocks, format='csr')
+    return np.vstack(blocks)
+
+
+def train_incremental(dataset_id: str,
+                      algorithm: str,
+                      task_type: str,
+                      hyperparameters: Dict[str, Any],
+                      preprocessing_config: Dict[str, Any],
+                      columns: Optional[List[str]] = None,
+                      exclude_columns: Optional[List[str]] = None,
+                      total_rows: Optional[int] = None,
+                      progress_callback: Optional[Callable[[float], None]] = None) -> Tuple[Any, Any, Any, np.ndarray, Optional[List[Any]]]:
+    """
+    Entraîne un modèle à partial_fit en une passe sur le dataset.
+
+    Les stratégies d'imputation 'knn' et 'iterative' ne sont pas applicables lot
+    par lot : l'imputation simple du pipeline (moyenne) les remplace.
+
+    Returns:
+        (model, preprocessing_pipeline, X_test, y_test, label_classes)
+    """
+    target_column = preprocessing_config['target_column']
+    test_size = preprocessing_config.get('test_size', 0.2)
+    random_state = preprocessing_config.get('random_state', 42)
+    missing_config = preprocessing_config.get('missing_values', {'strategy': 'mean'})
+    drop_missing_rows = missing_config.get('strategy') == 'drop'
+
+    # 1. Preprocessing ajusté sur un échantillon représentatif (stratifié en classification)
+    sample = sample_dataset(dataset_id, PREPROCESSING_FIT_ROWS,
+                            target_column=target_column if task_type == 'classification' else None,
+                            columns=columns, random_state=random_state)
+    sample = sample.drop(columns=[c for c in exclude_columns or [] if c in sample.columns])
+    dropped_columns = _missing_columns_to_drop(sample, missing_config, target_column)
+    sample = sample.drop(columns=dropped_columns).dropna(subset=[target_column])
+    if drop_missing_rows:
+        sample = sample.dropna()
+
+    X_sample = sample.drop(columns=[target_column])
+    y_sample = sample[target_column]
+
+    label_encoder = None
+    classes = None
+    if task_type == 'classification':
+        if not pd.api.types.is_numeric_dtype(y_sample):
+            label_encoder = LabelEncoder().fit(y_sample)
+            y_sample = label_encoder.transform(y_sample)
+        classes = np.unique(y_sample)
+
+    preprocessor = build_preprocessor(X_sample, preprocessing_config, task_type,
+                                      len(classes) if classes is not None else 0)
+    preprocessor.fit(X_sample, y_sample)
+    feature_columns = list(X_sample.columns)
+    del sample, X_sample, y_sample
+
+    # 2. Un lot à la fois : transformation, prélèvement du test, partial_fit
+    model = ALGORITHM_WRAPPERS[algorithm](task_type=task_type, **hyperparameters)
+    rng = np.random.default_rng(random_state)
+    holdout_rate = test_size
+    if total_rows:
+        holdout_rate = min(test_size, HOLDOUT_MAX_ROWS / max(1, total_rows))
+
+    test_blocks, test_targets = [], []
+    rows_seen = rows_trained = skipped_unknown = 0
+    for batch in iter_dataset_batches(dataset_id, columns, exclude_columns, INCREMENTAL_BATCH_SIZE):
+        rows_seen += len(batch)
+        batch = batch.drop(columns=[c for c in dropped_columns if c in batch.columns]).dropna(subset=[target_column])
+        if drop_missing_rows:
+            batch = batch.dropna()
+        elif missing_config.get('strategy') == 'forward_fill':
+            batch = batch.ffill()
+
+        y_batch = batch[target_column]
+        if label_encoder is not None:
+            # Classes absentes de l'échantillon : lignes ignorées (le modèle ne peut pas les apprendre)
+            known = y_batch.isin(label_encoder.classes_)
+            skipped_unknown += int((~known).sum())
+            batch, y_batch = batch[known], y_batch[known]
+            y_batch = label_encoder.transform(y_batch)
+        elif classes is not None:
+            known = np.isin(y_batch.to_numpy(), classes)
+            skipped_unknown += int((~known).sum())
+            batch, y_batch = batch[known], y_batch[known]
+        y_batch = np.asarray(y_batch)
+        if len(batch) == 0:
+            continue
+
+        X_batch = preprocessor.transform(batch.reindex(columns=feature_columns))
+        is_test = rng.random(len(batch)) < holdout_rate
+        if is_test.any():
+            test_blocks.append(X_batch[np.flatnonzero(is_test)])
+            test_targets.append(y_batch[is_test])
+        train_indices = np.flatnonzero(~is_test)
+        if len(train_indices):
+            model.partial_fit(X_batch[train_indices], y_batch[train_indices], classes=classes)
+            rows_trained += len(train_indices)
+
+        if progress_callback is not None and total_rows:
+            progress_callback(min(1.0, rows_seen / total_rows))
+
+    if skipped_unknown:
+        logger.warning(f"{skipped_unknown} lignes ignorées : classe absente de l'échantillon d'ajustement")
+    if not rows_trained or not test_blocks:
+        raise ValueError("Not enough rows for incremental training")
+
+    logger.info(f"Entraînement incrémental terminé: {rows_trained} lignes d'entraînement sur {rows_seen} lues")
+    label_classes = label_encoder.classes_.tolist() if label_encoder is not None else None
+    return model, preprocessor, _stack(test_blocks), np.concatenate(test_targets), label_classes
@@ -2,7 +2,11 @@ import pandas as pd
 import numpy as np
 import logging
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, OneHotEncoder, LabelEncoder, MinMaxScaler, RobustScaler
+from sklearn.preprocessing import (
+    StandardScaler, OneHotEncoder, OrdinalEncoder, TargetEncoder, LabelEncoder,
+    MinMaxScaler, RobustScaler, FunctionTransformer
+)
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.experimental import enable_iterative_imputer  # DOIT être importé EN PREMIER
 from sklearn.impute import SimpleImputer, KNNImputer, IterativeImputer
 from sklearn.compose import ColumnTransformer
@@ -19,6 +23,49 @@ warnings.filterwarnings('ignore')
 # Configure logger pour ce module
 logger = logging.getLogger(__name__)
 
+def _nan_skew_normaltest(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Effectif, skewness et p-value du test de normalité de chaque colonne, NaN ignorés.
+    
+    Mêmes formules que stats.skew et stats.normaltest (skewtest + kurtosistest),
+    calculées en une passe sur la matrice au lieu d'un appel par colonne.
+    Les colonnes de moins de 8 valeurs ou constantes ont une p-value NaN.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = np.sum(~np.isnan(values), axis=0).astype(np.float64)
+        deviations = values - np.nanmean(values, axis=0)
+        m2 = np.nanmean(deviations ** 2, axis=0)
+        m3 = np.nanmean(deviations ** 3, axis=0)
+        m4 = np.nanmean(deviations ** 4, axis=0)
+        skewness = m3 / m2 ** 1.5
+        kurtosis = m4 / m2 ** 2
+        
+        # skewtest
+        y = skewness * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+        beta2 = 3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+        
+        # kurtosistest
+        expected = 3.0 * (n - 1) / (n + 1)
+        variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x = (kurtosis - expected) / np.sqrt(variance)
+        sqrt_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3)))
+        a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+        term1 = 1 - 2 / (9.0 * a)
+        denominator = 1 + x * np.sqrt(2 / (a - 4.0))
+        term2 = np.sign(denominator) * np.where(denominator == 0.0, np.nan,
+                                                 np.power((1 - 2.0 / a) / np.abs(denominator), 1 / 3.0))
+        z_kurtosis = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+        
+        # K² suit une loi du chi² à 2 degrés de liberté : sf(k2) = exp(-k2 / 2)
+        p_values = np.exp(-(z_skew ** 2 + z_kurtosis ** 2) / 2)
+    p_values[n < 8] = np.nan
+    return n, skewness, p_values
+
 class DataQualityAnalyzer:
     """Analyseur de qualité des données pour détecter les problèmes et patterns."""
     
@@ -29,6 +76,9 @@ class DataQualityAnalyzer:
         """
         Analyse complète des données manquantes.
         
+        Une seule matrice isnull() sert aux comptes par colonne et aux patterns ;
+        les distributions des colonnes numériques sont analysées en un lot.
+        
         Returns:
             Dict avec statistiques détaillées, patterns et recommandations
         """
@@ -41,19 +91,26 @@ class DataQualityAnalyzer:
             'severity_assessment': {}
         }
         
-        # Analyse par colonne
-        for column in df.columns:
-            missing_count = df[column].isnull().sum()
-            missing_percentage = (missing_count / len(df)) * 100
+        missing = df.isnull()
+        missing_counts = missing.sum()
+        missing_columns = missing_counts.index[missing_counts > 0]
+        
+        if len(missing_columns) > 0:
+            missing_percentages = missing_counts[missing_columns] / len(df) * 100
+            unique_counts = df[missing_columns].nunique()
+            distributions = self._analyze_distributions(df[missing_columns])
             
-            if missing_count > 0:
+            # Analyse par colonne (colonnes avec valeurs manquantes uniquement)
+            for column in missing_columns:
+                missing_percentage = float(missing_percentages[column])
+                unique_values = int(unique_counts[column])
                 column_analysis = {
-                    'missing_count': int(missing_count),
+                    'missing_count': int(missing_counts[column]),
                     'missing_percentage': round(missing_percentage, 2),
                     'data_type': str(df[column].dtype),
-                    'unique_values': int(df[column].nunique()) if not df[column].isnull().all() else 0,
-                    'is_categorical': df[column].dtype == 'object' or df[column].nunique() < 10,
-                    'distribution_type': self._analyze_distribution(df[column])
+                    'unique_values': unique_values,
+                    'is_categorical': df[column].dtype == 'object' or unique_values < 10,
+                    'distribution_type': distributions[column]
                 }
                 
                 # Recommandations basées sur l'analyse
@@ -66,41 +123,46 @@ class DataQualityAnalyzer:
                 missing_analysis['columns_with_missing'][column] = column_analysis
         
         # Analyse des patterns de données manquantes
-        missing_analysis['missing_patterns'] = self._analyze_missing_patterns(df)
+        missing_analysis['missing_patterns'] = self._analyze_missing_patterns(df, missing)
         
         # Évaluation de la sévérité globale
         missing_analysis['severity_assessment'] = self._assess_overall_severity(missing_analysis)
         
         return missing_analysis
     
-    def _analyze_distribution(self, series: pd.Series) -> str:
-        """Analyse le type de distribution d'une série numérique."""
-        if series.dtype == 'object':
-            return 'categorical'
-        
-        # Nettoyer les valeurs NaN pour l'analyse
-        clean_series = series.dropna()
-        if len(clean_series) < 10:
-            return 'insufficient_data'
-        
-        # Test de normalité
-        try:
-            _, p_value = stats.normaltest(clean_series)
-            if p_value > 0.05:
-                return 'normal'
-        except:
-            pass
-        
-        # Test de skewness
-        skewness = stats.skew(clean_series)
-        if abs(skewness) < 0.5:
-            return 'symmetric'
-        elif skewness > 1:
-            return 'right_skewed'
-        elif skewness < -1:
-            return 'left_skewed'
-        else:
-            return 'moderately_skewed'
+    def _analyze_distributions(self, df: pd.DataFrame) -> Dict[str, str]:
+        """
+        Type de distribution de chaque colonne.
+        
+        Skewness et test de normalité (D'Agostino-Pearson, comme stats.normaltest)
+        sont calculés pour toutes les colonnes numériques à la fois, en ignorant
+        les NaN colonne par colonne.
+        """
+        distributions = {column: 'categorical' for column in df.columns}
+        numeric_columns = [
+            column for column in df.columns
+            if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column])
+        ]
+        if not numeric_columns:
+            return distributions
+        
+        values = df[numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        counts, skewness, p_values = _nan_skew_normaltest(values)
+        
+        for i, column in enumerate(numeric_columns):
+            if counts[i] < 10:
+                distributions[column] = 'insufficient_data'
+            elif p_values[i] > 0.05:
+                distributions[column] = 'normal'
+            elif abs(skewness[i]) < 0.5:
+                distributions[column] = 'symmetric'
+            elif skewness[i] > 1:
+                distributions[column] = 'right_skewed'
+            elif skewness[i] < -1:
+                distributions[column] = 'left_skewed'
+            else:
+                distributions[column] = 'moderately_skewed'
+        return distributions
     
     def _recommend_strategy(self, missing_percentage: float, is_categorical: bool, distribution_type: str) -> Dict[str, Any]:
         """Recommande une stratégie de traitement basée sur l'analyse."""
@@ -152,30 +214,35 @@ class DataQualityAnalyzer:
         
         return recommendations
     
-    def _analyze_missing_patterns(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_missing_patterns(self, df: pd.DataFrame, missing: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """Analyse les patterns de données manquantes entre colonnes."""
-        # Matrice de corrélation des données manquantes
-        missing_df = df.isnull()
+        if missing is None:
+            missing = df.isnull()
+        mask = missing.to_numpy()
+        column_missing = mask.sum(axis=0)
         
         patterns = {
-            'completely_missing_rows': int(missing_df.all(axis=1).sum()),
-            'completely_missing_columns': list(missing_df.columns[missing_df.all()]),
+            'completely_missing_rows': int(mask.all(axis=1).sum()) if mask.shape[1] else 0,
+            'completely_missing_columns': list(missing.columns[column_missing == len(mask)]) if len(mask) else [],
             'correlated_missing': {}
         }
         
-        # Colonnes avec des patterns de manquement corrélés
-        if len(missing_df.columns) > 1:
-            corr_matrix = missing_df.corr()
+        # Colonnes avec des patterns de manquement corrélés. Seules les colonnes
+        # partiellement manquantes ont une variance non nulle (corrélation définie)
+        if len(missing.columns) > 1:
+            partial = np.flatnonzero((column_missing > 0) & (column_missing < len(mask)))
             high_correlations = []
-            for i in range(len(corr_matrix.columns)):
-                for j in range(i+1, len(corr_matrix.columns)):
-                    corr_value = corr_matrix.iloc[i, j]
-                    if abs(corr_value) > 0.7:  # Seuil de corrélation élevée
-                        high_correlations.append({
-                            'column1': corr_matrix.columns[i],
-                            'column2': corr_matrix.columns[j],
-                            'correlation': round(corr_value, 3)
-                        })
+            if len(partial) > 1:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    corr_matrix = np.corrcoef(mask[:, partial], rowvar=False)
+                # Triangle supérieur strict : chaque paire une seule fois
+                rows, cols = np.nonzero(np.triu(np.abs(corr_matrix) > 0.7, k=1))  # Seuil de corrélation élevée
+                for i, j in zip(rows, cols):
+                    high_correlations.append({
+                        'column1': missing.columns[partial[i]],
+                        'column2': missing.columns[partial[j]],
+                        'correlation': round(float(corr_matrix[i, j]), 3)
+                    })
             patterns['correlated_missing'] = high_correlations
         
         return patterns
@@ -234,85 +301,149 @@ class DataQualityAnalyzer:
         
         return severity
 
+# Nombre maximum d'indices d'outliers rapportés par colonne (taille du JSON)
+MAX_OUTLIER_INDICES = 100
+# Lignes sur lesquelles l'IsolationForest est ajustée
+ISOLATION_FOREST_SAMPLE_SIZE = 10000
+
+
+def _numeric_matrix(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """Colonnes numériques en matrice float64 (NaN pour les valeurs manquantes)."""
+    return df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _capped_indices(index: pd.Index, mask: np.ndarray, counts: np.ndarray, limit: int) -> List[List[Any]]:
+    """Premiers indices (au plus limit) des lignes marquées, pour chaque colonne de mask."""
+    # np.nonzero sur la transposée : positions triées par colonne puis par ligne
+    _, rows = np.nonzero(mask.T)
+    per_column = np.split(rows, np.cumsum(counts)[:-1]) if len(counts) else []
+    return [index[positions[:limit]].tolist() for positions in per_column]
+
+
+def _safe_float(value: float) -> Optional[float]:
+    """None pour NaN (sérialisation JSON)."""
+    return float(value) if not np.isnan(value) else None
+
+
 class OutlierDetector:
-    """Détecteur d'outliers avec différentes méthodes."""
+    """
+    Détecteur d'outliers avec différentes méthodes.
+    
+    detect_outliers traite toutes les colonnes numériques à la fois : quantiles,
+    moyennes et écarts-types calculés en un appel sur la matrice, masques
+    obtenus par broadcast.
+    """
     
     @staticmethod
-    def detect_outliers_iqr(df: pd.DataFrame, columns: List[str] = None) -> Dict[str, Any]:
-        """Détection d'outliers avec la méthode IQR."""
+    def detect_outliers(df: pd.DataFrame, columns: List[str] = None, threshold: float = 3,
+                        max_indices: int = MAX_OUTLIER_INDICES) -> Dict[str, Dict[str, Any]]:
+        """
+        Détection IQR et Z-score sur toutes les colonnes numériques.
+        
+        Returns:
+            {'iqr_method': {colonne: {...}}, 'zscore_method': {colonne: {...}}}
+        """
         if columns is None:
             columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        columns = [column for column in columns if column in df.columns]
+        if not columns or len(df) == 0:
+            return {'iqr_method': {}, 'zscore_method': {}}
         
-        outliers_info = {}
+        values = _numeric_matrix(df, columns)
+        total_rows = len(df)
+        valid_counts = np.sum(~np.isnan(values), axis=0)
         
-        for column in columns:
-            if column in df.columns:
-                Q1 = df[column].quantile(0.25)
-                Q3 = df[column].quantile(0.75)
-                IQR = Q3 - Q1
-                
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                
-                outliers_mask = (df[column] < lower_bound) | (df[column] > upper_bound)
-                outliers_count = outliers_mask.sum()
-                
-                # Gérer les valeurs NaN pour la sérialisation JSON
-                lower_bound_safe = float(lower_bound) if not np.isnan(lower_bound) else None
-                upper_bound_safe = float(upper_bound) if not np.isnan(upper_bound) else None
-                
-                # Calcul sécurisé du pourcentage pour éviter division par zéro
-                total_rows = len(df)
-                if total_rows > 0:
-                    outliers_percentage = round((outliers_count / total_rows) * 100, 2)
-                else:
-                    outliers_percentage = 0.0
-                
-                outliers_info[column] = {
-                    'method': 'IQR',
-                    'outliers_count': int(outliers_count),
-                    'outliers_percentage': outliers_percentage,
-                    'lower_bound': lower_bound_safe,
-                    'upper_bound': upper_bound_safe,
-                    'outliers_indices': df[outliers_mask].index.tolist()[:100]  # Limiter pour éviter JSON trop gros
-                }
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # IQR : les deux quantiles de toutes les colonnes en un appel
+            q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+            iqr = q3 - q1
+            lower_bounds = q1 - 1.5 * iqr
+            upper_bounds = q3 + 1.5 * iqr
+            iqr_mask = (values < lower_bounds) | (values > upper_bounds)
+            
+            # Z-score (écart-type de population, comme stats.zscore) ; NaN jamais marqués
+            z_scores = np.abs(values - np.nanmean(values, axis=0)) / np.nanstd(values, axis=0)
+            zscore_mask = z_scores > threshold
+            max_zscores = np.max(np.where(np.isnan(z_scores), -np.inf, z_scores), axis=0)
+        
+        iqr_counts = iqr_mask.sum(axis=0)
+        zscore_counts = zscore_mask.sum(axis=0)
+        iqr_indices = _capped_indices(df.index, iqr_mask, iqr_counts, max_indices)
+        
+        iqr_results = {}
+        zscore_results = {}
+        for j, column in enumerate(columns):
+            iqr_results[column] = {
+                'method': 'IQR',
+                'outliers_count': int(iqr_counts[j]),
+                'outliers_percentage': round(float(iqr_counts[j]) / total_rows * 100, 2) if total_rows > 0 else 0.0,
+                'lower_bound': _safe_float(lower_bounds[j]),
+                'upper_bound': _safe_float(upper_bounds[j]),
+                'outliers_indices': iqr_indices[j]  # Limité pour éviter un JSON trop gros
+            }
+            max_zscore = float(max_zscores[j])
+            zscore_results[column] = {
+                'method': 'Z-Score',
+                'threshold': threshold,
+                'outliers_count': int(zscore_counts[j]),
+                # Pourcentage des valeurs non manquantes de la colonne
+                'outliers_percentage': round(float(zscore_counts[j]) / valid_counts[j] * 100, 2) if valid_counts[j] > 0 else 0.0,
+                'max_zscore': max_zscore if np.isfinite(max_zscore) else 0.0
+            }
         
-        return outliers_info
+        return {'iqr_method': iqr_results, 'zscore_method': zscore_results}
+    
+    @staticmethod
+    def detect_outliers_iqr(df: pd.DataFrame, columns: List[str] = None) -> Dict[str, Any]:
+        """Détection d'outliers avec la méthode IQR."""
+        return OutlierDetector.detect_outliers(df, columns)['iqr_method']
     
     @staticmethod
     def detect_outliers_zscore(df: pd.DataFrame, columns: List[str] = None, threshold: float = 3) -> Dict[str, Any]:
         """Détection d'outliers avec la méthode Z-score."""
+        return OutlierDetector.detect_outliers(df, columns, threshold)['zscore_method']
+    
+    @staticmethod
+    def detect_outliers_isolation_forest(df: pd.DataFrame, columns: List[str] = None,
+                                         sample_size: int = ISOLATION_FOREST_SAMPLE_SIZE,
+                                         contamination: Union[str, float] = 'auto',
+                                         random_state: int = 42,
+                                         max_indices: int = MAX_OUTLIER_INDICES) -> Dict[str, Any]:
+        """
+        Outliers multivariés (lignes atypiques sur l'ensemble des colonnes numériques).
+        
+        La forêt est ajustée sur un échantillon de sample_size lignes puis évalue
+        toutes les lignes ; les valeurs manquantes sont remplacées par la médiane.
+        """
         if columns is None:
             columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        columns = [column for column in columns if column in df.columns]
+        if not columns or len(df) == 0:
+            return {}
         
-        outliers_info = {}
+        values = _numeric_matrix(df, columns)
+        medians = np.nan_to_num(np.nanmedian(values, axis=0))
+        values = np.where(np.isnan(values), medians, values)
         
-        for column in columns:
-            if column in df.columns:
-                z_scores = np.abs(stats.zscore(df[column].dropna()))
-                outliers_mask = z_scores > threshold
-                outliers_count = outliers_mask.sum()
-                
-                # Gérer les valeurs NaN pour la sérialisation JSON
-                max_zscore = float(z_scores.max()) if len(z_scores) > 0 else 0
-                max_zscore_safe = max_zscore if not np.isnan(max_zscore) else 0.0
-                
-                # Calcul sécurisé du pourcentage pour éviter division par zéro
-                total_valid = len(df.dropna())
-                if total_valid > 0:
-                    outliers_percentage = round((outliers_count / total_valid) * 100, 2)
-                else:
-                    outliers_percentage = 0.0
-                
-                outliers_info[column] = {
-                    'method': 'Z-Score',
-                    'threshold': threshold,
-                    'outliers_count': int(outliers_count),
-                    'outliers_percentage': outliers_percentage,
-                    'max_zscore': max_zscore_safe
-                }
+        rng = np.random.default_rng(random_state)
+        if len(values) > sample_size:
+            sample = values[rng.choice(len(values), size=sample_size, replace=False)]
+        else:
+            sample = values
+        forest = IsolationForest(contamination=contamination, random_state=random_state, n_jobs=1)
+        forest.fit(sample)
         
-        return outliers_info
+        outliers_mask = forest.predict(values) == -1
+        outliers_count = int(outliers_mask.sum())
+        return {
+            'method': 'IsolationForest',
+            'columns': columns,
+            'sample_size': int(len(sample)),
+            'contamination': contamination,
+            'outliers_count': outliers_count,
+            'outliers_percentage': round(outliers_count / len(values) * 100, 2),
+            'outliers_indices': df.index[np.flatnonzero(outliers_mask)[:max_indices]].tolist()
+        }
 
 def detect_column_types(df: pd.DataFrame) -> Dict[str, List[str]]:
     """
@@ -382,13 +513,15 @@ def handle_missing_values(df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFr
     # For other strategies, we'll handle in the pipeline
     return df
 
-def analyze_dataset_quality(df: pd.DataFrame, target_column: str = None) -> Dict[str, Any]:
+def analyze_dataset_quality(df: pd.DataFrame, target_column: str = None,
+                            isolation_forest: bool = False) -> Dict[str, Any]:
     """
     Analyse complète de la qualité du dataset avec recommandations de preprocessing.
     
     Args:
         df: DataFrame à analyser
         target_column: Nom de la colonne cible (optionnel)
+        isolation_forest: ajoute la détection multivariée (IsolationForest sur un échantillon)
     
     Returns:
         Dict avec analyses détaillées et recommandations
@@ -416,10 +549,10 @@ def analyze_dataset_quality(df: pd.DataFrame, target_column: str = None) -> Dict
     # Analyse des outliers pour les colonnes numériques
     numeric_columns = analysis['column_types']['numeric']
     if numeric_columns:
-        analysis['outliers_analysis'] = {
-            'iqr_method': outlier_detector.detect_outliers_iqr(features_df, numeric_columns),
-            'zscore_method': outlier_detector.detect_outliers_zscore(features_df, numeric_columns)
-        }
+        analysis['outliers_analysis'] = outlier_detector.detect_outliers(features_df, numeric_columns)
+        if isolation_forest:
+            analysis['outliers_analysis']['isolation_forest'] = \
+                outlier_detector.detect_outliers_isolation_forest(features_df, numeric_columns)
     
     # Calcul du score de qualité global (0-100)
     analysis['data_quality_score'] = _calculate_data_quality_score(analysis)
@@ -515,6 +648,175 @@ def _generate_preprocessing_recommendations(analysis: Dict[str, Any]) -> Dict[st
     
     return recommendations
 
+# === ENCODAGE DES VARIABLES CATÉGORIELLES ===
+
+# Alias acceptés pour config['encoding'] ('label' est historique : encodage ordinal)
+ENCODING_ALIASES = {
+    'onehot': 'onehot', 'one-hot': 'onehot', 'one_hot': 'onehot',
+    'label': 'ordinal', 'ordinal': 'ordinal',
+    'frequency': 'frequency',
+    'target': 'target',
+    'auto': 'auto'
+}
+# Mode 'auto' : one-hot jusqu'à cette cardinalité, target/frequency encoding au-delà
+AUTO_ONEHOT_MAX_CARDINALITY = 20
+# Nombre maximum de colonnes produites par variable en one-hot (catégories rares regroupées)
+DEFAULT_MAX_CATEGORIES = 100
+
+SCALERS = {
+    'standard': StandardScaler,
+    'minmax': MinMaxScaler,
+    'robust': RobustScaler
+}
+
+
+class FrequencyEncoder(BaseEstimator, TransformerMixin):
+    """Remplace chaque catégorie par sa fréquence relative dans les données d'entraînement (0 si inconnue)."""
+    
+    def __init__(self, dtype=np.float32):
+        self.dtype = dtype
+    
+    def fit(self, X, y=None):
+        X = pd.DataFrame(X)
+        self.n_features_in_ = X.shape[1]
+        self.frequencies_ = [X[col].value_counts(normalize=True).to_dict() for col in X.columns]
+        return self
+    
+    def transform(self, X):
+        X = pd.DataFrame(X)
+        encoded = np.empty(X.shape, dtype=self.dtype)
+        for i, col in enumerate(X.columns):
+            encoded[:, i] = X[col].map(self.frequencies_[i]).fillna(0).to_numpy(dtype=self.dtype)
+        return encoded
+    
+    def get_feature_names_out(self, input_features=None):
+        if input_features is None:
+            input_features = [f'x{i}' for i in range(self.n_features_in_)]
+        return np.asarray([f'{name}_frequency' for name in input_features], dtype=object)
+
+
+def _to_float32(X):
+    return X.astype(np.float32, copy=False)
+
+
+def categorical_cardinality(df: pd.DataFrame, columns: List[str]) -> Dict[str, int]:
+    """Nombre de valeurs distinctes des colonnes catégorielles (détectées par detect_column_types)."""
+    return {col: int(df[col].nunique(dropna=True)) for col in columns}
+
+
+def select_categorical_encodings(cardinality: Dict[str, int],
+                                 encoding: str,
+                                 task_type: str,
+                                 n_classes: int = 0) -> Dict[str, List[str]]:
+    """
+    Répartit les colonnes catégorielles entre les encodeurs.
+    
+    'auto' : one-hot pour les faibles cardinalités, target encoding au-delà
+    (frequency encoding en multiclasse, que le TargetEncoder de scikit-learn 1.3 ne gère pas).
+    
+    Returns:
+        {'onehot': [...], 'ordinal': [...], 'frequency': [...], 'target': [...]}
+    """
+    strategy = ENCODING_ALIASES.get(str(encoding).lower())
+    if strategy is None:
+        logger.warning(f"Encodage inconnu '{encoding}', sélection automatique")
+        strategy = 'auto'
+    
+    target_supported = task_type == 'regression' or n_classes == 2
+    high_cardinality_strategy = 'target' if target_supported else 'frequency'
+    
+    selection = {'onehot': [], 'ordinal': [], 'frequency': [], 'target': []}
+    for col, n_unique in cardinality.items():
+        if strategy == 'auto':
+            chosen = 'onehot' if n_unique <= AUTO_ONEHOT_MAX_CARDINALITY else high_cardinality_strategy
+        elif strategy == 'target' and not target_supported:
+            chosen = 'frequency'
+        else:
+            chosen = strategy
+        selection[chosen].append(col)
+    
+    logger.info(f"Encodage des variables catégorielles ({strategy}): "
+                + ", ".join(f"{name}={len(cols)}" for name, cols in selection.items() if cols))
+    return selection
+
+
+def _scaling_method(scaling: Any) -> Optional[str]:
+    """scaling : booléen (historique) ou {"enabled", "method"} envoyé par le frontend."""
+    if isinstance(scaling, dict):
+        return (scaling.get('method') or 'standard') if scaling.get('enabled') else None
+    return 'standard' if scaling else None
+
+
+def build_preprocessor(X: pd.DataFrame, config: Dict[str, Any], task_type: str, n_classes: int = 0) -> Pipeline:
+    """
+    Construit le pipeline de preprocessing (non ajusté).
+    
+    Le one-hot produit une matrice creuse (CSR) : ColumnTransformer ne la
+    densifie que si la densité globale dépasse sparse_threshold. La sortie est
+    convertie en float32.
+    """
+    missing_config = config.get('missing_values', {'strategy': 'mean'})
+    encoding = config.get('encoding', 'auto')
+    max_categories = config.get('max_categories', DEFAULT_MAX_CATEGORIES)
+    # 'auto' : creux si moins de 30% de valeurs non nulles ; True / False pour forcer
+    sparse_output = config.get('sparse_output', 'auto')
+    
+    col_types = detect_column_types(X)
+    numeric_features = col_types['numeric']
+    categorical_features = col_types['categorical']
+    
+    # 'drop', 'knn', 'iterative', 'forward_fill' sont appliquées en amont (handle_missing_values) :
+    # le pipeline ne complète que ce qui reste, par la moyenne
+    imputer_strategy = missing_config.get('strategy', 'mean')
+    imputer_strategy = {'mode': 'most_frequent'}.get(imputer_strategy, imputer_strategy)
+    if imputer_strategy not in ('mean', 'median', 'most_frequent'):
+        imputer_strategy = 'mean'
+    
+    # native_missing_values : le modèle gère les NaN (boosting par histogrammes), pas d'imputation
+    # numérique. Les scalers ignorent les NaN à l'ajustement et les conservent.
+    numeric_steps = []
+    if not config.get('native_missing_values'):
+        numeric_steps.append(('imputer', SimpleImputer(strategy=imputer_strategy)))
+    scaling_method = _scaling_method(config.get('scaling', True))
+    if scaling_method:
+        numeric_steps.append(('scaler', SCALERS.get(scaling_method, StandardScaler)()))
+    numeric_transformer = Pipeline(steps=numeric_steps) if numeric_steps else 'passthrough'
+    
+    def categorical_pipeline(encoder) -> Pipeline:
+        return Pipeline(steps=[
+            ('imputer', SimpleImputer(strategy='constant', fill_value='missing')),
+            ('encoder', encoder)
+        ])
+    
+    encoders = {
+        'onehot': lambda: OneHotEncoder(handle_unknown='infrequent_if_exist', max_categories=max_categories,
+                                        sparse_output=sparse_output is not False, dtype=np.float32),
+        'ordinal': lambda: OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1,
+                                          max_categories=max_categories, dtype=np.float32),
+        'frequency': lambda: FrequencyEncoder(),
+        'target': lambda: TargetEncoder(target_type='continuous' if task_type == 'regression' else 'binary',
+                                        random_state=config.get('random_state', 42))
+    }
+    
+    selection = select_categorical_encodings(
+        categorical_cardinality(X, categorical_features), encoding, task_type, n_classes
+    )
+    transformers = [('num', numeric_transformer, numeric_features)]
+    for name, columns in selection.items():
+        if columns:
+            transformers.append((name, categorical_pipeline(encoders[name]()), columns))
+    
+    sparse_threshold = {True: 1.0, False: 0.0}.get(sparse_output, 0.3)
+    columns = ColumnTransformer(
+        transformers=transformers,
+        remainder='passthrough',  # Keep other columns as is
+        sparse_threshold=sparse_threshold
+    )
+    return Pipeline(steps=[
+        ('columns', columns),
+        ('float32', FunctionTransformer(_to_float32, accept_sparse=True, feature_names_out='one-to-one'))
+    ])
+
 def preprocess_data(df: pd.DataFrame, config: Dict[str, Any]) -> Tuple:
     """
     Preprocess data for ML training
@@ -526,20 +828,22 @@ def preprocess_data(df: pd.DataFrame, config: Dict[str, Any]) -> Tuple:
             - test_size: float
             - random_state: int
             - missing_values: dict
-            - scaling: bool
-            - encoding: str ('onehot' or 'label')
+            - scaling: bool ou {"enabled": bool, "method": 'standard'|'minmax'|'robust'}
+            - encoding: str ('auto', 'onehot', 'label'/'ordinal', 'frequency' ou 'target')
+            - max_categories: int (colonnes max par variable en one-hot, défaut 100)
+            - sparse_output: 'auto', True ou False (matrice creuse CSR)
+            - native_missing_values: bool (NaN numériques laissés au modèle)
             - task_type: str ('classification' or 'regression')
     
     Returns:
-        Tuple of (X_train, X_test, y_train, y_test, preprocessing_pipeline)
+        Tuple of (X_train, X_test, y_train, y_test, preprocessing_pipeline, label_classes)
+        label_classes : valeurs d'origine de la cible encodée (indice = code), None sans encodage
     """
     # Extract configuration
     target_column = config.get('target_column', df.columns[-1])
     test_size = config.get('test_size', 0.2)
     random_state = config.get('random_state', 42)
     missing_config = config.get('missing_values', {'strategy': 'mean'})
-    scaling = config.get('scaling', True)
-    encoding = config.get('encoding', 'onehot')
     task_type = config.get('task_type', 'classification')
     
     # Handle missing values at dataframe level
@@ -553,42 +857,15 @@ def preprocess_data(df: pd.DataFrame, config: Dict[str, Any]) -> Tuple:
     y = df[target_column]
     
     # Encode target variable for classification
-    if task_type == 'classification' and y.dtype == 'object':
+    label_classes = None
+    if task_type == 'classification' and not pd.api.types.is_numeric_dtype(y):
         label_encoder = LabelEncoder()
         y = label_encoder.fit_transform(y)
+        label_classes = label_encoder.classes_.tolist()
     
-    # Detect column types
-    col_types = detect_column_types(X)
-    numeric_features = col_types['numeric']
-    categorical_features = col_types['categorical']
-    
-    # Create preprocessing pipelines
-    numeric_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy=missing_config.get('strategy', 'mean')))
-    ])
-    
-    if scaling:
-        numeric_transformer.steps.append(('scaler', StandardScaler()))
-    
-    if encoding == 'onehot':
-        categorical_transformer = Pipeline(steps=[
-            ('imputer', SimpleImputer(strategy='constant', fill_value='missing')),
-            ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
-        ])
-    else:
-        # For label encoding, we need a custom transformer
-        categorical_transformer = Pipeline(steps=[
-            ('imputer', SimpleImputer(strategy='constant', fill_value='missing'))
-        ])
-    
-    # Combine transformers
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', numeric_transformer, numeric_features),
-            ('cat', categorical_transformer, categorical_features)
-        ],
-        remainder='passthrough'  # Keep other columns as is
-    )
+    # Pipeline : imputation, scaling et encodage choisi selon la cardinalité des colonnes
+    n_classes = int(pd.Series(y).nunique()) if task_type == 'classification' else 0
+    preprocessor = build_preprocessor(X, config, task_type, n_classes)
     
     # Split the data avec gestion intelligente de la stratification
     try:
@@ -625,11 +902,11 @@ def preprocess_data(df: pd.DataFrame, config: Dict[str, Any]) -> Tuple:
         else:
             raise
     
-    # Fit and transform the data
-    X_train = preprocessor.fit_transform(X_train)
+    # Fit and transform the data (y requis par le target encoding)
+    X_train = preprocessor.fit_transform(X_train, y_train)
     X_test = preprocessor.transform(X_test)
     
-    return X_train, X_test, y_train, y_test, preprocessor
+    return X_train, X_test, y_train, y_test, preprocessor, label_classes
 
 def get_preprocessing_info(df: pd.DataFrame) -> Dict[str, Any]:
     """
@@ -0,0 +1,113 @@
+"""
+Cache des données prétraitées (par nœud).
+
+Une expérience qui ne change que l'algorithme ou les hyperparamètres réutilise le
+pipeline de preprocessing ajusté et les matrices train/test d'une expérience
+précédente, sans relire ni retransformer le dataset.
+
+Clé : version du fichier source (chemin, taille, updated_at du dataset) + hash de
+la preprocessing_config canonique (clés triées) + graine et taille du split.
+Les entrées sont écrites avec joblib (fichier temporaire puis renommage) et
+relues en memory-map ; éviction LRU au-delà de PREPROCESSING_CACHE_MAX_BYTES.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, Optional
+
+import joblib
+
+from app.core.config import settings
+from app.core.local_store import evict_lru_entries
+from app.ml.dataset_loader import resolve_dataset_file
+from common.storage_client import get_storage_client
+
+logger = logging.getLogger(__name__)
+
+# Incrémenter si le format des entrées ou le preprocessing change : les anciennes entrées sont ignorées
+CACHE_FORMAT_VERSION = 3
+
+
+def preprocessing_cache_key(dataset_id: str, preprocessing_config: Dict[str, Any]) -> str:
+    """
+    Clé de cache d'un couple (version du dataset, configuration de preprocessing).
+
+    Raises:
+        DatasetLoadError: si le fichier du dataset est introuvable
+    """
+    object_path, _, version = resolve_dataset_file(dataset_id)
+    size = get_storage_client().get_file_size(object_path)
+
+    config = dict(preprocessing_config)
+    # Valeurs par défaut explicites : {} et {"random_state": 42} produisent le même split
+    config['random_state'] = config.get('random_state', 42)
+    config['test_size'] = config.get('test_size', 0.2)
+    canonical = json.dumps({
+        'format': CACHE_FORMAT_VERSION,
+        'object_path': object_path,
+        'size': size,
+        'version': version,
+        'config': config
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class PreprocessingCache:
+    """Entrées {X_train, X_test, y_train, y_test, preprocessing_pipeline, ...} sur disque local."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            # mtime sert d'horloge LRU
+            os.utime(path)
+            # Les matrices sont relues en memory-map : pas de copie en mémoire
+            entry = joblib.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrée de cache de preprocessing illisible {key}: {str(e)}")
+            return None
+        logger.info(f"Preprocessing servi depuis le cache: {key}")
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Enregistre une entrée ; ne lève jamais (le cache est optionnel)."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                joblib.dump(entry, out)
+            size = os.path.getsize(tmp_path)
+            if size > self.max_bytes:
+                os.remove(tmp_path)
+                return
+            evict_lru_entries(self.cache_dir, self.max_bytes, size)
+            os.replace(tmp_path, self._path(key))
+            logger.info(f"Preprocessing mis en cache: {key} ({size} bytes)")
+        except Exception as e:
+            logger.warning(f"Mise en cache du preprocessing impossible: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+_preprocessing_cache: Optional[PreprocessingCache] = None
+
+
+def get_preprocessing_cache() -> Optional[PreprocessingCache]:
+    """Cache si PREPROCESSING_CACHE_DIR est configuré (workers), sinon None."""
+    global _preprocessing_cache
+    if not settings.PREPROCESSING_CACHE_DIR:
+        return None
+    if _preprocessing_cache is None:
+        _preprocessing_cache = PreprocessingCache(settings.PREPROCESSING_CACHE_DIR, settings.PREPROCESSING_CACHE_MAX_BYTES)
+    return _preprocessing_cache
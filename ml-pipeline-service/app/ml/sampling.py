@@ -0,0 +1,244 @@
+"""
+Échantillonnage en flux sur des record batches Arrow.
+
+Les deux échantillonneurs lisent les données en une seule passe, avec une
+mémoire bornée par la taille de l'échantillon (et non par celle du dataset) :
+
+- ReservoirSampler : échantillon uniforme. Chaque ligne reçoit une clé aléatoire
+  et l'on conserve les k plus petites clés (équivalent au reservoir sampling,
+  mais vectorisé par batch).
+- StratifiedReservoirSampler : un réservoir global et une petite réserve par
+  valeur de la cible (classes rares), puis allocation proportionnelle (avec un
+  minimum par strate) à la fin du flux.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Au-delà de ce nombre de valeurs distinctes, la cible est considérée continue
+MAX_STRATA = 50
+# Nombre minimum de lignes conservées par strate (classes rares)
+MIN_ROWS_PER_STRATUM = 10
+
+
+class _BottomK:
+    """Conserve les k lignes de plus petites clés vues jusqu'ici."""
+
+    def __init__(self, k: int):
+        self.k = k
+        self.table: Optional[pa.Table] = None
+        self.keys = np.empty(0)
+
+    @property
+    def threshold(self) -> float:
+        """Plus grande clé retenue : une ligne de clé supérieure ne peut pas entrer."""
+        return self.keys.max() if len(self.keys) >= self.k else np.inf
+
+    def offer(self, table: pa.Table, keys: np.ndarray) -> None:
+        candidates = keys < self.threshold
+        if not candidates.any():
+            return
+        if not candidates.all():
+            indices = np.flatnonzero(candidates)
+            table = table.take(pa.array(indices))
+            keys = keys[indices]
+
+        merged = table if self.table is None else pa.concat_tables([self.table, table])
+        merged_keys = np.concatenate([self.keys, keys])
+        if len(merged_keys) > self.k:
+            keep = np.argpartition(merged_keys, self.k - 1)[:self.k]
+            merged = merged.take(pa.array(keep))
+            merged_keys = merged_keys[keep]
+        self.table = merged
+        self.keys = merged_keys
+
+    def smallest(self, n: int) -> Optional[pa.Table]:
+        """Les n lignes de plus petites clés (sous-échantillon toujours uniforme)."""
+        if self.table is None or n >= len(self.keys):
+            return self.table
+        keep = np.argpartition(self.keys, n - 1)[:n] if n > 0 else np.empty(0, dtype=np.int64)
+        return self.table.take(pa.array(keep))
+
+
+class ReservoirSampler:
+    """Échantillon uniforme de taille fixe sur un flux de batches."""
+
+    def __init__(self, sample_size: int, random_state: int = 42):
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(random_state)
+        self.reservoir = _BottomK(sample_size)
+        self.rows_seen = 0
+
+    def add_batch(self, batch: pa.RecordBatch) -> None:
+        if batch.num_rows == 0:
+            return
+        self.rows_seen += batch.num_rows
+        self.reservoir.offer(pa.Table.from_batches([batch]), self.rng.random(batch.num_rows))
+
+    def result(self, schema: pa.Schema) -> pa.Table:
+        return self.reservoir.table if self.reservoir.table is not None else schema.empty_table()
+
+
+class StratifiedReservoirSampler:
+    """
+    Échantillon stratifié sur la colonne cible, en une passe.
+
+    Un réservoir global de sample_size lignes (uniforme) et, par strate, une
+    réserve des MIN_ROWS_PER_STRATUM plus petites clés pour les classes rares :
+    la mémoire reste bornée par sample_size + MAX_STRATA * MIN_ROWS_PER_STRATUM
+    lignes. Les lignes d'une strate présentes dans le réservoir global sont ses
+    plus petites clés, tout comme sa réserve : leur union est un échantillon
+    uniforme de la strate. L'effectif de chaque strate est compté au passage puis
+    l'allocation proportionnelle est appliquée en fin de flux. Au-delà de
+    MAX_STRATA valeurs distinctes, seul le réservoir global est conservé.
+    """
+
+    def __init__(self, sample_size: int, target_column: str, random_state: int = 42):
+        self.sample_size = sample_size
+        self.target_column = target_column
+        self.rng = np.random.default_rng(random_state)
+        self.reservoir = _BottomK(sample_size)
+        self.reserves: Dict[Any, _BottomK] = {}
+        self.counts: Dict[Any, int] = {}
+        self.rows_seen = 0
+        self.uniform = False
+
+    def add_batch(self, batch: pa.RecordBatch) -> None:
+        if batch.num_rows == 0:
+            return
+        self.rows_seen += batch.num_rows
+        table = pa.Table.from_batches([batch])
+        keys = self.rng.random(batch.num_rows)
+        self.reservoir.offer(table, keys)
+
+        if self.uniform:
+            return
+
+        for value, indices in self._strata(table).items():
+            self.counts[value] = self.counts.get(value, 0) + len(indices)
+            reserve = self.reserves.setdefault(value, _BottomK(MIN_ROWS_PER_STRATUM))
+            if keys[indices].min() < reserve.threshold:
+                reserve.offer(table.take(pa.array(indices)), keys[indices])
+
+        if len(self.counts) > MAX_STRATA:
+            logger.info(f"Cible '{self.target_column}' continue (> {MAX_STRATA} valeurs), échantillonnage uniforme")
+            self.uniform = True
+            self.reserves = {}
+            self.counts = {}
+
+    def _strata(self, table: pa.Table) -> Dict[Any, np.ndarray]:
+        """Indices des lignes de chaque valeur de la cible (None pour les valeurs manquantes)."""
+        target = table.column(self.target_column).to_pandas()
+        codes, values = pd.factorize(target, use_na_sentinel=False)
+        return {
+            None if pd.isna(value) else value: np.flatnonzero(codes == code)
+            for code, value in enumerate(values)
+        }
+
+    def _candidates(self) -> Dict[Any, _BottomK]:
+        """Plus petites clés connues de chaque strate : réservoir global ou réserve, la plus grande des deux."""
+        candidates: Dict[Any, _BottomK] = {}
+        if self.reservoir.table is not None:
+            for value, indices in self._strata(self.reservoir.table).items():
+                stratum = _BottomK(len(indices))
+                stratum.table = self.reservoir.table.take(pa.array(indices))
+                stratum.keys = self.reservoir.keys[indices]
+                candidates[value] = stratum
+        for value, reserve in self.reserves.items():
+            if reserve.table is None:
+                continue
+            if value not in candidates or len(reserve.keys) > len(candidates[value].keys):
+                candidates[value] = reserve
+        return candidates
+
+    def allocation(self, available: Optional[Dict[Any, int]] = None) -> Dict[Any, int]:
+        """
+        Taille retenue par strate : proportionnelle, avec un plancher pour les classes rares.
+
+        available borne chaque strate aux lignes conservées ; le manque est reporté
+        sur les strates qui en ont en surplus, les plus grosses d'abord.
+        """
+        total = sum(self.counts.values())
+        if total <= self.sample_size:
+            return dict(self.counts)
+
+        quotas = {value: self.sample_size * count / total for value, count in self.counts.items()}
+        allocation = {value: int(quota) for value, quota in quotas.items()}
+        # Méthode du plus fort reste pour atteindre exactement sample_size
+        remainder = self.sample_size - sum(allocation.values())
+        for value in sorted(quotas, key=lambda v: quotas[v] - allocation[v], reverse=True)[:remainder]:
+            allocation[value] += 1
+
+        for value, count in self.counts.items():
+            allocation[value] = max(allocation[value], min(count, MIN_ROWS_PER_STRATUM))
+
+        # Le plancher a pu dépasser le budget : reprendre sur les plus grosses strates
+        excess = sum(allocation.values()) - self.sample_size
+        for value in sorted(allocation, key=allocation.get, reverse=True):
+            if excess <= 0:
+                break
+            removable = min(excess, allocation[value] - min(self.counts[value], MIN_ROWS_PER_STRATUM))
+            if removable > 0:
+                allocation[value] -= removable
+                excess -= removable
+
+        if available is not None:
+            shortfall = 0
+            for value in allocation:
+                kept = min(allocation[value], available.get(value, 0))
+                shortfall += allocation[value] - kept
+                allocation[value] = kept
+            for value in sorted(allocation, key=lambda v: available.get(v, 0) - allocation[v], reverse=True):
+                if shortfall <= 0:
+                    break
+                extra = min(shortfall, available.get(value, 0) - allocation[value])
+                if extra > 0:
+                    allocation[value] += extra
+                    shortfall -= extra
+        return allocation
+
+    def result(self, schema: pa.Schema) -> pa.Table:
+        if self.uniform:
+            return self.reservoir.table if self.reservoir.table is not None else schema.empty_table()
+
+        candidates = self._candidates()
+        available = {value: len(stratum.keys) for value, stratum in candidates.items()}
+        tables: List[pa.Table] = []
+        for value, size in self.allocation(available).items():
+            if size <= 0 or value not in candidates:
+                continue
+            table = candidates[value].smallest(size)
+            if table is not None and table.num_rows:
+                tables.append(table)
+        return pa.concat_tables(tables) if tables else schema.empty_table()
+
+
+def sample_batches(batches: Iterable[pa.RecordBatch],
+                   schema: pa.Schema,
+                   sample_size: int,
+                   target_column: Optional[str] = None,
+                   random_state: int = 42) -> pd.DataFrame:
+    """
+    Échantillonne un flux de batches (uniforme, ou stratifié si target_column est fourni).
+
+    La cible est ignorée si elle n'existe pas dans le schéma.
+    """
+    if target_column and target_column in schema.names:
+        sampler = StratifiedReservoirSampler(sample_size, target_column, random_state)
+    else:
+        sampler = ReservoirSampler(sample_size, random_state)
+
+    for batch in batches:
+        sampler.add_batch(batch)
+
+    table = sampler.result(schema)
+    logger.info(f"Échantillon: {table.num_rows} lignes sur {sampler.rows_seen} lues")
+    # Mélanger pour ne pas restituer les lignes groupées par strate
+    df = table.to_pandas()
+    return df.sample(frac=1, random_state=random_state).reset_index(drop=True)
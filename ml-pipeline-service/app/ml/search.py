@@ -0,0 +1,284 @@
+"""
+Recherche d'hyperparamètres : grid, random et successive halving.
+
+Chaque essai (jeu d'hyperparamètres) est évalué en validation croisée sur les
+données d'entraînement déjà prétraitées. Les essais sont répartis sur les cœurs
+via joblib : au-delà de JOBLIB_MAX_NBYTES, les matrices sont placées une seule
+fois en memory-map et partagées par tous les processus au lieu d'être copiées
+pour chaque essai.
+
+Arrêt précoce :
+- grid / random : les essais sont lancés par lots ; un essai est interrompu après
+  MIN_FOLDS_BEFORE_PRUNING plis si sa moyenne reste sous le meilleur score des lots
+  précédents, à PRUNING_TOLERANCE près (écart relatif)
+- halving : tous les candidats démarrent sur un sous-échantillon, seul le meilleur
+  tiers passe au palier suivant avec HALVING_FACTOR fois plus de lignes
+
+Format de param_space (par hyperparamètre) :
+    liste de valeurs             -> choix parmi ces valeurs
+    {"low", "high", "type", "log"} -> intervalle (random / halving uniquement),
+                                    type 'int' ou 'float', log=True pour une échelle logarithmique
+"""
+
+import json
+import time
+import itertools
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.metrics import get_scorer
+
+from app.ml.algorithms import ALGORITHM_WRAPPERS, _dense
+from app.ml.evaluation import get_cv_strategy
+
+logger = logging.getLogger(__name__)
+
+SEARCH_STRATEGIES = ('grid', 'random', 'halving')
+DEFAULT_SCORING = {
+    'classification': 'accuracy',
+    'regression': 'r2'
+}
+
+MIN_FOLDS_BEFORE_PRUNING = 2
+PRUNING_TOLERANCE = 0.1
+HALVING_FACTOR = 3
+HALVING_MIN_SAMPLES = 100
+# Taille à partir de laquelle joblib partage les tableaux en memory-map
+JOBLIB_MAX_NBYTES = '1M'
+
+
+def _sample_value(spec: Any, rng: np.random.Generator) -> Any:
+    if isinstance(spec, list):
+        return spec[rng.integers(len(spec))]
+    low, high = spec['low'], spec['high']
+    if spec.get('log'):
+        value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    else:
+        value = float(rng.uniform(low, high))
+    return int(round(value)) if spec.get('type', 'float') == 'int' else value
+
+
+def generate_candidates(param_space: Dict[str, Any],
+                        strategy: str,
+                        n_iter: int,
+                        max_trials: int,
+                        random_state: int = 42) -> List[Dict[str, Any]]:
+    """
+    Jeux d'hyperparamètres à évaluer.
+
+    grid : produit cartésien (listes uniquement, au plus max_trials combinaisons).
+    random / halving : n_iter tirages distincts (moins si l'espace est plus petit).
+    """
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy: {strategy}")
+
+    names = list(param_space)
+    if strategy == 'grid':
+        ranges = [name for name in names if not isinstance(param_space[name], list)]
+        if ranges:
+            raise ValueError(f"Grid search requires explicit value lists, got ranges for: {ranges}")
+        n_combinations = int(np.prod([len(param_space[name]) for name in names]))
+        if n_combinations > max_trials:
+            raise ValueError(f"Grid has {n_combinations} combinations (max {max_trials})")
+        return [dict(zip(names, values)) for values in itertools.product(*(param_space[name] for name in names))]
+
+    rng = np.random.default_rng(random_state)
+    n_iter = min(n_iter, max_trials)
+    candidates, seen = [], set()
+    # Les tirages en double sont ignorés ; le nombre de tentatives est borné pour les petits espaces
+    for _ in range(n_iter * 10):
+        params = {name: _sample_value(param_space[name], rng) for name in names}
+        key = json.dumps(params, sort_keys=True, default=str)
+        if key in seen:
+            continue
+        seen.add(key)
+        candidates.append(params)
+        if len(candidates) >= n_iter:
+            break
+    return candidates
+
+
+def _evaluate_trial(trial_id: int,
+                    algorithm: str,
+                    task_type: str,
+                    params: Dict[str, Any],
+                    base_params: Dict[str, Any],
+                    X, y,
+                    folds: List,
+                    scoring: str,
+                    threshold: Optional[float] = None) -> Dict[str, Any]:
+    """Évalue un essai pli par pli ; s'arrête tôt si la moyenne passe sous threshold."""
+    started = time.perf_counter()
+    scorer = get_scorer(scoring)
+    wrapper_class = ALGORITHM_WRAPPERS[algorithm]
+    record = {
+        'trial_id': trial_id,
+        'params': params,
+        'status': 'completed',
+        'fold_scores': [],
+        'n_samples': int(len(folds[0][0]))
+    }
+
+    try:
+        for fold_index, (train_idx, val_idx) in enumerate(folds):
+            # Les essais tournent déjà en parallèle : un seul cœur par modèle
+            model = wrapper_class(task_type=task_type, **{**base_params, **params, 'n_jobs': 1})
+            model.fit(X[train_idx], y[train_idx])
+            # Le scorer appelle l'estimateur sklearn directement : densifier comme le ferait le wrapper
+            X_val = _dense(X[val_idx]) if wrapper_class.requires_dense_input else X[val_idx]
+            record['fold_scores'].append(float(scorer(model.model, X_val, y[val_idx])))
+
+            evaluated = fold_index + 1
+            if (threshold is not None and MIN_FOLDS_BEFORE_PRUNING <= evaluated < len(folds)
+                    and np.mean(record['fold_scores']) < threshold):
+                record['status'] = 'pruned'
+                break
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = str(e)
+
+    scores = record['fold_scores']
+    record['mean_score'] = float(np.mean(scores)) if scores else None
+    record['std_score'] = float(np.std(scores)) if scores else None
+    record['fit_time'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def _pruning_threshold(best_score: Optional[float]) -> Optional[float]:
+    if best_score is None:
+        return None
+    return best_score - PRUNING_TOLERANCE * max(abs(best_score), 1e-12)
+
+
+def _subsample_folds(folds: List, n_samples: int, random_state: int) -> List:
+    """Même sous-échantillon d'entraînement pour tous les essais d'un palier (comparaison équitable)."""
+    subsampled = []
+    for fold_index, (train_idx, val_idx) in enumerate(folds):
+        if n_samples < len(train_idx):
+            rng = np.random.default_rng(random_state + fold_index)
+            train_idx = np.sort(rng.choice(train_idx, n_samples, replace=False))
+        subsampled.append((train_idx, val_idx))
+    return subsampled
+
+
+def _ranked(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    completed = [r for r in records if r['status'] == 'completed']
+    return sorted(completed, key=lambda r: r['mean_score'], reverse=True)
+
+
+def run_search(algorithm: str,
+               task_type: str,
+               X, y,
+               search_config: Dict[str, Any],
+               base_params: Optional[Dict[str, Any]] = None,
+               n_jobs: int = -1,
+               max_trials: int = 200,
+               random_state: int = 42,
+               progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """
+    Lance la recherche et retourne les meilleurs hyperparamètres et le détail des essais.
+
+    Args:
+        search_config: {"strategy", "param_space", "n_iter", "cv", "scoring"}
+        base_params: hyperparamètres fixes, complétés par ceux de chaque essai
+        progress_callback: appelé avec (essais terminés, essais prévus)
+
+    Returns:
+        {"strategy", "scoring", "best_params", "best_score", "n_trials",
+         "n_pruned", "n_failed", "duration", "trials": [...]}
+    """
+    if algorithm not in ALGORITHM_WRAPPERS:
+        raise ValueError(f"Hyperparameter search is not available for algorithm: {algorithm}")
+
+    started = time.perf_counter()
+    strategy = search_config.get('strategy', 'random')
+    scoring = search_config.get('scoring') or DEFAULT_SCORING[task_type]
+    get_scorer(scoring)  # ValueError si la métrique est inconnue
+    base_params = base_params or {}
+
+    y = np.asarray(y)
+    cv_strategy = get_cv_strategy(y, task_type, search_config.get('cv', 5), random_state)
+    folds = list(cv_strategy.split(X, y))
+    candidates = generate_candidates(search_config['param_space'], strategy,
+                                     search_config.get('n_iter', 20), max_trials, random_state)
+
+    if strategy == 'halving':
+        n_rungs = max(1, int(np.log(len(candidates)) / np.log(HALVING_FACTOR)) + 1)
+        rung_sizes = [max(1, len(candidates) // HALVING_FACTOR ** rung) for rung in range(n_rungs)]
+    else:
+        rung_sizes = [len(candidates)]
+    total = sum(rung_sizes)
+    n_workers = effective_n_jobs(n_jobs)
+    logger.info(f"Recherche {strategy} sur {algorithm}: {len(candidates)} candidats, "
+                f"{len(folds)} plis, {n_workers} workers, métrique {scoring}")
+
+    trials: List[Dict[str, Any]] = []
+
+    def report() -> None:
+        if progress_callback is not None:
+            progress_callback(len(trials), total)
+
+    with Parallel(n_jobs=n_jobs, max_nbytes=JOBLIB_MAX_NBYTES) as parallel:
+        def evaluate(batch, batch_folds, threshold=None):
+            return parallel(
+                delayed(_evaluate_trial)(trial_id, algorithm, task_type, params, base_params,
+                                         X, y, batch_folds, scoring, threshold)
+                for trial_id, params in batch
+            )
+
+        if strategy == 'halving':
+            survivors = list(enumerate(candidates))
+            n_train = len(folds[0][0])
+            n_samples = max(HALVING_MIN_SAMPLES, n_train // HALVING_FACTOR ** (n_rungs - 1))
+            for rung in range(n_rungs):
+                # Dernier palier : toutes les lignes d'entraînement
+                rung_folds = folds if rung == n_rungs - 1 else _subsample_folds(folds, n_samples, random_state)
+                records = evaluate(survivors, rung_folds)
+                for record in records:
+                    record['rung'] = rung
+                trials.extend(records)
+                report()
+
+                ranked = _ranked(records)
+                if not ranked or rung == n_rungs - 1:
+                    break
+                keep = {r['trial_id'] for r in ranked[:rung_sizes[rung + 1]]}
+                survivors = [(trial_id, params) for trial_id, params in survivors if trial_id in keep]
+                n_samples *= HALVING_FACTOR
+            final = _ranked([t for t in trials if t['rung'] == trials[-1]['rung']])
+        else:
+            # Lots de 2 essais par worker : le seuil d'élagage se resserre entre deux lots
+            batch_size = max(1, n_workers) * 2
+            indexed = list(enumerate(candidates))
+            best_score = None
+            for start in range(0, len(indexed), batch_size):
+                records = evaluate(indexed[start:start + batch_size], folds, _pruning_threshold(best_score))
+                trials.extend(records)
+                report()
+                ranked = _ranked(trials)
+                if ranked:
+                    best_score = ranked[0]['mean_score']
+            final = _ranked(trials)
+
+    if not final:
+        errors = {t.get('error') for t in trials if t.get('error')}
+        raise ValueError(f"All hyperparameter search trials failed: {'; '.join(sorted(errors))[:500]}")
+
+    best = final[0]
+    duration = time.perf_counter() - started
+    logger.info(f"Recherche terminée en {duration:.1f}s : meilleur score {best['mean_score']:.4f} avec {best['params']}")
+    return {
+        'strategy': strategy,
+        'scoring': scoring,
+        'cv': len(folds),
+        'best_trial_id': best['trial_id'],
+        'best_params': best['params'],
+        'best_score': best['mean_score'],
+        'n_trials': len(trials),
+        'n_pruned': sum(1 for t in trials if t['status'] == 'pruned'),
+        'n_failed': sum(1 for t in trials if t['status'] == 'failed'),
+        'duration': round(duration, 3),
+        'trials': trials
+    }
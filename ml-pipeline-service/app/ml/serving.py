@@ -0,0 +1,218 @@
+"""
+Prédictions avec les modèles entraînés.
+
+- ModelBundleCache : modèles chargés ({model, preprocessing_pipeline}) gardés en
+  mémoire, éviction LRU au-delà de PREDICTION_MODEL_CACHE_MAX_BYTES (taille
+  estimée d'après l'artefact, relu par app.ml.artifacts). Les chargements concurrents d'un même
+  artefact n'en téléchargent qu'un exemplaire.
+- PredictionService : micro-batching. Les requêtes reçues pour un même modèle
+  pendant PREDICTION_BATCH_WINDOW_MS sont concaténées et prédites en un seul
+  appel (au plus PREDICTION_MAX_BATCH_ROWS lignes), dans un pool de threads :
+  la boucle asyncio de l'API n'est jamais bloquée.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.ml.artifacts import load_model_artifact
+from common.storage_client import get_storage_client
+
+logger = logging.getLogger(__name__)
+
+# Mémoire occupée par un modèle chargé, rapportée à la taille de l'artefact sérialisé
+LOADED_SIZE_FACTOR = 2
+
+
+class ModelBundle:
+    """Modèle entraîné et pipeline de preprocessing ajusté, prêts à prédire."""
+
+    def __init__(self, artifact_uri: str, artifact: Dict[str, Any], size_bytes: int):
+        self.artifact_uri = artifact_uri
+        self.model = artifact['model']
+        self.preprocessing_pipeline = artifact['preprocessing_pipeline']
+        self.training_config = artifact.get('training_config', {})
+        self.size_bytes = size_bytes
+        # Colonnes brutes vues à l'ajustement du preprocessing (ordre conservé)
+        self.input_columns = list(getattr(self.preprocessing_pipeline, 'feature_names_in_', []))
+        # Cible texte encodée à l'entraînement : indice = code prédit par le modèle
+        label_classes = self.training_config.get('label_classes')
+        self.label_classes = np.asarray(label_classes, dtype=object) if label_classes else None
+        estimator = getattr(self.model, 'model', self.model)
+        classes = getattr(estimator, 'classes_', None)
+        self.classes = self._decode(classes).tolist() if classes is not None else None
+
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        """Valeurs d'origine de la cible pour des codes prédits."""
+        codes = np.asarray(codes)
+        if self.label_classes is None:
+            return codes
+        return self.label_classes[codes.astype(np.int64)]
+
+    def predict(self, df: pd.DataFrame, return_probabilities: bool = False) -> Dict[str, Any]:
+        """Prédit un lot ; colonnes absentes = valeurs manquantes, colonnes en trop ignorées."""
+        if self.input_columns:
+            df = df.reindex(columns=self.input_columns)
+        X = self.preprocessing_pipeline.transform(df)
+        result = {'predictions': self._decode(self.model.predict(X))}
+        if return_probabilities and self.classes is not None:
+            try:
+                result['probabilities'] = np.asarray(self.model.predict_proba(X))
+            except (NotImplementedError, AttributeError):
+                pass
+        return result
+
+
+class ModelBundleCache:
+    """Cache LRU des modèles chargés, borné en mémoire."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._bundles: "OrderedDict[str, ModelBundle]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def get(self, artifact_uri: str) -> ModelBundle:
+        """Modèle en cache, ou téléchargé et chargé (bloquant : à appeler hors de la boucle asyncio)."""
+        with self._lock:
+            bundle = self._bundles.get(artifact_uri)
+            if bundle is not None:
+                self._bundles.move_to_end(artifact_uri)
+                return bundle
+            load_lock = self._loading.setdefault(artifact_uri, threading.Lock())
+
+        with load_lock:
+            # Un autre thread a pu charger le modèle pendant l'attente du verrou
+            with self._lock:
+                bundle = self._bundles.get(artifact_uri)
+                if bundle is not None:
+                    self._bundles.move_to_end(artifact_uri)
+                    return bundle
+
+            try:
+                started = time.perf_counter()
+                data = get_storage_client().download_file(artifact_uri)
+                bundle = ModelBundle(artifact_uri, load_model_artifact(data), len(data) * LOADED_SIZE_FACTOR)
+                logger.info(f"Modèle chargé {artifact_uri} ({len(data)} bytes) en {time.perf_counter() - started:.2f}s")
+
+                with self._lock:
+                    if bundle.size_bytes <= self.max_bytes:
+                        self._bundles[artifact_uri] = bundle
+                        self._size += bundle.size_bytes
+                        self._evict()
+            finally:
+                with self._lock:
+                    self._loading.pop(artifact_uri, None)
+            return bundle
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and len(self._bundles) > 1:
+            uri, evicted = self._bundles.popitem(last=False)
+            self._size -= evicted.size_bytes
+            logger.info(f"Modèle évincé du cache de prédiction: {uri}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'models': len(self._bundles), 'bytes': self._size, 'max_bytes': self.max_bytes}
+
+
+class _PendingRequest:
+    def __init__(self, df: pd.DataFrame, return_probabilities: bool, future: asyncio.Future):
+        self.df = df
+        self.return_probabilities = return_probabilities
+        self.future = future
+
+
+class PredictionService:
+    """Micro-batching des requêtes de prédiction par modèle."""
+
+    def __init__(self, cache: ModelBundleCache, workers: int, batch_window: float, max_batch_rows: int):
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict")
+        self.batch_window = batch_window
+        self.max_batch_rows = max_batch_rows
+        self._pending: Dict[str, List[_PendingRequest]] = {}
+        self._pending_rows: Dict[str, int] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+
+    async def predict(self, artifact_uri: str, df: pd.DataFrame, return_probabilities: bool = False) -> Dict[str, Any]:
+        """
+        Prédictions pour df avec le modèle artifact_uri.
+
+        Returns:
+            {"predictions": ndarray, "probabilities": ndarray (optionnel), "classes": list | None}
+        """
+        loop = asyncio.get_running_loop()
+        # Chargement (ou cache) hors de la boucle : la requête suivante n'attend pas le téléchargement
+        bundle = await loop.run_in_executor(self.executor, self.cache.get, artifact_uri)
+
+        # Les gros lots sont prédits directement, sans fenêtre d'attente
+        if len(df) >= self.max_batch_rows:
+            result = await loop.run_in_executor(self.executor, bundle.predict, df, return_probabilities)
+            result['classes'] = bundle.classes
+            return result
+
+        future = loop.create_future()
+        self._pending.setdefault(artifact_uri, []).append(_PendingRequest(df, return_probabilities, future))
+        self._pending_rows[artifact_uri] = self._pending_rows.get(artifact_uri, 0) + len(df)
+
+        if self._pending_rows[artifact_uri] >= self.max_batch_rows:
+            self._flush(artifact_uri, bundle)
+        elif artifact_uri not in self._flush_handles:
+            self._flush_handles[artifact_uri] = loop.call_later(self.batch_window, self._flush, artifact_uri, bundle)
+        return await future
+
+    def _flush(self, artifact_uri: str, bundle: ModelBundle) -> None:
+        handle = self._flush_handles.pop(artifact_uri, None)
+        if handle is not None:
+            handle.cancel()
+        requests = self._pending.pop(artifact_uri, [])
+        self._pending_rows.pop(artifact_uri, None)
+        if requests:
+            asyncio.ensure_future(self._run_batch(bundle, requests))
+
+    async def _run_batch(self, bundle: ModelBundle, requests: List[_PendingRequest]) -> None:
+        loop = asyncio.get_running_loop()
+        return_probabilities = any(r.return_probabilities for r in requests)
+        try:
+            combined = pd.concat([r.df for r in requests], ignore_index=True) if len(requests) > 1 else requests[0].df
+            result = await loop.run_in_executor(self.executor, bundle.predict, combined, return_probabilities)
+        except Exception as e:
+            for r in requests:
+                if not r.future.done():
+                    r.future.set_exception(e)
+            return
+
+        offset = 0
+        for r in requests:
+            rows = slice(offset, offset + len(r.df))
+            offset += len(r.df)
+            part = {'predictions': result['predictions'][rows], 'classes': bundle.classes}
+            if r.return_probabilities and 'probabilities' in result:
+                part['probabilities'] = result['probabilities'][rows]
+            if not r.future.done():
+                r.future.set_result(part)
+
+
+_prediction_service: Optional[PredictionService] = None
+
+
+def get_prediction_service() -> PredictionService:
+    global _prediction_service
+    if _prediction_service is None:
+        _prediction_service = PredictionService(
+            ModelBundleCache(settings.PREDICTION_MODEL_CACHE_MAX_BYTES),
+            workers=settings.PREDICTION_WORKERS,
+            batch_window=settings.PREDICTION_BATCH_WINDOW_MS / 1000.0,
+            max_batch_rows=settings.PREDICTION_MAX_BATCH_ROWS
+        )
+    return _prediction_service
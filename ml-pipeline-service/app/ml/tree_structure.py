@@ -0,0 +1,206 @@
+"""
+Structure des arbres de décision pour la visualisation (ECharts).
+
+La structure complète d'un arbre est extraite sous forme de tableaux (un élément
+par nœud, comme sklearn.tree._tree.Tree) : compacte, sérialisable en JSON et
+stockée à part dans le stockage objet. L'arbre imbriqué affiché par le frontend
+en est dérivé avec des plafonds de profondeur et de nombre de nœuds : un
+sous-arbre coupé est remplacé par un nœud de synthèse (échantillons, nombre de
+nœuds et profondeur du sous-arbre).
+
+Profondeurs et tailles de sous-arbres sont calculées niveau par niveau avec
+NumPy : aucune récursion Python, quelle que soit la profondeur de l'arbre.
+"""
+
+import gzip
+import json
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Incrémenter si le format des tableaux change
+TREE_ARRAYS_FORMAT = 1
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_MAX_NODES = 255
+
+
+def tree_arrays(tree, task_type: str) -> Dict[str, Any]:
+    """
+    Structure complète d'un arbre ajusté (estimator.tree_) en tableaux par nœud.
+
+    value : classe prédite (classification) ou valeur prédite (régression).
+    """
+    if task_type == 'classification':
+        value = np.argmax(tree.value[:, 0, :], axis=1)
+    else:
+        value = tree.value[:, 0, 0]
+    return {
+        'format': TREE_ARRAYS_FORMAT,
+        'task_type': task_type,
+        'n_nodes': int(tree.node_count),
+        'max_depth': int(tree.max_depth),
+        'n_features': int(tree.n_features),
+        'n_classes': int(tree.n_classes[0]) if task_type == 'classification' else 1,
+        'children_left': tree.children_left.tolist(),
+        'children_right': tree.children_right.tolist(),
+        'feature': tree.feature.tolist(),
+        'threshold': tree.threshold.tolist(),
+        'n_node_samples': tree.n_node_samples.tolist(),
+        'impurity': tree.impurity.tolist(),
+        'value': value.tolist()
+    }
+
+
+def serialize_tree_arrays(arrays: Dict[str, Any]) -> bytes:
+    """Artefact stocké : JSON compressé en gzip."""
+    return gzip.compress(json.dumps(arrays, separators=(',', ':')).encode())
+
+
+def deserialize_tree_arrays(data: bytes) -> Dict[str, Any]:
+    return json.loads(gzip.decompress(data))
+
+
+def _node_depths(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Profondeur de chaque nœud, un niveau de l'arbre à la fois."""
+    depths = np.zeros(len(left), dtype=np.int64)
+    frontier = np.array([0])
+    depth = 0
+    while frontier.size:
+        children = np.concatenate([left[frontier], right[frontier]])
+        frontier = children[children >= 0]
+        depth += 1
+        depths[frontier] = depth
+    return depths
+
+
+def _subtree_stats(left: np.ndarray, right: np.ndarray, depths: np.ndarray):
+    """(nombre de nœuds, profondeur relative) du sous-arbre de chaque nœud, des feuilles vers la racine."""
+    sizes = np.ones(len(left), dtype=np.int64)
+    heights = np.zeros(len(left), dtype=np.int64)
+    for depth in range(int(depths.max()) - 1, -1, -1):
+        nodes = np.flatnonzero((depths == depth) & (left >= 0))
+        sizes[nodes] += sizes[left[nodes]] + sizes[right[nodes]]
+        heights[nodes] = 1 + np.maximum(heights[left[nodes]], heights[right[nodes]])
+    return sizes, heights
+
+
+def build_nested_tree(arrays: Dict[str, Any],
+                      max_depth: Optional[int] = DEFAULT_MAX_DEPTH,
+                      max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+                      short_labels: bool = False) -> Dict[str, Any]:
+    """
+    Arbre imbriqué {name, condition, samples, is_leaf, children, ...} pour ECharts.
+
+    Les nœuds sont développés en largeur d'abord, par paires de frères, tant que
+    la profondeur reste sous max_depth et le total sous max_nodes. Chaque nœud
+    interne émis réserve la place de ses deux enfants (développés, ou feuille et
+    résumé s'il est coupé) : le total émis ne dépasse jamais max_nodes.
+
+    Args:
+        short_labels: libellés courts ('F3', 'C1') utilisés pour les forêts
+    """
+    left = np.asarray(arrays['children_left'], dtype=np.int64)
+    right = np.asarray(arrays['children_right'], dtype=np.int64)
+    feature = np.asarray(arrays['feature'])
+    threshold = np.asarray(arrays['threshold'])
+    samples = np.asarray(arrays['n_node_samples'])
+    value = np.asarray(arrays['value'])
+    classification = arrays['task_type'] == 'classification'
+
+    depths = _node_depths(left, right)
+    sizes, heights = _subtree_stats(left, right, depths)
+    max_depth = int(depths.max()) if max_depth is None else max_depth
+    max_nodes = len(left) if max_nodes is None else max(1, max_nodes)
+
+    def make_node(node_id: int) -> Dict[str, Any]:
+        depth = int(depths[node_id])
+        n_samples = int(samples[node_id])
+        if left[node_id] < 0:
+            if classification:
+                predicted = int(value[node_id])
+                name = f"C{predicted}" if short_labels else f"Classe {predicted}"
+            else:
+                predicted = float(value[node_id])
+                name = f"{predicted:.2f}" if short_labels else f"Valeur: {predicted:.3f}"
+            return {
+                "name": name,
+                "condition": f"n={n_samples}" if short_labels else f"Échantillons: {n_samples}",
+                "samples": n_samples,
+                "is_leaf": True,
+                "value": predicted,
+                "depth": depth
+            }
+        feature_name = f"F{feature[node_id]}" if short_labels else f"feature_{feature[node_id]}"
+        return {
+            "name": feature_name,
+            "condition": f"≤ {threshold[node_id]:.2f}" if short_labels else f"≤ {threshold[node_id]:.3f}",
+            "samples": n_samples,
+            "is_leaf": False,
+            "feature": feature_name,
+            "threshold": float(threshold[node_id]),
+            "depth": depth,
+            "children": []
+        }
+
+    def pruned_summary(node_id: int) -> Dict[str, Any]:
+        n_samples = int(samples[node_id])
+        return {
+            "name": "...",
+            "condition": f"{int(sizes[node_id])} nœuds, n={n_samples}",
+            "samples": n_samples,
+            "is_leaf": True,
+            "pruned": True,
+            "subtree_nodes": int(sizes[node_id]),
+            "subtree_depth": int(heights[node_id]),
+            "depth": int(depths[node_id])
+        }
+
+    n_emitted = 1
+    n_pruned = 0
+    if left[0] >= 0 and max_nodes < 3:
+        # Pas de place pour la racine et ses deux enfants : l'arbre entier est résumé
+        root = pruned_summary(0)
+        n_pruned = 1
+        queue = []
+    else:
+        root = make_node(0)
+        queue = [(0, root)]
+    # Nœuds émis + deux places par nœud interne émis pas encore traité
+    committed = n_emitted + (2 if queue and left[0] >= 0 else 0)
+    position = 0
+    # Parcours en largeur : la file ne contient que des nœuds émis (au plus max_nodes)
+    while position < len(queue):
+        node_id, node = queue[position]
+        position += 1
+        if left[node_id] < 0:
+            continue
+        n_emitted += 2
+        internal_children = int(left[left[node_id]] >= 0) + int(left[right[node_id]] >= 0)
+        if depths[node_id] >= max_depth or committed + 2 * internal_children > max_nodes:
+            # Sous-arbre coupé : le nœud interne garde sa condition, ses enfants internes sont résumés
+            for child_id in (int(left[node_id]), int(right[node_id])):
+                if left[child_id] < 0:
+                    node["children"].append(make_node(child_id))
+                else:
+                    node["children"].append(pruned_summary(child_id))
+                    n_pruned += 1
+            continue
+        for child_id in (left[node_id], right[node_id]):
+            child = make_node(int(child_id))
+            node["children"].append(child)
+            queue.append((int(child_id), child))
+        committed += 2 * internal_children
+
+    return {
+        "tree_data": root,
+        "metadata": {
+            "max_depth": int(arrays['max_depth']),
+            "n_nodes": int(arrays['n_nodes']),
+            "n_features": int(arrays['n_features']),
+            "n_classes": int(arrays.get('n_classes', 1)),
+            "displayed_nodes": n_emitted,
+            "pruned_subtrees": n_pruned,
+            "display_max_depth": max_depth,
+            "display_max_nodes": max_nodes
+        }
+    }
@@ -0,0 +1,70 @@
+"""
+Requêtes sur le registre des modèles (table model_versions).
+
+Les versions d'une expérience, le dernier modèle et l'espace de stockage d'un
+utilisateur sont lus par des requêtes indexées, sans lister le stockage objet.
+"""
+
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Experiment, ModelVersion
+
+
+def register_model_version(db: Session, experiment: Experiment, version: str,
+                           artifact_path: str, manifest: Dict[str, Any],
+                           manifest_path: Optional[str] = None) -> ModelVersion:
+    """Ajoute la version uploadée au registre (commit à la charge de l'appelant)."""
+    model_version = ModelVersion(
+        experiment_id=experiment.id,
+        user_id=experiment.user_id,
+        project_id=experiment.project_id,
+        version=version,
+        artifact_path=artifact_path,
+        manifest_path=manifest_path,
+        size_bytes=manifest.get('size_bytes'),
+        sha256=manifest.get('sha256'),
+        compression=manifest.get('compression'),
+        algorithm=experiment.algorithm,
+        metrics=manifest.get('metrics')
+    )
+    db.add(model_version)
+    return model_version
+
+
+def list_model_versions(db: Session, experiment_id: UUID) -> List[ModelVersion]:
+    """Versions d'une expérience, plus récente en premier."""
+    return db.query(ModelVersion).filter(
+        ModelVersion.experiment_id == experiment_id
+    ).order_by(ModelVersion.created_at.desc()).all()
+
+
+def latest_model_version(db: Session, experiment_id: UUID) -> Optional[ModelVersion]:
+    return db.query(ModelVersion).filter(
+        ModelVersion.experiment_id == experiment_id
+    ).order_by(ModelVersion.created_at.desc()).first()
+
+
+def user_model_storage_bytes(db: Session, user_id: UUID) -> int:
+    """Espace occupé par les modèles d'un utilisateur (versions de taille connue)."""
+    total = db.query(func.coalesce(func.sum(ModelVersion.size_bytes), 0)).filter(
+        ModelVersion.user_id == user_id
+    ).scalar()
+    return int(total)
+
+
+def model_version_to_dict(model_version: ModelVersion) -> Dict[str, Any]:
+    return {
+        'version': model_version.version,
+        'file_path': model_version.artifact_path,
+        'manifest_path': model_version.manifest_path,
+        'size_bytes': model_version.size_bytes,
+        'sha256': model_version.sha256,
+        'compression': model_version.compression,
+        'algorithm': model_version.algorithm,
+        'metrics': model_version.metrics,
+        'created_at': model_version.created_at.isoformat() if model_version.created_at else None
+    }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, Float, Text, UUID
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, Float, Text, UUID, BigInteger, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID, JSONB
 from datetime import datetime
@@ -32,9 +32,10 @@ class Experiment(Base):
     algorithm = Column(String(50), nullable=False)
     hyperparameters = Column(JSONB, nullable=False)
     preprocessing_config = Column(JSONB, nullable=False)
+    search_config = Column(JSONB, nullable=True)  # Recherche d'hyperparamètres (None = entraînement simple)
     
     # === STATUT ET PROGRESSION ===
-    status = Column(String(20), nullable=False, default='pending', index=True)
+    status = Column(String(20), nullable=False, default='pending', index=True)  # queued, pending, running, completed, failed, cancelled
     progress = Column(Integer, nullable=True, default=0)
     task_id = Column(String(100), nullable=True)  # ID de la tâche Celery
     error_message = Column(Text, nullable=True)
@@ -44,10 +45,54 @@ class Experiment(Base):
     artifact_uri = Column(String(500), nullable=True)
     visualizations = Column(JSONB, nullable=True)
     feature_importance = Column(JSONB, nullable=True)
+    search_results = Column(JSONB, nullable=True)  # Meilleurs paramètres et détail des essais
     
     # === TIMESTAMPS ===
     created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Quotas : expériences d'un utilisateur sur une période
+        Index('ix_experiments_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+
+class ModelVersion(Base):
+    """
+    Registre des modèles entraînés : une ligne par artefact uploadé.
+    
+    Alimentée à l'upload du modèle (tasks.train_model), elle remplace le listing
+    du stockage objet pour les versions d'une expérience et donne l'espace de
+    stockage consommé par utilisateur.
+    """
+    __tablename__ = "model_versions"
+    
+    # === IDENTIFICATION ===
+    id = Column(PostgreSQLUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    experiment_id = Column(PostgreSQLUUID(as_uuid=True), ForeignKey("experiments.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(PostgreSQLUUID(as_uuid=True), nullable=False, index=True)
+    project_id = Column(PostgreSQLUUID(as_uuid=True), nullable=False)
+    version = Column(String(50), nullable=False)  # Horodatage YYYYmmdd_HHMMSS
+    
+    # === ARTEFACT ===
+    artifact_path = Column(String(500), nullable=False)
+    manifest_path = Column(String(500), nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)  # Inconnue pour les versions antérieures au registre
+    sha256 = Column(String(64), nullable=True)
+    compression = Column(String(20), nullable=True)
+    
+    # === INSTANTANÉ DES RÉSULTATS ===
+    algorithm = Column(String(50), nullable=False)
+    metrics = Column(JSONB, nullable=True)
+    
+    # === TIMESTAMPS ===
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('experiment_id', 'version', name='uq_model_versions_experiment_version'),
+        # Versions d'une expérience, plus récente en premier
+        Index('ix_model_versions_experiment_id_created_at', 'experiment_id', 'created_at'),
+    )
 
 
 class DataQualityAnalysis(Base):
@@ -64,7 +109,8 @@ class DataQualityAnalysis(Base):
     # === IDENTIFICATION ===
     id = Column(PostgreSQLUUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     dataset_id = Column(PostgreSQLUUID(as_uuid=True), nullable=False, index=True)
-    dataset_version = Column(String(50), nullable=True)  # Hash ou version pour invalider le cache
+    dataset_version = Column(String(50), nullable=True)  # ETag du fichier analysé (ou updated_at du dataset)
+    cache_key = Column(String(64), nullable=True)  # Clé adressée par le contenu (app/ml/data_quality_cache.py)
     
     # === ANALYSE ===
     analysis_data = Column(JSONB, nullable=False)  # Analyse complète sérialisée
@@ -78,4 +124,9 @@ class DataQualityAnalysis(Base):
     
     # === TIMESTAMPS ===
     created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, index=True)
-    expires_at = Column(DateTime(timezone=True), nullable=True)  # Pour gérer l'expiration du cache 
\ No newline at end of file
+    expires_at = Column(DateTime(timezone=True), nullable=True)  # Pour gérer l'expiration du cache
+    
+    __table_args__ = (
+        Index('ix_data_quality_analyses_cache_key', 'cache_key', unique=True),
+        Index('ix_data_quality_analyses_expires_at', 'expires_at'),
+    ) 
\ No newline at end of file
@@ -0,0 +1,372 @@
+"""
+Ordonnancement équitable des entraînements (Redis).
+
+Une expérience créée passe au statut 'queued' et n'est envoyée à Celery que
+lorsqu'un créneau se libère sur sa file (SCHEDULER_HEAVY_SLOTS / SCHEDULER_LIGHT_SLOTS).
+Les files Celery restent courtes : c'est l'ordonnanceur qui décide de l'ordre.
+
+L'ordre suit un fair queuing pondéré auto-cadencé (self-clocked fair queuing),
+par file de workers :
+
+    étiquette = max(horloge virtuelle, dernière étiquette de l'utilisateur) + coût / poids
+
+L'expérience d'étiquette la plus basse part en premier et l'horloge virtuelle prend
+son étiquette. Un utilisateur qui soumet vingt expériences d'un coup ne passe
+donc pas devant celui qui en soumet une ; un utilisateur inactif repart de
+l'horloge courante, sans crédit accumulé. Le poids vient du niveau de
+l'utilisateur (SCHEDULER_TIER_WEIGHTS), le coût du type d'entraînement.
+
+Clés Redis :
+- ibis-x:scheduler:{queue}:order   zset  expérience -> étiquette
+- ibis-x:scheduler:{queue}:finish  hash  utilisateur -> dernière étiquette
+- ibis-x:scheduler:{queue}:vtime   horloge virtuelle
+- ibis-x:scheduler:jobs            hash  expérience en attente -> {queue, user_id, tier}
+- ibis-x:scheduler:running         hash  expérience envoyée -> {queue, user_id, dispatched_at}
+
+Un créneau est libéré à la fin de train_model (succès ou échec définitif), à
+l'annulation, ou d'office après SCHEDULER_SLOT_TIMEOUT (worker perdu).
+
+Les créneaux d'une file valent le nombre de processus des workers en ligne qui
+la consomment (celery inspect, mis en cache CAPACITY_CACHE_TTL secondes) :
+l'ordonnanceur n'envoie jamais plus d'entraînements que les workers ne peuvent en
+exécuter, sinon l'excédent retomberait dans l'ordre FIFO de Celery.
+SCHEDULER_HEAVY_SLOTS / SCHEDULER_LIGHT_SLOTS forcent une valeur.
+
+La base reste la référence : une expérience 'queued' absente de Redis (flush,
+redémarrage sans persistance, passe interrompue) est remise en file par
+reconcile, appelée à chaque passe périodique (pump).
+"""
+
+import json
+import time
+import uuid
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.celery_app import celery_app
+from app.core.events import publish_experiment_event
+from app.core.workloads import HEAVY_QUEUE, LIGHT_QUEUE, training_workload
+from app.database import SessionLocal
+from app.models import Experiment
+
+logger = logging.getLogger(__name__)
+
+TRAIN_TASK_NAME = 'train_model'
+KEY_PREFIX = "ibis-x:scheduler"
+JOBS_KEY = f"{KEY_PREFIX}:jobs"
+RUNNING_KEY = f"{KEY_PREFIX}:running"
+LOCK_KEY = f"{KEY_PREFIX}:lock"
+LOCK_TIMEOUT = 30
+
+DEFAULT_TIER = 'standard'
+
+CAPACITY_CACHE_TTL = 60
+_capacity_cache: Tuple[float, Optional[Dict[str, int]]] = (0.0, None)
+
+
+def _queue_key(queue: str, name: str) -> str:
+    return f"{KEY_PREFIX}:{queue}:{name}"
+
+
+def worker_capacity() -> Optional[Dict[str, int]]:
+    """
+    Processus des workers en ligne par file consommée, None si aucun worker ne répond.
+
+    Les workers light partagent leurs processus entre ml_light_queue et data_quality_queue :
+    leur capacité est comptée entière pour chacune des deux files.
+    """
+    global _capacity_cache
+    checked_at, capacity = _capacity_cache
+    if time.time() - checked_at < CAPACITY_CACHE_TTL:
+        return capacity
+
+    capacity = None
+    try:
+        inspector = celery_app.control.inspect(timeout=1.0)
+        stats = inspector.stats() or {}
+        active_queues = inspector.active_queues() or {}
+        if active_queues:
+            capacity = {}
+            for worker, queues in active_queues.items():
+                concurrency = (stats.get(worker) or {}).get('pool', {}).get('max-concurrency', 1)
+                for queue in queues:
+                    capacity[queue['name']] = capacity.get(queue['name'], 0) + concurrency
+    except Exception as e:
+        logger.warning(f"Capacité des workers inconnue: {str(e)}")
+    _capacity_cache = (time.time(), capacity)
+    return capacity
+
+
+def queue_slots() -> Dict[str, int]:
+    """
+    Entraînements simultanés autorisés par file : valeur forcée en configuration,
+    sinon capacité mesurée des workers (1 si elle est inconnue, la tâche attend alors dans Celery).
+    """
+    configured = {HEAVY_QUEUE: settings.SCHEDULER_HEAVY_SLOTS, LIGHT_QUEUE: settings.SCHEDULER_LIGHT_SLOTS}
+    capacity = None
+    if any(slots is None for slots in configured.values()):
+        capacity = worker_capacity()
+    slots = {}
+    for queue, value in configured.items():
+        if value is not None:
+            slots[queue] = value
+        elif capacity is None:
+            slots[queue] = 1
+        else:
+            slots[queue] = capacity.get(queue, 0)
+    return slots
+
+
+def _training_cost(experiment: Experiment) -> float:
+    return settings.SCHEDULER_SEARCH_COST if experiment.search_config else 1.0
+
+
+def user_tier(role: Optional[str] = None, credits: Optional[int] = None) -> str:
+    """
+    Niveau de priorité d'un utilisateur (en-têtes X-User-Role / X-User-Credits de la gateway).
+
+    admin : priority ; crédits restants ou inconnus : standard ; crédits épuisés : best_effort.
+    """
+    if role == 'admin':
+        return 'priority'
+    if credits is not None and credits <= 0:
+        return 'best_effort'
+    return DEFAULT_TIER
+
+
+class ExperimentScheduler:
+    """File d'attente équitable des entraînements, partagée par l'API et les workers."""
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis: Optional[redis.Redis] = None
+
+    @property
+    def redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=2, socket_connect_timeout=2)
+        return self._redis
+
+    # --- Soumission ---
+
+    def submit(self, experiment_id: str, user_id: str, queue: str,
+               tier: str = DEFAULT_TIER, cost: float = 1.0) -> int:
+        """
+        Met une expérience (statut 'queued' en base) en attente puis lance une passe.
+
+        Returns:
+            position dans la file (0 si déjà envoyée à Celery)
+        """
+        experiment_id, user_id = str(experiment_id), str(user_id)
+        with self.redis.lock(LOCK_KEY, timeout=LOCK_TIMEOUT, blocking_timeout=5):
+            self._enqueue(experiment_id, user_id, queue, tier, cost)
+        self.dispatch(queue)
+        return self.position(experiment_id) or 0
+
+    def _enqueue(self, experiment_id: str, user_id: str, queue: str, tier: str, cost: float) -> None:
+        """Calcule l'étiquette et ajoute l'expérience à la file (verrou tenu par l'appelant)."""
+        weight = settings.SCHEDULER_TIER_WEIGHTS.get(tier) or settings.SCHEDULER_TIER_WEIGHTS[DEFAULT_TIER]
+        vtime = float(self.redis.get(_queue_key(queue, 'vtime')) or 0)
+        last_tag = float(self.redis.hget(_queue_key(queue, 'finish'), user_id) or 0)
+        tag = max(vtime, last_tag) + cost / weight
+
+        pipe = self.redis.pipeline()
+        pipe.hset(_queue_key(queue, 'finish'), user_id, tag)
+        pipe.zadd(_queue_key(queue, 'order'), {experiment_id: tag})
+        pipe.hset(JOBS_KEY, experiment_id, json.dumps({'queue': queue, 'user_id': user_id, 'tier': tier}))
+        pipe.execute()
+        logger.info(f"Expérience {experiment_id} en attente sur {queue} (niveau {tier}, étiquette {tag:.3f})")
+
+    def reconcile(self) -> int:
+        """
+        Remet en file les expériences 'queued' en base mais absentes de Redis.
+
+        Le niveau d'origine n'est pas conservé en base : elles repartent en niveau
+        standard, par date de création.
+
+        Returns:
+            nombre d'expériences remises en file
+        """
+        db = SessionLocal()
+        try:
+            known = {key.decode() for key in self.redis.hkeys(JOBS_KEY)}
+            candidates: List[Tuple[str, str, str, float]] = []
+            for experiment in db.query(Experiment).filter(
+                Experiment.status == 'queued'
+            ).order_by(Experiment.created_at).all():
+                if str(experiment.id) in known:
+                    continue
+                # Routage hors verrou : il peut interroger le catalogue
+                queue = training_workload(str(experiment.dataset_id), experiment.search_config)['queue']
+                candidates.append((str(experiment.id), str(experiment.user_id), queue, _training_cost(experiment)))
+            if not candidates:
+                return 0
+
+            # Sous le verrou, une expérience retirée par une passe en cours est déjà 'pending' ou remise en file
+            resubmitted = 0
+            with self.redis.lock(LOCK_KEY, timeout=LOCK_TIMEOUT, blocking_timeout=5):
+                known = {key.decode() for key in self.redis.hkeys(JOBS_KEY)}
+                db.expire_all()
+                still_queued = {str(row.id) for row in db.query(Experiment.id).filter(
+                    Experiment.id.in_([candidate[0] for candidate in candidates]),
+                    Experiment.status == 'queued'
+                ).all()}
+                for experiment_id, user_id, queue, cost in candidates:
+                    if experiment_id in still_queued and experiment_id not in known:
+                        self._enqueue(experiment_id, user_id, queue, DEFAULT_TIER, cost)
+                        resubmitted += 1
+        finally:
+            db.close()
+        if resubmitted:
+            logger.warning(f"{resubmitted} expérience(s) 'queued' absente(s) de Redis remise(s) en file")
+        return resubmitted
+
+    def pump(self) -> int:
+        """Passe périodique : réconciliation avec la base puis envoi des têtes de file."""
+        self.reconcile()
+        return self.dispatch()
+
+    def position(self, experiment_id: str) -> Optional[int]:
+        """Position (1 = prochaine à partir) d'une expérience en attente, None sinon."""
+        job = self.redis.hget(JOBS_KEY, str(experiment_id))
+        if not job:
+            return None
+        rank = self.redis.zrank(_queue_key(json.loads(job)['queue'], 'order'), str(experiment_id))
+        return rank + 1 if rank is not None else None
+
+    def queued_count(self, user_id: str) -> int:
+        """Expériences d'un utilisateur en attente, toutes files confondues."""
+        return sum(1 for job in self.redis.hvals(JOBS_KEY) if json.loads(job)['user_id'] == str(user_id))
+
+    # --- Créneaux ---
+
+    def release(self, experiment_id: str) -> None:
+        """Libère le créneau d'une expérience terminée, annulée ou retirée de la file."""
+        experiment_id = str(experiment_id)
+        running = self.redis.hget(RUNNING_KEY, experiment_id)
+        queued = self.redis.hget(JOBS_KEY, experiment_id)
+        if queued:
+            queue = json.loads(queued)['queue']
+            pipe = self.redis.pipeline()
+            pipe.zrem(_queue_key(queue, 'order'), experiment_id)
+            pipe.hdel(JOBS_KEY, experiment_id)
+            pipe.execute()
+        if running:
+            self.redis.hdel(RUNNING_KEY, experiment_id)
+            self.dispatch(json.loads(running)['queue'])
+
+    def _running_by_queue(self) -> Dict[str, int]:
+        """Créneaux occupés par file ; les créneaux expirés (worker perdu) sont libérés."""
+        counts = {queue: 0 for queue in queue_slots()}
+        now = time.time()
+        for experiment_id, raw in self.redis.hgetall(RUNNING_KEY).items():
+            slot = json.loads(raw)
+            if now - slot['dispatched_at'] > settings.SCHEDULER_SLOT_TIMEOUT:
+                logger.warning(f"Créneau de l'expérience {experiment_id.decode()} expiré : libéré")
+                self.redis.hdel(RUNNING_KEY, experiment_id)
+                continue
+            counts[slot['queue']] = counts.get(slot['queue'], 0) + 1
+        return counts
+
+    # --- Envoi vers Celery ---
+
+    def dispatch(self, queue: Optional[str] = None) -> int:
+        """
+        Envoie à Celery les expériences en tête de file tant qu'il reste des créneaux.
+
+        Une seule passe à la fois (verrou Redis) ; une passe concurrente rend la
+        main immédiatement, la suivante (SCHEDULER_PUMP_INTERVAL) rattrape.
+
+        Returns:
+            nombre d'expériences envoyées
+        """
+        lock = self.redis.lock(LOCK_KEY, timeout=LOCK_TIMEOUT, blocking_timeout=0.5)
+        if not lock.acquire():
+            return 0
+        db = SessionLocal()
+        dispatched = 0
+        try:
+            running = self._running_by_queue()
+            for name, slots in queue_slots().items():
+                if queue and name != queue:
+                    continue
+                while running.get(name, 0) < slots:
+                    head = self.redis.zpopmin(_queue_key(name, 'order'))
+                    if not head:
+                        break
+                    experiment_id, tag = head[0][0].decode(), head[0][1]
+                    self.redis.set(_queue_key(name, 'vtime'), tag)
+                    job = self.redis.hget(JOBS_KEY, experiment_id)
+                    self.redis.hdel(JOBS_KEY, experiment_id)
+                    try:
+                        sent = self._send(db, experiment_id, name, json.loads(job or '{}').get('user_id'))
+                    except Exception as e:
+                        # Broker ou base indisponible : l'expérience reprend sa place, passe suivante
+                        logger.error(f"Envoi de l'expérience {experiment_id} impossible: {str(e)}")
+                        self._requeue(db, experiment_id, name, tag, job)
+                        break
+                    if sent:
+                        running[name] = running.get(name, 0) + 1
+                        dispatched += 1
+        finally:
+            db.close()
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                pass
+        return dispatched
+
+    def _send(self, db: Session, experiment_id: str, queue: str, user_id: Optional[str]) -> bool:
+        """Passe l'expérience en 'pending' et l'envoie à Celery ; False si elle n'est plus en attente."""
+        experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        if not experiment or experiment.status != 'queued':
+            return False
+
+        # L'identifiant de tâche est enregistré avant l'envoi : le worker trouve l'expérience en 'pending'
+        experiment.task_id = str(uuid.uuid4())
+        experiment.status = 'pending'
+        experiment.updated_at = datetime.now(timezone.utc)
+        db.commit()
+        self.redis.hset(RUNNING_KEY, experiment_id, json.dumps({
+            'queue': queue, 'user_id': user_id, 'dispatched_at': time.time()
+        }))
+        celery_app.send_task(TRAIN_TASK_NAME, args=[experiment_id], task_id=experiment.task_id, queue=queue)
+        publish_experiment_event(experiment_id, status='pending', progress=0, stage='dispatched',
+                                 message="Entraînement envoyé aux workers", algorithm=experiment.algorithm)
+        logger.info(f"Expérience {experiment_id} envoyée sur {queue} (tâche {experiment.task_id})")
+        return True
+
+    def _requeue(self, db: Session, experiment_id: str, queue: str, tag: float, job: Optional[bytes]) -> None:
+        db.rollback()
+        experiment = db.query(Experiment).filter(Experiment.id == experiment_id).first()
+        if experiment and experiment.status == 'pending':
+            experiment.status = 'queued'
+            experiment.task_id = None
+            db.commit()
+        pipe = self.redis.pipeline()
+        pipe.hdel(RUNNING_KEY, experiment_id)
+        pipe.zadd(_queue_key(queue, 'order'), {experiment_id: tag})
+        if job:
+            pipe.hset(JOBS_KEY, experiment_id, job)
+        pipe.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        """Expériences en attente et créneaux occupés par file."""
+        running = self._running_by_queue()
+        return {
+            queue: {
+                'queued': self.redis.zcard(_queue_key(queue, 'order')),
+                'running': running.get(queue, 0),
+                'slots': slots
+            }
+            for queue, slots in queue_slots().items()
+        }
+
+
+# Instance globale (une par processus)
+experiment_scheduler = ExperimentScheduler(settings.SCHEDULER_REDIS_URL or settings.CELERY_BROKER_URL)
@@ -3,30 +3,67 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime
 from uuid import UUID
 
+# Hyperparamètres acceptés par algorithme
+ALLOWED_HYPERPARAMETERS = {
+    'decision_tree': {'criterion', 'max_depth', 'min_samples_split', 'min_samples_leaf', 'max_features'},
+    'random_forest': {'n_estimators', 'max_depth', 'min_samples_split', 'bootstrap', 'max_features'},
+    'extra_trees': {'n_estimators', 'max_depth', 'min_samples_split', 'min_samples_leaf', 'bootstrap', 'max_features'},
+    'hist_gradient_boosting': {'learning_rate', 'max_iter', 'max_leaf_nodes', 'max_depth', 'min_samples_leaf',
+                               'l2_regularization', 'max_bins', 'early_stopping'},
+    'logistic_regression': {'penalty', 'C', 'solver', 'max_iter', 'l1_ratio', 'tol'},
+    'svm': {'kernel', 'C', 'gamma', 'degree'},
+    'knn': {'n_neighbors', 'weights', 'algorithm', 'metric'},
+    'neural_network': {'hidden_layer_sizes', 'activation', 'solver', 'alpha', 'learning_rate', 'max_iter'},
+    'sgd': {'loss', 'penalty', 'alpha', 'l1_ratio', 'learning_rate', 'eta0', 'max_iter'},
+    'naive_bayes': {'var_smoothing'},
+}
+
+# Algorithmes pris en charge par la recherche d'hyperparamètres
+SEARCHABLE_ALGORITHMS = ('decision_tree', 'random_forest', 'extra_trees', 'hist_gradient_boosting', 'logistic_regression')
+
+class HyperparameterSearchConfig(BaseModel):
+    """
+    Recherche d'hyperparamètres : chaque entrée de param_space est une liste de
+    valeurs ou un intervalle {"low", "high", "type": "int"|"float", "log"}.
+    """
+    strategy: str = Field("random", pattern="^(grid|random|halving)$")
+    param_space: Dict[str, Any]
+    n_iter: int = Field(20, ge=1, le=200)  # Nombre de candidats (random / halving)
+    cv: int = Field(5, ge=2, le=10)
+    scoring: Optional[str] = Field(None, pattern="^(accuracy|balanced_accuracy|f1_weighted|f1_macro|precision_weighted|recall_weighted|roc_auc|r2|neg_mean_squared_error|neg_root_mean_squared_error|neg_mean_absolute_error)$")
+    
+    @field_validator('param_space')
+    @classmethod
+    def validate_param_space(cls, v):
+        if not v:
+            raise ValueError("param_space must define at least one hyperparameter")
+        for name, spec in v.items():
+            if isinstance(spec, list):
+                if not spec:
+                    raise ValueError(f"No candidate values for {name}")
+            elif isinstance(spec, dict):
+                if 'low' not in spec or 'high' not in spec or spec['low'] > spec['high']:
+                    raise ValueError(f"Invalid range for {name}: expected low <= high")
+                if spec.get('log') and spec['low'] <= 0:
+                    raise ValueError(f"Log-scale range for {name} must be positive")
+            else:
+                raise ValueError(f"{name} must be a list of values or a range")
+        return v
+
 class ExperimentCreate(BaseModel):
     project_id: UUID
     dataset_id: UUID
-    algorithm: str = Field(..., pattern="^(decision_tree|random_forest|logistic_regression|svm|knn|neural_network)$")
+    algorithm: str = Field(..., pattern="^(decision_tree|random_forest|extra_trees|hist_gradient_boosting|logistic_regression|svm|knn|neural_network|sgd|naive_bayes)$")
     hyperparameters: Dict[str, Any]
     preprocessing_config: Dict[str, Any]
+    search_config: Optional[HyperparameterSearchConfig] = None
     
     @field_validator('hyperparameters')
     @classmethod
     def validate_hyperparameters(cls, v, info):
         algorithm = info.data.get('algorithm')
-        if algorithm == 'decision_tree':
-            allowed_params = {'criterion', 'max_depth', 'min_samples_split', 'min_samples_leaf', 'max_features'}
-        elif algorithm == 'random_forest':
-            allowed_params = {'n_estimators', 'max_depth', 'min_samples_split', 'bootstrap', 'max_features'}
-        elif algorithm == 'logistic_regression':
-            allowed_params = {'penalty', 'C', 'solver', 'max_iter'}
-        elif algorithm == 'svm':
-            allowed_params = {'kernel', 'C', 'gamma', 'degree'}
-        elif algorithm == 'knn':
-            allowed_params = {'n_neighbors', 'weights', 'algorithm', 'metric'}
-        elif algorithm == 'neural_network':
-            allowed_params = {'hidden_layer_sizes', 'activation', 'solver', 'alpha', 'learning_rate', 'max_iter'}
-        else:
+        allowed_params = ALLOWED_HYPERPARAMETERS.get(algorithm)
+        if allowed_params is None:
             return v
         
         # Check for unknown parameters
@@ -35,6 +72,21 @@ class ExperimentCreate(BaseModel):
             raise ValueError(f"Unknown parameters for {algorithm}: {unknown_params}")
         
         return v
+    
+    @field_validator('search_config')
+    @classmethod
+    def validate_search_config(cls, v, info):
+        if v is None:
+            return v
+        algorithm = info.data.get('algorithm')
+        if algorithm not in SEARCHABLE_ALGORITHMS:
+            raise ValueError(f"Hyperparameter search is not available for {algorithm}")
+        
+        unknown_params = set(v.param_space.keys()) - ALLOWED_HYPERPARAMETERS[algorithm]
+        if unknown_params:
+            raise ValueError(f"Unknown parameters for {algorithm}: {unknown_params}")
+        
+        return v
 
 class ExperimentRead(BaseModel):
     id: UUID
@@ -44,6 +96,7 @@ class ExperimentRead(BaseModel):
     algorithm: str
     hyperparameters: Dict[str, Any]
     preprocessing_config: Dict[str, Any]
+    search_config: Optional[Dict[str, Any]] = None
     status: str
     progress: Optional[int] = None
     task_id: Optional[str] = None
@@ -52,6 +105,8 @@ class ExperimentRead(BaseModel):
     artifact_uri: Optional[str] = None
     visualizations: Optional[Dict[str, Any]] = None
     feature_importance: Optional[Dict[str, Any]] = None
+    search_results: Optional[Dict[str, Any]] = None
+    queue_position: Optional[int] = None  # Position dans la file de l'ordonnanceur (statut 'queued')
     created_at: datetime
     updated_at: datetime
     
@@ -75,6 +130,7 @@ class ExperimentStatus(BaseModel):
     algorithm: str  # ⚠️ FIX : Ajouter l'algorithme manquant
     task_id: Optional[str] = None
     error_message: Optional[str] = None
+    queue_position: Optional[int] = None  # Position dans la file de l'ordonnanceur (statut 'queued')
     created_at: datetime
     updated_at: datetime
 
@@ -84,9 +140,24 @@ class ExperimentResults(BaseModel):
     model_uri: Optional[str] = None  # Renommé pour cohérence avec l'API
     visualizations: Optional[Dict[str, Any]] = None
     feature_importance: Optional[Dict[str, Any]] = None
+    search_results: Optional[Dict[str, Any]] = None
     created_at: datetime
     completed_at: datetime
 
+class PredictionRequest(BaseModel):
+    """Lignes à prédire (colonnes brutes du dataset, sans la cible)"""
+    records: List[Dict[str, Any]] = Field(..., min_length=1)
+    return_probabilities: bool = False
+
+class PredictionResponse(BaseModel):
+    experiment_id: UUID
+    model_uri: str
+    n_rows: int
+    predictions: List[Any]
+    probabilities: Optional[List[List[float]]] = None
+    classes: Optional[List[Any]] = None  # Ordre des colonnes de probabilities
+    duration_ms: float
+
 class HyperparameterConfig(BaseModel):
     type: str  # 'number', 'select', 'boolean'
     min: Optional[float] = None
@@ -109,6 +180,34 @@ class DataQualityAnalysisRequest(BaseModel):
     target_column: Optional[str] = None
     sample_size: Optional[int] = 10000  # Pour les gros datasets
     force_refresh: Optional[bool] = False  # Pour forcer une nouvelle analyse même si cache existe
+    isolation_forest: Optional[bool] = False  # Détection multivariée des outliers (IsolationForest)
+    
+    @field_validator('target_column')
+    @classmethod
+    def empty_target_is_none(cls, v):
+        # Le formulaire envoie '' tant qu'aucune cible n'est choisie : même clé de cache que None
+        return (v or '').strip() or None
+
+# Bornes des précalculs de service à service (la priorité 'interactive' reste réservée aux utilisateurs)
+PRECOMPUTE_MAX_SAMPLE_SIZE = 50000
+BACKFILL_MAX_DATASETS = 500
+
+class DataQualityPrecomputeRequest(BaseModel):
+    """Précalcul de l'analyse à l'ingestion d'un dataset (appel de service à service)"""
+    dataset_id: str
+    target_column: Optional[str] = None
+    sample_size: Optional[int] = Field(10000, ge=1, le=PRECOMPUTE_MAX_SAMPLE_SIZE)
+    priority: str = Field('ingest', pattern='^(ingest|backfill)$')
+    
+    @field_validator('target_column')
+    @classmethod
+    def empty_target_is_none(cls, v):
+        return (v or '').strip() or None
+
+class DataQualityBackfillRequest(BaseModel):
+    """Précalcul en masse (priorité la plus basse : ne retarde jamais une demande utilisateur)"""
+    dataset_ids: List[str] = Field(..., min_length=1, max_length=BACKFILL_MAX_DATASETS)
+    sample_size: Optional[int] = Field(10000, ge=1, le=PRECOMPUTE_MAX_SAMPLE_SIZE)
 
 class ColumnMissingInfo(BaseModel):
     missing_count: int
@@ -138,6 +237,7 @@ class OutlierInfo(BaseModel):
 class OutliersAnalysis(BaseModel):
     iqr_method: Dict[str, OutlierInfo]
     zscore_method: Dict[str, OutlierInfo]
+    isolation_forest: Optional[Dict[str, Any]] = None  # Lignes atypiques, toutes colonnes confondues
 
 class DatasetOverview(BaseModel):
     total_rows: int
@@ -166,6 +266,15 @@ class DataQualityAnalysis(BaseModel):
     data_quality_score: int
     preprocessing_recommendations: PreprocessingRecommendations
 
+class DataQualityJob(BaseModel):
+    """Analyse en cours de calcul (réponse 202) ou état d'un job"""
+    job_id: str
+    status: str  # queued, running, completed, failed
+    status_url: Optional[str] = None
+    deduplicated: Optional[bool] = None  # Job déjà soumis pour la même analyse
+    error: Optional[str] = None
+    analysis: Optional[DataQualityAnalysis] = None
+
 # Schema pour les suggestions de stratégies
 class PreprocessingStrategyRequest(BaseModel):
     dataset_id: str
@@ -3,12 +3,12 @@ from celery.utils.log import get_task_logger
 import pandas as pd
 import numpy as np
 import json
-import joblib
 import os
 import io
-import base64
 import time
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from sqlalchemy.orm import Session
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
@@ -18,13 +18,28 @@ import seaborn as sns
 from app.core.celery_app import celery_app
 from app.database import SessionLocal
 from app.models import Experiment
-from app.ml.algorithms import DecisionTreeWrapper, RandomForestWrapper
+from app.model_registry import register_model_version
+from app.ml.algorithms import DecisionTreeWrapper, RandomForestWrapper, ALGORITHM_WRAPPERS
+from app.ml.search import run_search
 from app.ml.preprocessing import preprocess_data
-from app.ml.evaluation import evaluate_model, generate_visualizations
+from app.ml.evaluation import EvaluationContext, evaluate_model, generate_visualizations
+from app.ml.dataset_loader import load_dataset, sample_dataset, estimate_dataset_size
+from app.ml.tree_structure import serialize_tree_arrays
+from app.ml.data_quality_cache import precompute_analysis, DEFAULT_SAMPLE_SIZE
+from app.ml.artifacts import dump_model_artifact, build_manifest, manifest_path_for, serialize_manifest
+from app.ml.incremental import choose_training_mode, subsample_rows, train_incremental
+from app.ml.preprocessing_cache import get_preprocessing_cache, preprocessing_cache_key
+from app.core.config import settings
+from app.core.cpu_budget import cpu_budget
+from app.core.events import publish_experiment_event
+from app.scheduler import experiment_scheduler
 from common.storage_client import get_storage_client
 
 logger = get_task_logger(__name__)
 
+# Uploads simultanés des artefacts d'un entraînement (modèle, visualisations)
+ARTIFACT_UPLOAD_WORKERS = 4
+
 def convert_numpy_types(obj):
     """
     Convertit récursivement tous les types NumPy en types Python natifs
@@ -54,162 +69,139 @@ class MLTrainingTask(Task):
         if self._db is None:
             self._db = SessionLocal()
         return self._db
-
-@celery_app.task(bind=True, base=MLTrainingTask, name='train_model', 
-                 soft_time_limit=7200, time_limit=7500,
-                 autoretry_for=(ConnectionError, TimeoutError),
-                 retry_kwargs={'max_retries': 3, 'countdown': 60},
-                 retry_backoff=True)
-def train_model(self, experiment_id: str):
-    """
-    Train a machine learning model based on experiment configuration
-    
-    Args:
-        experiment_id: UUID of the experiment
-        
-    Returns:
-        dict: Training results
-    """
-    logger.info(f"[CELERY WORKER] Starting training for experiment {experiment_id}")
-    logger.info(f"[CELERY WORKER] Task ID: {self.request.id}")
     
-    try:
-        # Validation d'entrée stricte
-        if not experiment_id or experiment_id == "":
-            raise ValueError("experiment_id ne peut pas être vide")
-        
-        # Get experiment from database avec retry
-        experiment = None
-        for attempt in range(3):
-            try:
-                experiment = self.db.query(Experiment).filter(Experiment.id == experiment_id).first()
-                break
-            except Exception as db_error:
-                logger.warning(f"Tentative {attempt + 1}/3 de connexion BDD échouée: {str(db_error)}")
-                if attempt == 2:
-                    raise
-                time.sleep(2)
+    def report_progress(self, experiment: Experiment, progress: int, stage: str, message: str = None):
+        """
+        Enregistre l'avancement et publie l'événement d'étape.
+        
+        Le rythme d'affichage des étapes est géré côté client (flux /experiments/{id}/events) :
+        le worker n'attend jamais.
+        """
+        experiment.progress = progress
+        self.db.commit()
+        publish_experiment_event(str(experiment.id), status=experiment.status, progress=progress,
+                                 stage=stage, message=message, algorithm=experiment.algorithm)
+
+    def apply_task_type(self, experiment: Experiment, task_type: str):
+        """Enregistre le task_type effectif s'il diffère de celui demandé (auto-correction)."""
+        requested = experiment.preprocessing_config.get('task_type', 'classification')
+        if task_type == requested:
+            return
         
-        if not experiment:
-            raise ValueError(f"Experiment {experiment_id} not found")
+        # Modifier la configuration pour éviter l'erreur ET sauvegarder en BDD
+        experiment.preprocessing_config['task_type'] = task_type
+        experiment.preprocessing_config['original_task_type'] = requested
         
-        # Validation de l'état de l'expérience
-        if experiment.status not in ['pending', 'failed']:
-            raise ValueError(f"Experiment {experiment_id} is in invalid state: {experiment.status}")
+        # Marquer explicitement la colonne JSONB comme modifiée pour SQLAlchemy
+        from sqlalchemy.orm.attributes import flag_modified
+        flag_modified(experiment, 'preprocessing_config')
         
-        # Validation des paramètres requis
-        if not experiment.algorithm:
-            raise ValueError("Algorithm must be specified")
-        if not experiment.dataset_id:
-            raise ValueError("Dataset ID must be specified")
-        if not experiment.hyperparameters:
-            raise ValueError("Hyperparameters must be specified")
-        if not experiment.preprocessing_config:
-            raise ValueError("Preprocessing config must be specified")
-        
-        # Update status to running
-        experiment.status = 'running'
-        experiment.progress = 10
+        # CRUCIAL : Sauvegarder la modification en base de données
         self.db.commit()
-        self.update_state(state='PROGRESS', meta={'current': 10, 'total': 100})
-        
-        # Initialize storage client
-        storage_client = get_storage_client()
-        
-        # Load dataset using the new method that works with real datasets
+        logger.info(f"Configuration updated and saved: task_type changed to {task_type}")
+    
+    def apply_native_missing_values(self, experiment: Experiment):
+        """
+        Omet l'imputation numérique si l'algorithme gère les valeurs manquantes et que la
+        stratégie demandée est une imputation simple (une valeur explicite dans la config prime).
+        """
+        wrapper_class = ALGORITHM_WRAPPERS.get(experiment.algorithm)
+        config = experiment.preprocessing_config
+        if wrapper_class is None or not wrapper_class.handles_missing_values or 'native_missing_values' in config:
+            return
+        strategy = config.get('missing_values', {}).get('strategy', 'mean')
+        if strategy in ('mean', 'median', 'mode', 'most_frequent'):
+            logger.info(f"{experiment.algorithm} gère les valeurs manquantes : imputation numérique omise")
+            config['native_missing_values'] = True
+            from sqlalchemy.orm.attributes import flag_modified
+            flag_modified(experiment, 'preprocessing_config')
+            self.db.commit()
+    
+    def resolve_training_mode(self, experiment: Experiment) -> Tuple[str, Optional[int]]:
+        """
+        Choisit le mode d'entraînement selon la taille estimée du dataset et le budget mémoire.
+        
+        Returns:
+            (mode, sample_rows) ; sample_rows n'est renseigné qu'en mode subsample
+        """
+        config = experiment.preprocessing_config
+        requested = config.get('training_mode', 'auto')
+        estimate = None
+        if requested in ('auto', 'subsample'):
+            columns, exclude_columns = _training_columns(config)
+            try:
+                estimate = estimate_dataset_size(str(experiment.dataset_id), columns, exclude_columns)
+            except Exception as e:
+                logger.warning(f"Could not estimate dataset size: {str(e)}")
+        
+        mode = choose_training_mode(experiment.algorithm, estimate, settings.TRAINING_MEMORY_BUDGET_BYTES,
+                                    requested, needs_in_memory=bool(experiment.search_config))
+        sample_rows = None
+        if mode == 'subsample':
+            sample_rows = subsample_rows(estimate, settings.TRAINING_MEMORY_BUDGET_BYTES, config.get('max_training_rows'))
+        logger.info(f"Training mode: {mode}" + (f" ({sample_rows} rows)" if sample_rows else ""))
+        return mode, sample_rows
+    
+    def train_incremental(self, experiment: Experiment):
+        """
+        Entraînement par lots (modèles à partial_fit), sans charger le dataset en mémoire.
+        
+        Returns:
+            (model, preprocessing_pipeline, X_test, y_test, label_classes)
+        """
+        config = experiment.preprocessing_config
+        columns, exclude_columns = _training_columns(config)
+        estimate = estimate_dataset_size(str(experiment.dataset_id), columns, exclude_columns)
+        if estimate is None:
+            raise ValueError("Incremental training requires a Parquet dataset")
+        self.report_progress(experiment, 30, 'data_loaded', f"Entraînement incrémental sur {estimate['rows']} lignes")
+        
+        def on_batch(fraction: float):
+            progress = 30 + int(40 * fraction)
+            if progress > experiment.progress:
+                self.report_progress(experiment, progress, 'training', f"{int(fraction * 100)}% des lignes traitées")
+        
+        return train_incremental(
+            str(experiment.dataset_id), experiment.algorithm,
+            config.get('task_type', 'classification'),
+            experiment.hyperparameters, config,
+            columns=columns, exclude_columns=exclude_columns,
+            total_rows=estimate['rows'], progress_callback=on_batch
+        )
+    
+    def load_and_preprocess(self, experiment: Experiment, sample_rows: Optional[int] = None):
+        """
+        Charge le dataset (ou un échantillon de sample_rows lignes), valide la cible puis applique le preprocessing.
+        
+        Returns:
+            (X_train, X_test, y_train, y_test, preprocessing_pipeline, label_classes, synthetic)
+            synthetic indique que les données de fallback ont remplacé le dataset
+        """
+        # Chargement projeté : seules la cible et les colonnes utiles sont lues
         logger.info(f"Loading dataset {experiment.dataset_id}")
+        columns, exclude_columns = _training_columns(experiment.preprocessing_config)
         
+        synthetic = False
         try:
-            # Try to get dataset info from service-selection first
-            import requests
-            service_selection_url = os.environ.get("SERVICE_SELECTION_URL", "http://service-selection-service.ibis-x.svc.cluster.local")
-            response = requests.get(f"{service_selection_url}/datasets/{experiment.dataset_id}", timeout=10)
-            
-            if response.status_code == 200:
-                dataset_info = response.json()
-                storage_path = dataset_info.get('storage_path', f'ibis-x-datasets/{experiment.dataset_id}')
-                
-                # Find main data file
-                files = dataset_info.get('files', [])
-                main_file = None
-                
-                for file_info in files:
-                    if file_info.get('format') == 'parquet' and file_info.get('logical_role') in ['data_file', 'training_data', None]:
-                        main_file = file_info
-                        break
-                
-                if not main_file and files:
-                    main_file = files[0]
-                
-                if main_file:
-                    object_path = f"{storage_path.rstrip('/')}/{main_file['file_name_in_storage']}"
-                    logger.info(f"Loading dataset from: {object_path}")
-                    
-                    # Download file data
-                    file_data = storage_client.download_file(object_path)
-                    data_buffer = io.BytesIO(file_data)
-                    df = pd.read_parquet(data_buffer)
-                else:
-                    raise Exception("No suitable data file found")
+            if sample_rows is not None:
+                # Échantillon stratifié sur la cible : la distribution des classes est conservée
+                config = experiment.preprocessing_config
+                stratify = config.get('target_column') if config.get('task_type', 'classification') == 'classification' else None
+                df = sample_dataset(str(experiment.dataset_id), sample_rows, target_column=stratify,
+                                    columns=columns, random_state=config.get('random_state', 42))
+                df = df.drop(columns=[c for c in exclude_columns or [] if c in df.columns])
             else:
-                # Fallback to old path structure
-                logger.warning(f"Could not get dataset info from service-selection, trying fallback path")
-                dataset_path = f"ibis-x-datasets/{experiment.dataset_id}/data.parquet"
-                file_data = storage_client.download_file(dataset_path)
-                data_buffer = io.BytesIO(file_data)
-                df = pd.read_parquet(data_buffer)
-                
+                df = load_dataset(str(experiment.dataset_id), columns=columns, exclude_columns=exclude_columns)
         except Exception as e:
-            logger.error(f"Error loading dataset: {str(e)}")
-            # Fallback intelligent - essayer le chemin direct avec storage_path
-            try:
-                logger.info(f"Trying direct path with storage_path: {experiment.dataset_id}")
-                dataset_path = f"ibis-x-datasets/{experiment.dataset_id}"
-                
-                # Essayer de lister les fichiers dans le répertoire
-                storage_client = get_storage_client()
-                
-                # Essayer différents noms de fichiers possibles
-                possible_files = [
-                    f"{dataset_path}/data.parquet",
-                    f"{dataset_path}/dataset.parquet", 
-                    f"{dataset_path}/train.parquet"
-                ]
-                
-                # Essayer de télécharger un fichier qui existe
-                file_data = None
-                successful_path = None
-                
-                for file_path in possible_files:
-                    try:
-                        logger.info(f"Trying to download: {file_path}")
-                        file_data = storage_client.download_file(file_path)
-                        successful_path = file_path
-                        break
-                    except Exception as inner_e:
-                        logger.warning(f"Failed to download {file_path}: {str(inner_e)}")
-                        continue
-                
-                if file_data:
-                    logger.info(f"Successfully loaded dataset from: {successful_path}")
-                    data_buffer = io.BytesIO(file_data)
-                    df = pd.read_parquet(data_buffer)
-                else:
-                    raise Exception("No dataset file found in any expected location")
-                    
-            except Exception as fallback_error:
-                logger.warning(f"All dataset loading methods failed: {str(fallback_error)}")
-                logger.info("Using synthetic fallback data for demonstration")
-                # Utiliser les données de fallback
-                df = _generate_fallback_data(5000)
+            logger.warning(f"All dataset loading methods failed: {str(e)}")
+            logger.info("Using synthetic fallback data for demonstration")
+            # Utiliser les données de fallback
+            df = _generate_fallback_data(5000)
+            synthetic = True
         
         logger.info(f"Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
         
-        # Update progress avec délai UX pour permettre à l'utilisateur de voir l'étape
-        experiment.progress = 30
-        self.db.commit()
-        self.update_state(state='PROGRESS', meta={'current': 30, 'total': 100})
-        time.sleep(1.5)  # Délai UX pour voir l'étape "Chargement des données"
+        self.report_progress(experiment, 30, 'data_loaded', f"{df.shape[0]} lignes, {df.shape[1]} colonnes")
         
         # Validation des données avant preprocessing
         target_column = experiment.preprocessing_config.get('target_column')
@@ -233,32 +225,57 @@ def train_model(self, experiment_id: str):
             if min_class_count < 2:
                 logger.warning(f"Classe '{unique_classes[np.argmin(class_counts)]}' n'a que {min_class_count} exemple(s)")
                 logger.warning("Auto-correction: passage en mode régression")
-                
-                # Modifier la configuration pour éviter l'erreur ET sauvegarder en BDD
-                experiment.preprocessing_config['task_type'] = 'regression'
-                experiment.preprocessing_config['original_task_type'] = task_type
-                task_type = 'regression'
-                
-                # Marquer explicitement la colonne JSONB comme modifiée pour SQLAlchemy
-                from sqlalchemy.orm.attributes import flag_modified
-                flag_modified(experiment, 'preprocessing_config')
-                
-                # CRUCIAL : Sauvegarder la modification en base de données
-                self.db.commit()
-                logger.info(f"Configuration updated and saved: task_type changed to regression")
+                self.apply_task_type(experiment, 'regression')
         
         # Preprocess data
         logger.info("Preprocessing data")
-        X_train, X_test, y_train, y_test, preprocessing_pipeline = preprocess_data(
-            df, 
-            experiment.preprocessing_config
-        )
-        
-        # Update progress avec délai UX
-        experiment.progress = 50
-        self.db.commit()
-        self.update_state(state='PROGRESS', meta={'current': 50, 'total': 100})
-        time.sleep(2.0)  # Délai UX pour voir l'étape "Préprocessing"
+        return (*preprocess_data(df, experiment.preprocessing_config), synthetic)
+    
+    def train_in_memory(self, experiment: Experiment, sample_rows: Optional[int] = None):
+        """
+        Entraînement sur les données en mémoire (complètes, ou sous-échantillon de sample_rows lignes).
+        
+        Returns:
+            (model, X_test, y_test, preprocessing_pipeline, label_classes, hyperparameters, search_results)
+        """
+        self.apply_native_missing_values(experiment)
+        
+        # Données prétraitées en cache si une expérience identique (dataset, preprocessing, split) a déjà tourné
+        preprocessing_cache = get_preprocessing_cache()
+        cache_key = None
+        cached = None
+        if preprocessing_cache is not None:
+            try:
+                cache_config = experiment.preprocessing_config
+                if sample_rows is not None:
+                    cache_config = {**cache_config, 'training_rows': sample_rows}
+                cache_key = preprocessing_cache_key(str(experiment.dataset_id), cache_config)
+                cached = preprocessing_cache.get(cache_key)
+            except Exception as e:
+                logger.warning(f"Preprocessing cache unavailable: {str(e)}")
+        
+        if cached is not None:
+            X_train, X_test = cached['X_train'], cached['X_test']
+            y_train, y_test = cached['y_train'], cached['y_test']
+            preprocessing_pipeline = cached['preprocessing_pipeline']
+            label_classes = cached.get('label_classes')
+            self.apply_task_type(experiment, cached['task_type'])
+            self.report_progress(experiment, 30, 'data_loaded', "Données prétraitées servies depuis le cache")
+        else:
+            X_train, X_test, y_train, y_test, preprocessing_pipeline, label_classes, synthetic = \
+                self.load_and_preprocess(experiment, sample_rows)
+            if cache_key is not None and not synthetic:
+                preprocessing_cache.put(cache_key, {
+                    'X_train': X_train,
+                    'X_test': X_test,
+                    'y_train': y_train,
+                    'y_test': y_test,
+                    'preprocessing_pipeline': preprocessing_pipeline,
+                    'label_classes': label_classes,
+                    'task_type': experiment.preprocessing_config.get('task_type', 'classification')
+                })
+        
+        self.report_progress(experiment, 50, 'preprocessed', "Préprocessing terminé")
         
         # Initialize model based on algorithm avec task_type corrigé
         # IMPORTANT : Utiliser la variable locale mise à jour, pas la BDD
@@ -271,14 +288,39 @@ def train_model(self, experiment_id: str):
         else:
             logger.info(f"📋 Task type normal: {corrected_task_type}")
         
+        hyperparameters = dict(experiment.hyperparameters)
+        search_results = None
+        if experiment.search_config:
+            # Recherche d'hyperparamètres en validation croisée sur le jeu d'entraînement
+            def on_trials_done(done: int, total: int):
+                self.report_progress(experiment, 50 + int(20 * done / total), 'search',
+                                     f"{done}/{total} essais évalués")
+            
+            search_results = run_search(
+                experiment.algorithm, corrected_task_type, X_train, y_train,
+                experiment.search_config,
+                base_params=hyperparameters,
+                n_jobs=cpu_budget.n_jobs(settings.HYPERPARAMETER_SEARCH_N_JOBS),
+                max_trials=settings.HYPERPARAMETER_SEARCH_MAX_TRIALS,
+                random_state=experiment.preprocessing_config.get('random_state', 42),
+                progress_callback=on_trials_done
+            )
+            hyperparameters.update(search_results['best_params'])
+            logger.info(f"🔍 Best hyperparameters: {search_results['best_params']} "
+                        f"({search_results['scoring']}={search_results['best_score']:.4f})")
+        
         logger.info(f"🔧 Training {experiment.algorithm} model with FINAL task_type: {corrected_task_type}")
         
+        # n_jobs borné au budget CPU de la tâche (ignoré par les modèles mono-cœur)
+        model_params = {**hyperparameters, 'n_jobs': cpu_budget.cores}
         if experiment.algorithm == 'decision_tree':
             logger.info(f"🌳 Creating DecisionTreeWrapper(task_type={corrected_task_type})")
-            model = DecisionTreeWrapper(task_type=corrected_task_type, **experiment.hyperparameters)
+            model = DecisionTreeWrapper(task_type=corrected_task_type, **model_params)
         elif experiment.algorithm == 'random_forest':
             logger.info(f"🌲 Creating RandomForestWrapper(task_type={corrected_task_type})")
-            model = RandomForestWrapper(task_type=corrected_task_type, **experiment.hyperparameters)
+            model = RandomForestWrapper(task_type=corrected_task_type, **model_params)
+        elif experiment.algorithm in ALGORITHM_WRAPPERS:
+            model = ALGORITHM_WRAPPERS[experiment.algorithm](task_type=corrected_task_type, **model_params)
         else:
             raise ValueError(f"Unknown algorithm: {experiment.algorithm}")
         
@@ -289,31 +331,123 @@ def train_model(self, experiment_id: str):
         # Train model
         model.fit(X_train, y_train)
         
-        # Update progress avec délai UX  
-        experiment.progress = 70
-        self.db.commit()
-        self.update_state(state='PROGRESS', meta={'current': 70, 'total': 100})
-        time.sleep(1.5)  # Délai UX pour voir l'étape "Entraînement"
+        return model, X_test, y_test, preprocessing_pipeline, label_classes, hyperparameters, search_results
+
+
+class ScheduledTrainingTask(MLTrainingTask):
+    """Entraînement envoyé par l'ordonnanceur : son créneau est libéré à la fin de la tâche."""
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        # Une tentative relancée (autoretry) garde son créneau
+        if status == 'RETRY' or not args:
+            return
+        try:
+            experiment_scheduler.release(args[0])
+        except Exception as e:
+            logger.warning(f"Créneau de l'expérience {args[0]} non libéré: {str(e)}")
+
+
+@celery_app.task(bind=True, base=ScheduledTrainingTask, name='train_model', 
+                 soft_time_limit=7200, time_limit=7500,
+                 autoretry_for=(ConnectionError, TimeoutError),
+                 retry_kwargs={'max_retries': 3, 'countdown': 60},
+                 retry_backoff=True)
+def train_model(self, experiment_id: str):
+    """
+    Train a machine learning model based on experiment configuration
+    
+    Args:
+        experiment_id: UUID of the experiment
+        
+    Returns:
+        dict: Training results
+    """
+    logger.info(f"[CELERY WORKER] Starting training for experiment {experiment_id}")
+    logger.info(f"[CELERY WORKER] Task ID: {self.request.id}")
+    
+    thread_limits = None
+    try:
+        # Validation d'entrée stricte
+        if not experiment_id or experiment_id == "":
+            raise ValueError("experiment_id ne peut pas être vide")
+        
+        # Get experiment from database avec retry
+        experiment = None
+        for attempt in range(3):
+            try:
+                experiment = self.db.query(Experiment).filter(Experiment.id == experiment_id).first()
+                break
+            except Exception as db_error:
+                logger.warning(f"Tentative {attempt + 1}/3 de connexion BDD échouée: {str(db_error)}")
+                if attempt == 2:
+                    raise
+                time.sleep(2)
+        
+        if not experiment:
+            raise ValueError(f"Experiment {experiment_id} not found")
+        
+        # Validation de l'état de l'expérience
+        if experiment.status not in ['pending', 'failed']:
+            raise ValueError(f"Experiment {experiment_id} is in invalid state: {experiment.status}")
+        
+        # Validation des paramètres requis
+        if not experiment.algorithm:
+            raise ValueError("Algorithm must be specified")
+        if not experiment.dataset_id:
+            raise ValueError("Dataset ID must be specified")
+        if not experiment.hyperparameters:
+            raise ValueError("Hyperparameters must be specified")
+        if not experiment.preprocessing_config:
+            raise ValueError("Preprocessing config must be specified")
+        
+        # Update status to running
+        experiment.status = 'running'
+        self.report_progress(experiment, 10, 'loading_data', "Chargement des données")
+        
+        # Initialize storage client
+        storage_client = get_storage_client()
+        
+        # Part des cœurs du nœud allouée à cet entraînement : n_jobs des modèles et threads BLAS / OpenMP.
+        # La limite est levée en fin de tâche : les processus light sont réutilisés par les tâches suivantes
+        cpu_allocation = cpu_budget.allocation()
+        thread_limits = cpu_budget.apply()
+        logger.info(f"CPU budget: {cpu_allocation}")
+        if self.request.id:
+            self.update_state(state='STARTED', meta={'experiment_id': experiment_id, 'cpu_allocation': cpu_allocation})
+        
+        # Mode d'entraînement : en mémoire, sous-échantillon borné ou incrémental (partial_fit)
+        training_mode, sample_rows = self.resolve_training_mode(experiment)
+        
+        if training_mode == 'incremental':
+            model, preprocessing_pipeline, X_test, y_test, label_classes = self.train_incremental(experiment)
+            hyperparameters = dict(experiment.hyperparameters)
+            search_results = None
+        else:
+            model, X_test, y_test, preprocessing_pipeline, label_classes, hyperparameters, search_results = \
+                self.train_in_memory(experiment, sample_rows)
+        
+        self.report_progress(experiment, 70, 'trained', "Entraînement terminé")
         
         # Evaluate model avec task_type corrigé (recharger pour avoir la dernière version)
         self.db.refresh(experiment)
         final_task_type = experiment.preprocessing_config.get('task_type', 'classification')
         logger.info(f"Evaluating model with task_type: {final_task_type}")
-        metrics = evaluate_model(model, X_test, y_test, task_type=final_task_type)
+        # Une seule passe d'inférence : prédictions, probabilités et matrice de confusion partagées
+        # par les métriques, les visualisations et l'importance des features
+        evaluation = EvaluationContext(model, X_test, y_test, task_type=final_task_type)
+        metrics = evaluate_model(model, X_test, y_test, task_type=final_task_type, context=evaluation)
         
-        # Generate visualizations avec task_type corrigé
+        # Generate visualizations avec task_type corrigé (figures rendues en parallèle)
         logger.info(f"Generating visualizations for task_type: {final_task_type}")
         visualizations = generate_visualizations(
             model, X_test, y_test, 
             feature_names=preprocessing_pipeline.get_feature_names_out() if hasattr(preprocessing_pipeline, 'get_feature_names_out') else None,
-            task_type=final_task_type
+            task_type=final_task_type,
+            context=evaluation,
+            n_jobs=cpu_budget.cores
         )
         
-        # Update progress avec délai UX
-        experiment.progress = 90
-        self.db.commit()
-        self.update_state(state='PROGRESS', meta={'current': 90, 'total': 100})
-        time.sleep(1.0)  # Délai UX pour voir l'étape "Évaluation"
+        self.report_progress(experiment, 90, 'evaluated', "Évaluation terminée")
         
         # Save model and artifacts avec versioning
         logger.info("Saving model artifacts with versioning")
@@ -321,52 +455,56 @@ def train_model(self, experiment_id: str):
         model_filename = f"model_{experiment.id}_v{model_version}.joblib"
         model_path = f"ibis-x-models/{experiment.project_id}/{experiment.id}/v{model_version}/{model_filename}"
         
-        # Save model to buffer
-        model_buffer = io.BytesIO()
-        joblib.dump({
+        # Artefact compressé (MODEL_ARTIFACT_COMPRESSION) + manifeste JSON lu par les listes de versions
+        feature_names = preprocessing_pipeline.get_feature_names_out() if hasattr(preprocessing_pipeline, 'get_feature_names_out') else None
+        training_config = {
+            'algorithm': experiment.algorithm,
+            'hyperparameters': hyperparameters,
+            'training_mode': training_mode,
+            'training_rows': sample_rows,
+            'cpu_allocation': cpu_allocation,
+            # Valeurs d'origine de la cible encodée : les prédictions sont décodées au serving
+            'label_classes': label_classes,
+            'preprocessing_config': experiment.preprocessing_config
+        }
+        model_bytes, artifact_format = dump_model_artifact({
             'model': model,
             'preprocessing_pipeline': preprocessing_pipeline,
-            'feature_names': preprocessing_pipeline.get_feature_names_out() if hasattr(preprocessing_pipeline, 'get_feature_names_out') else None,
-            'training_config': {
-                'algorithm': experiment.algorithm,
-                'hyperparameters': experiment.hyperparameters,
-                'preprocessing_config': experiment.preprocessing_config
-            }
-        }, model_buffer)
-        model_buffer.seek(0)
-        
-        # Upload model to storage avec validation
-        logger.info(f"📤 Uploading model to {model_path} - Buffer type: {type(model_buffer)}")
-        if not hasattr(model_buffer, 'seek'):
-            logger.error(f"❌ model_buffer is not BytesIO: {type(model_buffer)}")
-            raise ValueError(f"model_buffer must be BytesIO, got {type(model_buffer)}")
-        
-        storage_client.upload_file(model_buffer, model_path)
-        logger.info(f"✅ Model uploaded successfully to {model_path}")
-        
-        # Upload visualizations
-        viz_urls = {}
-        for viz_name, viz_data in visualizations.items():
-            if isinstance(viz_data, dict) and 'image' in viz_data:
-                # Decode base64 image
-                img_data = base64.b64decode(viz_data['image'])
-                img_buffer = io.BytesIO(img_data)
-                img_buffer.seek(0)
-                
-                viz_path = f"ibis-x-models/{experiment.project_id}/{experiment.id}/viz_{viz_name}.png"
-                storage_client.upload_file(img_buffer, viz_path)
-                viz_urls[viz_name] = viz_path
+            'feature_names': feature_names,
+            'training_config': training_config
+        })
+        manifest = build_manifest(
+            model_path, artifact_format, experiment,
+            metrics=convert_numpy_types(metrics),
+            feature_names=feature_names,
+            input_columns=getattr(preprocessing_pipeline, 'feature_names_in_', None),
+            training_config=convert_numpy_types(training_config),
+            version=model_version
+        )
+        logger.info(f"📤 Uploading model to {model_path} ({artifact_format['size_bytes']} bytes)")
+        
+        # Upload du modèle et des visualisations en parallèle (octets PNG envoyés tels quels)
+        viz_urls = {
+            viz_name: f"ibis-x-models/{experiment.project_id}/{experiment.id}/viz_{viz_name}.{viz_data['format']}"
+            for viz_name, viz_data in visualizations.items()
+        }
+        uploads = [(model_bytes, model_path), (serialize_manifest(manifest), manifest_path_for(model_path))] + [
+            (visualizations[viz_name]['data'], viz_path) for viz_name, viz_path in viz_urls.items()
+        ]
+        with ThreadPoolExecutor(max_workers=min(ARTIFACT_UPLOAD_WORKERS, len(uploads))) as executor:
+            # list() propage la première erreur d'upload
+            list(executor.map(lambda upload: storage_client.upload_file(*upload), uploads))
+        logger.info(f"✅ Model uploaded successfully to {model_path} ({len(viz_urls)} visualizations)")
         
         # Extract feature importance - AVEC CONVERSION NUMPY
         feature_importance = {}
-        if hasattr(model, 'get_feature_importance'):
-            importance_data = model.get_feature_importance()
-            if importance_data is not None and len(importance_data) > 0:
-                feature_names = importance_data.get('features', [])
-                importances = importance_data.get('importance', [])
-                # Convertir immédiatement les importances NumPy
-                safe_importances = convert_numpy_types(importances)
-                feature_importance = dict(zip(feature_names[:20], safe_importances[:20]))  # Top 20 features
+        importance_data = evaluation.feature_importance
+        if importance_data is not None and len(importance_data) > 0:
+            feature_names = importance_data.get('features', [])
+            importances = importance_data.get('importance', [])
+            # Convertir immédiatement les importances NumPy
+            safe_importances = convert_numpy_types(importances)
+            feature_importance = dict(zip(feature_names[:20], safe_importances[:20]))  # Top 20 features
 
         # Extract tree structure for Decision Tree and Random Forest - AVEC DEBUG
         logger.info("🔧 Starting tree structure extraction...")
@@ -375,8 +513,15 @@ def train_model(self, experiment_id: str):
         try:
             if hasattr(model, 'get_tree_structure'):
                 logger.info(f"📊 Extracting tree structure for {experiment.algorithm}")
-                tree_data = model.get_tree_structure()
+                caps = {'max_nodes': settings.TREE_VIZ_MAX_NODES}
+                if settings.TREE_VIZ_MAX_DEPTH is not None:
+                    caps['max_depth'] = settings.TREE_VIZ_MAX_DEPTH
+                tree_data = model.get_tree_structure(**caps)
                 if tree_data is not None:
+                    # Structure complète stockée à part : seule la vue plafonnée va dans experiment.visualizations
+                    tree_path = f"ibis-x-models/{experiment.project_id}/{experiment.id}/tree_structure.json.gz"
+                    storage_client.upload_file(serialize_tree_arrays(model.get_tree_arrays()), tree_path)
+                    tree_data['metadata']['full_structure_uri'] = tree_path
                     tree_structure = tree_data
                     logger.info(f"✅ Tree structure extracted successfully for {experiment.algorithm}")
                 else:
@@ -390,9 +535,6 @@ def train_model(self, experiment_id: str):
         
         logger.info("🔧 Tree structure extraction completed, updating experiment status...")
         
-        # Délai final pour voir la progression à 90% avant 100%
-        time.sleep(2.0)  # Délai UX pour voir l'étape "Sauvegarde" avant completion
-        
         logger.info("📝 Updating experiment with final results...")
         
         try:
@@ -412,8 +554,13 @@ def train_model(self, experiment_id: str):
             experiment.progress = 100
             experiment.metrics = safe_metrics
             experiment.artifact_uri = model_path
+            # Registre des versions : même transaction que le passage à 'completed'
+            register_model_version(self.db, experiment, model_version, model_path, manifest,
+                                   manifest_path=manifest_path_for(model_path))
             experiment.visualizations = safe_viz_urls
             experiment.feature_importance = safe_feature_importance
+            if search_results is not None:
+                experiment.search_results = convert_numpy_types(search_results)
             
             logger.info("💾 Basic experiment data updated, adding tree structure if available...")
             
@@ -432,6 +579,8 @@ def train_model(self, experiment_id: str):
             logger.info("💾 Committing experiment to database...")
             
             self.db.commit()
+            publish_experiment_event(experiment_id, status='completed', progress=100, stage='completed',
+                                     message="Entraînement terminé avec succès", algorithm=experiment.algorithm)
             
             logger.info(f"🎉 Training completed successfully for experiment {experiment_id}")
             
@@ -448,6 +597,7 @@ def train_model(self, experiment_id: str):
             'metrics': metrics,
             'model_uri': model_path,
             'visualizations': viz_urls,
+            'cpu_allocation': cpu_allocation,
             'training_duration': (datetime.now(timezone.utc) - experiment.created_at).total_seconds()
         }
         
@@ -462,6 +612,9 @@ def train_model(self, experiment_id: str):
                 experiment.error_message = f"Training failed: {str(e)}"
                 experiment.updated_at = datetime.now(timezone.utc)
                 self.db.commit()
+                publish_experiment_event(experiment_id, status='failed', progress=experiment.progress or 0,
+                                         stage='failed', message=experiment.error_message,
+                                         algorithm=experiment.algorithm)
                 logger.info(f"[AUDIT] Experiment {experiment_id} marked as failed")
         except Exception as db_error:
             logger.error(f"[CRITICAL] Could not update experiment status: {str(db_error)}")
@@ -478,12 +631,61 @@ def train_model(self, experiment_id: str):
         raise
     
     finally:
+        if thread_limits is not None:
+            thread_limits.restore_original_limits()
         # Clean up database session
         if self._db:
             self._db.close()
             self._db = None
 
 
+@celery_app.task(bind=True, base=MLTrainingTask, name='precompute_data_quality',
+                 soft_time_limit=1800, time_limit=1900)
+def precompute_data_quality_task(self, dataset_id: str, target_column: Optional[str] = None,
+                                 sample_size: Optional[int] = None, isolation_forest: bool = False,
+                                 force: bool = False):
+    """
+    Analyse de qualité d'un dataset mise en cache (data_quality_queue).
+    
+    Soumise par app.core.data_quality_jobs : demande interactive, ingestion ou rattrapage.
+    
+    Returns:
+        dict: {'cache_key', 'cached', 'quality_score'}
+    """
+    logger.info(f"[CELERY WORKER] Data quality analysis for dataset {dataset_id}")
+    try:
+        return precompute_analysis(self.db, dataset_id, target_column, sample_size or DEFAULT_SAMPLE_SIZE,
+                                   isolation_forest=isolation_forest, force=force)
+    finally:
+        if self._db:
+            self._db.close()
+            self._db = None
+
+
+def _training_columns(preprocessing_config: dict):
+    """
+    Colonnes à lire pour l'entraînement.
+
+    - feature_columns (optionnel) : liste explicite des variables, la cible est toujours ajoutée
+    - column_cleaning_configs : les colonnes marquées 'drop_column' ne sont pas lues
+    
+    Returns:
+        (columns, exclude_columns) pour load_dataset (None = pas de restriction)
+    """
+    target_column = preprocessing_config.get('target_column')
+    
+    columns = None
+    feature_columns = preprocessing_config.get('feature_columns')
+    if feature_columns:
+        columns = list(dict.fromkeys(list(feature_columns) + [target_column]))
+    
+    exclude_columns = [
+        config.get('name') for config in preprocessing_config.get('column_cleaning_configs') or []
+        if isinstance(config, dict) and config.get('strategy') == 'drop_column' and config.get('name') != target_column
+    ]
+    return columns, exclude_columns or None
+
+
 def _generate_fallback_data(n_samples: int = 5000) -> pd.DataFrame:
     """
     Génère un dataset synthétique de fallback pour les tests.
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# app (ml-pipeline-service) et common (racine du dépôt) importables sans installation
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.dirname(SERVICE_DIR))
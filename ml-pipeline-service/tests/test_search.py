@@ -0,0 +1,42 @@
+"""Recherche d'hyperparamètres sur la sortie creuse (CSR) du preprocessing."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+from app.ml.preprocessing import preprocess_data
+from app.ml.search import run_search
+
+
+@pytest.fixture
+def sparse_training_data():
+    rng = np.random.default_rng(0)
+    n = 400
+    df = pd.DataFrame({
+        'age': rng.normal(40, 10, n),
+        'income': rng.lognormal(10, 1, n),
+        'city': rng.choice([f'city_{i}' for i in range(30)], n),
+        'segment': rng.choice(['a', 'b', 'c', 'd'], n),
+        'target': rng.choice(['yes', 'no'], n)
+    })
+    config = {'target_column': 'target', 'task_type': 'classification', 'encoding': 'onehot'}
+    X_train, _, y_train, _, _, _ = preprocess_data(df, config)
+    return X_train, y_train
+
+
+@pytest.mark.parametrize('algorithm,param_space', [
+    ('hist_gradient_boosting', {'max_iter': [10, 20], 'learning_rate': [0.1, 0.3]}),
+    ('random_forest', {'n_estimators': [5, 10]}),
+])
+def test_search_on_sparse_preprocessed_input(sparse_training_data, algorithm, param_space):
+    X_train, y_train = sparse_training_data
+    assert sp.issparse(X_train)
+
+    results = run_search(algorithm, 'classification', X_train, y_train,
+                         {'strategy': 'grid', 'param_space': param_space, 'cv': 3},
+                         n_jobs=1)
+
+    assert results['n_failed'] == 0
+    assert set(results['best_params']) == set(param_space)
+    assert 0.0 <= results['best_score'] <= 1.0
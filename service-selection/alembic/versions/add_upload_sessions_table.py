@@ -0,0 +1,59 @@
+"""Add upload_sessions table for resumable dataset uploads
+
+Revision ID: e2f3g4h5i6j7
+Revises: d1e2f3g4h5i6
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f3g4h5i6j7'
+down_revision: Union[str, None] = 'd1e2f3g4h5i6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create upload_sessions table."""
+    
+    # === TABLE DES SESSIONS D'UPLOAD RÉSUMABLE ===
+    op.create_table('upload_sessions',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('dataset_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('original_filename', sa.String(255), nullable=False),
+        sa.Column('object_path', sa.String(500), nullable=False),
+        sa.Column('mime_type', sa.String(100), nullable=True),
+        sa.Column('total_size', sa.BigInteger(), nullable=False),
+        sa.Column('chunk_size', sa.BigInteger(), nullable=False),
+        sa.Column('total_chunks', sa.Integer(), nullable=False),
+        sa.Column('received_parts', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default='{}'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='initiated'),
+        sa.Column('dataset_metadata', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    
+    op.create_index('ix_upload_sessions_id', 'upload_sessions', ['id'], unique=False)
+    op.create_index('ix_upload_sessions_user_id', 'upload_sessions', ['user_id'], unique=False)
+    op.create_index('ix_upload_sessions_status', 'upload_sessions', ['status'], unique=False)
+    op.create_index('ix_upload_sessions_expires_at', 'upload_sessions', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop upload_sessions table."""
+    
+    op.drop_index('ix_upload_sessions_expires_at', table_name='upload_sessions')
+    op.drop_index('ix_upload_sessions_status', table_name='upload_sessions')
+    op.drop_index('ix_upload_sessions_user_id', table_name='upload_sessions')
+    op.drop_index('ix_upload_sessions_id', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
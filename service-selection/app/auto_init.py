@@ -80,6 +80,32 @@ def check_data_already_initialized() -> bool:
         logger.warning(f"Impossible de vérifier l'état des datasets: {e}")
         return False
 
+def request_data_quality_backfill() -> None:
+    """
+    Demande au ml-pipeline de précalculer l'analyse de qualité de tous les datasets.
+    
+    Les analyses passent après celles demandées par les utilisateurs ; un échec
+    n'interrompt pas l'initialisation.
+    """
+    try:
+        # Approche hybride pour gérer les imports en local et dans Docker
+        try:
+            from . import models, database
+            from .services.ingest_hooks import notify_datasets_backfill
+        except ImportError:
+            import models, database
+            from services.ingest_hooks import notify_datasets_backfill
+        
+        with database.SessionLocal() as db:
+            dataset_ids = [row.id for row in db.query(models.Dataset.id).filter(
+                models.Dataset.storage_path.isnot(None),
+                models.Dataset.storage_path != ''
+            ).all()]
+        
+        notify_datasets_backfill(dataset_ids)
+    except Exception as e:
+        logger.warning(f"Rattrapage des analyses de qualité non demandé: {e}")
+
 async def run_data_initialization():
     """
     Lance l'initialisation des vrais datasets en arrière-plan.
@@ -247,6 +273,9 @@ async def auto_init_startup():
         else:
             logger.warning("⚠️ Script d'import Kaggle non trouvé, utilisation des données échantillons")
         
+        # Étape 3: Précalcul (priorité basse) des analyses de qualité des datasets importés
+        request_data_quality_backfill()
+        
         logger.info("🎉 Auto-initialisation terminée avec succès !")
         
     except Exception as e:
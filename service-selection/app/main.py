@@ -1,4 +1,5 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Header, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, Query, Header, UploadFile, File, Form, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_, and_
 from typing import List, Optional, Dict
@@ -51,6 +52,16 @@ try:
 except ImportError:
     from services.missing_data_analysis import missing_data_analyzer
 
+# Import du service d'upload résumable
+try:
+    from . import errors
+    from .services.resumable_upload import resumable_upload_manager, convert_csv_object_to_parquet
+    from .services.ingest_hooks import notify_dataset_ingested
+except ImportError:
+    import errors
+    from services.resumable_upload import resumable_upload_manager, convert_csv_object_to_parquet
+    from services.ingest_hooks import notify_dataset_ingested
+
 # --- Configuration de l'application FastAPI ---
 
 app = FastAPI(
@@ -80,6 +91,10 @@ async def startup_event():
 
 # --- Fonctions utilitaires pour le stockage ---
 
+# Taille des row groups Parquet : des groupes bornés (avec statistiques min/max)
+# permettent au ml-pipeline de sauter ou d'échantillonner des blocs sans tout lire
+PARQUET_ROW_GROUP_SIZE = int(os.environ.get("PARQUET_ROW_GROUP_SIZE", "100000"))
+
 def convert_to_parquet(file_content: bytes, filename: str) -> bytes:
     """
     Convertit un fichier (CSV, Excel, JSON, XML) en format Parquet.
@@ -132,7 +147,7 @@ def convert_to_parquet(file_content: bytes, filename: str) -> bytes:
         
         # Convertir en Parquet
         parquet_buffer = io.BytesIO()
-        df.to_parquet(parquet_buffer, index=False, compression='snappy')
+        df.to_parquet(parquet_buffer, index=False, compression='snappy', row_group_size=PARQUET_ROW_GROUP_SIZE)
         parquet_buffer.seek(0)
         
         original_size = len(file_content) / 1024  # KB
@@ -778,6 +793,55 @@ def get_dataset(dataset_id: str, db: Session = Depends(database.get_db)):
     )
 
 
+@app.post("/datasets/manifests", response_model=schemas.DatasetManifestResponse)
+def get_dataset_manifests(request: schemas.DatasetManifestRequest, db: Session = Depends(database.get_db)):
+    """
+    Retourne en un seul appel l'emplacement de stockage et les fichiers de plusieurs datasets.
+
+    Utilisé par le ml-pipeline pour résoudre ses datasets sans un aller-retour par dataset
+    (deux requêtes SQL quel que soit le nombre d'identifiants).
+    """
+    valid_ids = {}
+    missing = []
+    for raw_id in dict.fromkeys(request.dataset_ids):
+        try:
+            valid_ids[uuid.UUID(raw_id)] = raw_id
+        except ValueError:
+            missing.append(raw_id)
+
+    datasets = []
+    files_by_dataset = {}
+    if valid_ids:
+        datasets = db.query(models.Dataset).filter(models.Dataset.id.in_(list(valid_ids))).all()
+        files = db.query(models.DatasetFile).filter(models.DatasetFile.dataset_id.in_(list(valid_ids))).all()
+        for file in files:
+            files_by_dataset.setdefault(file.dataset_id, []).append(schemas.DatasetManifestFile(
+                file_name_in_storage=file.file_name_in_storage,
+                format=file.format,
+                logical_role=file.logical_role,
+                size_bytes=file.size_bytes,
+                row_count=file.row_count
+            ))
+
+    found = {dataset.id for dataset in datasets}
+    missing.extend(raw_id for dataset_id, raw_id in valid_ids.items() if dataset_id not in found)
+
+    return schemas.DatasetManifestResponse(
+        manifests=[
+            schemas.DatasetManifest(
+                id=dataset.id,
+                storage_path=dataset.storage_path,
+                updated_at=dataset.updated_at,
+                instances_number=dataset.instances_number,
+                features_number=dataset.features_number,
+                files=files_by_dataset.get(dataset.id, [])
+            )
+            for dataset in datasets
+        ],
+        missing=missing
+    )
+
+
 @app.get("/datasets/{dataset_id}/details", response_model=schemas.DatasetDetailResponse)
 def get_dataset_details(dataset_id: str, db: Session = Depends(database.get_db)):
     """Récupère les détails complets d'un dataset avec métriques de qualité et métadonnées enrichies."""
@@ -1137,6 +1201,7 @@ def _calculate_quality_score(files_analysis: List[dict]) -> float:
 
 @app.post("/datasets", response_model=schemas.DatasetRead, status_code=201)
 def create_dataset(
+    background_tasks: BackgroundTasks,
     dataset_name: str = Form(...),
     display_name: str = Form(...),
     year: Optional[int] = Form(None),
@@ -1307,6 +1372,8 @@ def create_dataset(
             # Ne pas faire échouer la création du dataset pour cela
         
         logger.info(f"Dataset créé avec succès: {dataset_id} avec {len(files)} fichiers")
+        # Précalcul de l'analyse de qualité par le ml-pipeline, après l'envoi de la réponse
+        background_tasks.add_task(notify_dataset_ingested, dataset_id)
         return db_dataset
         
     except Exception as e:
@@ -1353,6 +1420,164 @@ def create_dataset(
                 cleanup_func=None
             )
 
+# --- Upload résumable par morceaux (gros datasets) ---
+
+def _get_upload_session_or_404(db: Session, upload_id: str, user_id: UUID4) -> models.UploadSession:
+    """Récupère une session d'upload de l'utilisateur ou lève une 404."""
+    session = resumable_upload_manager.get_session(db, upload_id, user_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} non trouvé")
+    return session
+
+
+def _ingest_assembled_upload(session: models.UploadSession, db: Session) -> models.Dataset:
+    """
+    Crée le dataset à partir d'un fichier assemblé par l'upload résumable.
+    
+    Applique les mêmes règles que upload_dataset_files : les CSV sont convertis
+    en Parquet (en flux, sans charger le fichier en mémoire), les autres formats
+    sont conservés tels quels.
+    """
+    existing = db.query(models.Dataset).filter(models.Dataset.id == session.dataset_id).first()
+    if existing:
+        # Ingestion déjà faite lors d'une tentative précédente
+        return existing
+    
+    storage_client = get_storage_client()
+    storage_path = f"{session.dataset_id}/"
+    file_name_in_storage = session.object_path.split('/')[-1]
+    final_format = file_name_in_storage.rsplit('.', 1)[-1]
+    mime_type = session.mime_type or 'application/octet-stream'
+    
+    if final_format == 'csv':
+        file_name_in_storage = f"{file_name_in_storage.rsplit('.', 1)[0]}.parquet"
+        convert_csv_object_to_parquet(session.object_path, f"{storage_path}{file_name_in_storage}",
+                                      PARQUET_ROW_GROUP_SIZE)
+        storage_client.delete_file(session.object_path)
+        final_format = 'parquet'
+        mime_type = 'application/octet-stream'
+        logger.info(f"Fichier converti: {session.original_filename} -> {file_name_in_storage}")
+    
+    metadata = schemas.DatasetCreate(**session.dataset_metadata)
+    db_dataset = models.Dataset(
+        id=session.dataset_id,
+        storage_path=storage_path,
+        **metadata.model_dump()
+    )
+    db.add(db_dataset)
+    db.commit()
+    db.refresh(db_dataset)
+    
+    db.add(models.DatasetFile(
+        dataset_id=db_dataset.id,
+        file_name_in_storage=file_name_in_storage,
+        original_filename=session.original_filename,
+        logical_role='data_file',
+        format=final_format,
+        mime_type=mime_type,
+        size_bytes=session.total_size
+    ))
+    db.commit()
+    
+    try:
+        _analyze_and_save_file_columns(db_dataset, db)
+    except Exception as e:
+        logger.warning(f"Erreur lors de l'analyse des colonnes pour {db_dataset.id}: {str(e)}")
+    
+    return db_dataset
+
+
+@app.post("/datasets/uploads", response_model=schemas.UploadSessionRead, status_code=201)
+def init_resumable_upload(
+    upload_request: schemas.UploadSessionCreate,
+    db: Session = Depends(database.get_db),
+    current_user_role: str = Depends(verify_upload_permissions),
+    current_user_id: UUID4 = Depends(get_current_user_id)
+):
+    """
+    Initialise un upload résumable.
+    
+    Retourne l'upload_id, la taille des morceaux et leur nombre. Le client envoie
+    ensuite chaque morceau via PUT /datasets/uploads/{upload_id}/parts/{n}.
+    """
+    try:
+        session = resumable_upload_manager.create_session(db, current_user_id, upload_request)
+    except errors.DatasetUploadError as e:
+        raise errors.handle_upload_error(e)
+    return resumable_upload_manager.to_schema(session)
+
+
+@app.get("/datasets/uploads/{upload_id}", response_model=schemas.UploadSessionRead)
+def get_resumable_upload(
+    upload_id: str,
+    db: Session = Depends(database.get_db),
+    current_user_id: UUID4 = Depends(get_current_user_id)
+):
+    """Retourne l'état d'un upload (morceaux reçus/manquants) pour le reprendre."""
+    session = _get_upload_session_or_404(db, upload_id, current_user_id)
+    return resumable_upload_manager.to_schema(session)
+
+
+@app.put("/datasets/uploads/{upload_id}/parts/{part_number}", response_model=schemas.UploadSessionRead)
+async def upload_resumable_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    db: Session = Depends(database.get_db),
+    current_user_id: UUID4 = Depends(get_current_user_id)
+):
+    """
+    Reçoit un morceau brut (application/octet-stream) et l'écrit dans le stockage.
+    
+    Renvoyer un morceau déjà reçu le remplace, ce qui permet de reprendre
+    sans risque après une coupure.
+    """
+    session = await run_in_threadpool(_get_upload_session_or_404, db, upload_id, current_user_id)
+    data = await request.body()
+    try:
+        session = await run_in_threadpool(resumable_upload_manager.store_part, db, session, part_number, data)
+    except errors.DatasetUploadError as e:
+        raise errors.handle_upload_error(e, dataset_id=str(session.dataset_id))
+    return resumable_upload_manager.to_schema(session)
+
+
+@app.post("/datasets/uploads/{upload_id}/complete", response_model=schemas.DatasetRead, status_code=201)
+def complete_resumable_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(database.get_db),
+    current_user_id: UUID4 = Depends(get_current_user_id)
+):
+    """
+    Finalise un upload : assemblage des morceaux côté stockage puis ingestion
+    du dataset (conversion Parquet, métadonnées des colonnes).
+    """
+    session = _get_upload_session_or_404(db, upload_id, current_user_id)
+    
+    try:
+        resumable_upload_manager.assemble(db, session)
+        db_dataset = _ingest_assembled_upload(session, db)
+        resumable_upload_manager.mark_completed(db, session)
+    except Exception as e:
+        db.rollback()
+        raise errors.handle_upload_error(e, dataset_id=str(session.dataset_id))
+    
+    logger.info(f"Dataset créé avec succès par upload résumable: {db_dataset.id}")
+    background_tasks.add_task(notify_dataset_ingested, str(db_dataset.id))
+    return db_dataset
+
+
+@app.delete("/datasets/uploads/{upload_id}", response_model=schemas.UploadSessionRead)
+def abort_resumable_upload(
+    upload_id: str,
+    db: Session = Depends(database.get_db),
+    current_user_id: UUID4 = Depends(get_current_user_id)
+):
+    """Abandonne un upload et supprime les morceaux déjà stockés."""
+    session = _get_upload_session_or_404(db, upload_id, current_user_id)
+    session = resumable_upload_manager.abort(db, session, reason="Annulé par l'utilisateur")
+    return resumable_upload_manager.to_schema(session)
+
 @app.put("/datasets/{dataset_id}", response_model=schemas.DatasetRead)
 def update_dataset(
     dataset_id: str,
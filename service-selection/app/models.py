@@ -244,4 +244,38 @@ class Project(Base):
     updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class UploadSession(Base):
+    """
+    Modèle SQLAlchemy pour les uploads de datasets résumables (par morceaux).
+    
+    Chaque session décrit un fichier envoyé en parties numérotées directement
+    vers le stockage d'objets. L'état d'assemblage (parties reçues) est conservé
+    ici pour permettre la reprise après une coupure réseau.
+    
+    Cycle de vie du statut : 'initiated' -> 'uploading' -> 'assembled' -> 'completed' | 'aborted'
+    """
+    __tablename__ = "upload_sessions"
 
+    # === IDENTIFICATION ===
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    dataset_id = Column(UUID(as_uuid=True), nullable=False)  # Réservé dès l'init, créé au finalize
+    
+    # === FICHIER ===
+    original_filename = Column(String(255), nullable=False)
+    object_path = Column(String(500), nullable=False)  # Objet final dans le stockage
+    mime_type = Column(String(100), nullable=True)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(BigInteger, nullable=False)
+    total_chunks = Column(Integer, nullable=False)
+    
+    # === ÉTAT D'ASSEMBLAGE ===
+    received_parts = Column(JSONB, nullable=False, default=dict)  # {"1": taille_en_bytes, ...}
+    status = Column(String(20), nullable=False, default='initiated', index=True)
+    dataset_metadata = Column(JSONB, nullable=False)  # Métadonnées DatasetCreate à appliquer au finalize
+    error_message = Column(Text, nullable=True)
+    
+    # === TIMESTAMPS ===
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -423,3 +423,62 @@ class DatasetSimilarResponse(BaseModel):
 
 
  
+
+
+# === SCHÉMAS POUR L'UPLOAD RÉSUMABLE ===
+
+class UploadSessionCreate(BaseModel):
+    """Schéma pour initialiser un upload résumable par morceaux"""
+    filename: str = Field(..., description="Nom original du fichier (ex: students.csv)")
+    total_size: int = Field(..., gt=0, description="Taille totale du fichier en bytes")
+    chunk_size: Optional[int] = Field(None, gt=0, description="Taille souhaitée des morceaux en bytes")
+    mime_type: Optional[str] = Field(None, description="Type MIME du fichier")
+    metadata: DatasetCreate = Field(..., description="Métadonnées du dataset créé au finalize")
+
+
+class UploadSessionRead(BaseModel):
+    """Schéma d'état d'un upload résumable (utilisé pour reprendre un upload interrompu)"""
+    upload_id: UUID4
+    dataset_id: UUID4
+    status: str = Field(..., description="initiated, uploading, assembled, completed ou aborted")
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_parts: List[int] = Field(default_factory=list, description="Numéros des morceaux déjà reçus")
+    missing_parts: List[int] = Field(default_factory=list, description="Numéros des morceaux encore attendus")
+    bytes_received: int = 0
+    error_message: Optional[str] = None
+    expires_at: datetime
+
+
+# === SCHÉMAS POUR LES MANIFESTES DE FICHIERS (ml-pipeline) ===
+
+class DatasetManifestRequest(BaseModel):
+    """Schéma de requête pour récupérer les manifestes de plusieurs datasets en un appel"""
+    dataset_ids: List[str] = Field(..., min_length=1, max_length=500, description="Identifiants des datasets")
+
+
+class DatasetManifestFile(BaseModel):
+    """Fichier d'un dataset tel que vu par le ml-pipeline"""
+    file_name_in_storage: str
+    format: Optional[str] = None
+    logical_role: Optional[str] = None
+    size_bytes: Optional[int] = None
+    row_count: Optional[int] = None
+
+
+class DatasetManifest(BaseModel):
+    """Manifeste minimal d'un dataset : emplacement de stockage et fichiers"""
+    id: UUID4
+    storage_path: Optional[str] = None
+    updated_at: datetime
+    instances_number: Optional[int] = None
+    features_number: Optional[int] = None
+    files: List[DatasetManifestFile] = Field(default_factory=list)
+
+
+class DatasetManifestResponse(BaseModel):
+    """Manifestes trouvés et identifiants inconnus"""
+    manifests: List[DatasetManifest] = Field(default_factory=list)
+    missing: List[str] = Field(default_factory=list, description="Identifiants sans dataset correspondant")
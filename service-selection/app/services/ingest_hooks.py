@@ -0,0 +1,71 @@
+"""
+Notifications envoyées aux autres services après l'ingestion d'un dataset.
+
+Le ml-pipeline précalcule l'analyse de qualité des données du nouveau dataset
+(POST /data-quality/precompute, exécuté par un worker Celery) : la première
+ouverture par un utilisateur est servie depuis son cache. Les appels sont faits
+en tâche de fond et ne font jamais échouer l'ingestion.
+
+Après un import en masse (auto-initialisation), notify_datasets_backfill
+soumet les analyses par lots, en priorité basse côté ml-pipeline.
+
+Ces endpoints du ml-pipeline sont réservés aux services : chaque appel porte
+le jeton partagé INTERNAL_SERVICE_TOKEN (en-tête X-Internal-Token).
+"""
+
+import os
+import json
+import logging
+import urllib.request
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+ML_PIPELINE_URL = os.getenv("ML_PIPELINE_URL", "http://ml-pipeline:8082")
+NOTIFY_TIMEOUT_SECONDS = 5
+# Taille maximale d'une requête de rattrapage acceptée par le ml-pipeline
+BACKFILL_BATCH_SIZE = 500
+
+
+def _precompute_enabled() -> bool:
+    return os.getenv("DATA_QUALITY_PRECOMPUTE", "true").lower() in ("true", "1", "yes", "on")
+
+
+def _post_ml_pipeline(path: str, payload: dict) -> None:
+    headers = {"Content-Type": "application/json"}
+    token = os.getenv("INTERNAL_SERVICE_TOKEN")
+    if token:
+        headers["X-Internal-Token"] = token
+    request = urllib.request.Request(
+        f"{ML_PIPELINE_URL.rstrip('/')}{path}",
+        data=json.dumps(payload).encode(),
+        headers=headers,
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=NOTIFY_TIMEOUT_SECONDS):
+        pass
+
+
+def notify_dataset_ingested(dataset_id: str) -> None:
+    """Demande au ml-pipeline de précalculer l'analyse de qualité du dataset."""
+    if not _precompute_enabled():
+        return
+    try:
+        _post_ml_pipeline("/data-quality/precompute", {"dataset_id": str(dataset_id)})
+        logger.info(f"Précalcul de l'analyse de qualité demandé pour {dataset_id}")
+    except Exception as e:
+        logger.warning(f"Précalcul de l'analyse de qualité non demandé pour {dataset_id}: {str(e)}")
+
+
+def notify_datasets_backfill(dataset_ids: Iterable[str]) -> None:
+    """Demande au ml-pipeline le rattrapage des analyses de qualité de plusieurs datasets."""
+    dataset_ids = [str(dataset_id) for dataset_id in dataset_ids]
+    if not dataset_ids or not _precompute_enabled():
+        return
+    try:
+        for start in range(0, len(dataset_ids), BACKFILL_BATCH_SIZE):
+            _post_ml_pipeline("/data-quality/backfill",
+                              {"dataset_ids": dataset_ids[start:start + BACKFILL_BATCH_SIZE]})
+        logger.info(f"Rattrapage de l'analyse de qualité demandé pour {len(dataset_ids)} dataset(s)")
+    except Exception as e:
+        logger.warning(f"Rattrapage de l'analyse de qualité non demandé: {str(e)}")
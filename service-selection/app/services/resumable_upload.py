@@ -0,0 +1,378 @@
+"""
+Service d'upload résumable (par morceaux) pour les gros datasets.
+
+Protocole inspiré du multipart S3 :
+1. init     : création d'une session (état en base) et réservation du dataset_id
+2. parts    : PUT de morceaux numérotés, écrits directement dans le stockage d'objets
+3. complete : assemblage côté stockage puis ingestion du dataset
+
+Seul l'état d'assemblage transite par PostgreSQL ; les octets ne sont jamais
+bufferisés au-delà d'un morceau.
+"""
+
+import io
+import os
+import re
+import math
+import uuid
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+
+# Approche hybride pour gérer les imports en local et dans Docker
+try:
+    from .. import models
+    from .. import schemas
+    from .. import errors
+except ImportError:
+    import models
+    import schemas
+    import errors
+
+# Import du client de stockage commun
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from common.storage_client import get_storage_client, StorageClientError
+
+logger = logging.getLogger(__name__)
+
+# compose_object (MinIO/S3) impose au moins 5 MiB pour chaque partie sauf la dernière
+MIN_CHUNK_SIZE = 5 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+MAX_UPLOAD_SIZE = int(os.environ.get("RESUMABLE_UPLOAD_MAX_SIZE", str(20 * 1024 * 1024 * 1024)))  # 20 GiB
+SESSION_TTL_HOURS = int(os.environ.get("RESUMABLE_UPLOAD_TTL_HOURS", "24"))
+
+SUPPORTED_FORMATS = ['csv', 'xlsx', 'xls', 'json', 'xml', 'parquet']
+
+# Colonnes dont le type inféré sur le premier bloc est contredit plus loin : nouvelles lectures au plus
+MAX_CSV_TYPE_RETRIES = 20
+CSV_COLUMN_ERROR = re.compile(r"In CSV column #(\d+)")
+
+
+class StorageObjectReader(io.RawIOBase):
+    """Lecture séquentielle d'un objet du stockage par plages (download_range)."""
+
+    def __init__(self, object_path: str, block_size: int = DEFAULT_CHUNK_SIZE):
+        self.storage_client = get_storage_client()
+        self.object_path = object_path
+        self.block_size = block_size
+        self.size = self.storage_client.get_file_size(object_path)
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size:
+            return 0
+        length = min(len(buffer), self.block_size, self.size - self.position)
+        data = self.storage_client.download_range(self.object_path, self.position, length)
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def _write_csv_as_parquet(source_path: str, output, row_group_size: int, column_types: dict) -> int:
+    """Écrit le CSV dans output, un row group de row_group_size lignes à la fois."""
+    source = io.BufferedReader(StorageObjectReader(source_path), buffer_size=DEFAULT_CHUNK_SIZE)
+    reader = pacsv.open_csv(source, convert_options=pacsv.ConvertOptions(column_types=column_types))
+    writer = pq.ParquetWriter(output, reader.schema, compression='snappy')
+    pending, pending_rows, rows = [], 0, 0
+    try:
+        for batch in reader:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= row_group_size:
+                # Row groups pleins ; le reste attend les blocs suivants
+                table = pa.Table.from_batches(pending)
+                full = pending_rows - pending_rows % row_group_size
+                writer.write_table(table.slice(0, full), row_group_size=row_group_size)
+                rows += full
+                pending = table.slice(full).to_batches()
+                pending_rows -= full
+        if pending_rows:
+            writer.write_table(pa.Table.from_batches(pending, schema=reader.schema), row_group_size=row_group_size)
+            rows += pending_rows
+    finally:
+        writer.close()
+        source.close()
+    return rows
+
+
+def convert_csv_object_to_parquet(source_path: str, target_path: str, row_group_size: int) -> int:
+    """
+    Convertit un CSV du stockage en Parquet sans le charger en mémoire.
+
+    Le CSV est lu par plages et le Parquet écrit row group par row group dans un
+    fichier temporaire, puis envoyé au stockage. Les types sont inférés sur le
+    premier bloc : une colonne contredite plus loin est relue en float64 (entiers)
+    ou en texte.
+
+    Returns:
+        nombre de lignes converties
+
+    Raises:
+        ConversionError: si le CSV est vide ou illisible
+    """
+    column_types, schema = {}, None
+    with tempfile.TemporaryFile() as output:
+        for _ in range(MAX_CSV_TYPE_RETRIES + 1):
+            output.seek(0)
+            output.truncate()
+            try:
+                rows = _write_csv_as_parquet(source_path, output, row_group_size, column_types)
+                break
+            except pa.ArrowInvalid as e:
+                match = CSV_COLUMN_ERROR.search(str(e))
+                if not match:
+                    raise errors.ConversionError(f"CSV illisible: {str(e)}", error_code="CSV_CONVERSION_FAILED")
+                schema = schema or _csv_schema(source_path)
+                field = schema.field(int(match.group(1)))
+                current = column_types.get(field.name, field.type)
+                if current == pa.string():
+                    raise errors.ConversionError(f"CSV illisible: {str(e)}", error_code="CSV_CONVERSION_FAILED")
+                column_types[field.name] = pa.float64() if pa.types.is_integer(current) else pa.string()
+                logger.info(f"Colonne '{field.name}' relue en {column_types[field.name]}")
+        else:
+            raise errors.ConversionError("Types de colonnes CSV instables", error_code="CSV_CONVERSION_FAILED")
+
+        if rows == 0:
+            raise errors.ConversionError("Le fichier est vide ou ne contient pas de données valides",
+                                         error_code="EMPTY_FILE")
+        output.seek(0)
+        get_storage_client().upload_file(output, target_path)
+    return rows
+
+
+def _csv_schema(source_path: str) -> pa.Schema:
+    """Schéma inféré sur le premier bloc du CSV."""
+    with io.BufferedReader(StorageObjectReader(source_path), buffer_size=DEFAULT_CHUNK_SIZE) as source:
+        return pacsv.open_csv(source).schema
+
+
+class ResumableUploadManager:
+    """
+    Gère le cycle de vie des sessions d'upload résumable.
+    """
+
+    def create_session(self, db: Session, user_id: uuid.UUID, request: schemas.UploadSessionCreate) -> models.UploadSession:
+        """
+        Initialise une session d'upload et calcule le découpage en morceaux.
+
+        Raises:
+            FileValidationError: format, taille totale ou taille de morceau invalide
+        """
+        errors.validate_file_format(request.filename, SUPPORTED_FORMATS)
+        errors.validate_file_size(request.total_size, MAX_UPLOAD_SIZE, request.filename)
+
+        chunk_size = request.chunk_size or DEFAULT_CHUNK_SIZE
+        if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+            raise errors.FileValidationError(
+                f"Taille de morceau invalide: {chunk_size} bytes "
+                f"(attendu entre {MIN_CHUNK_SIZE} et {MAX_CHUNK_SIZE})",
+                error_code="INVALID_CHUNK_SIZE",
+                details={"chunk_size": chunk_size, "min": MIN_CHUNK_SIZE, "max": MAX_CHUNK_SIZE}
+            )
+
+        dataset_id = uuid.uuid4()
+        extension = request.filename.lower().split('.')[-1]
+        session = models.UploadSession(
+            user_id=user_id,
+            dataset_id=dataset_id,
+            original_filename=request.filename,
+            object_path=f"{dataset_id}/{uuid.uuid4()}.{extension}",
+            mime_type=request.mime_type,
+            total_size=request.total_size,
+            chunk_size=chunk_size,
+            total_chunks=math.ceil(request.total_size / chunk_size),
+            received_parts={},
+            status='initiated',
+            dataset_metadata=request.metadata.model_dump(mode='json'),
+            expires_at=datetime.utcnow() + timedelta(hours=SESSION_TTL_HOURS)
+        )
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+
+        logger.info(f"Upload résumable initialisé: {session.id} ({request.filename}, "
+                    f"{request.total_size} bytes, {session.total_chunks} morceaux)")
+        return session
+
+    def get_session(self, db: Session, upload_id: str, user_id: uuid.UUID) -> Optional[models.UploadSession]:
+        """Récupère une session appartenant à l'utilisateur (None si absente ou étrangère)."""
+        return db.query(models.UploadSession).filter(
+            models.UploadSession.id == upload_id,
+            models.UploadSession.user_id == user_id
+        ).first()
+
+    def store_part(self, db: Session, session: models.UploadSession, part_number: int, data: bytes) -> models.UploadSession:
+        """
+        Écrit un morceau dans le stockage et l'enregistre comme reçu.
+
+        Un morceau déjà reçu peut être renvoyé (idempotent) : il est simplement réécrit.
+        Les morceaux envoyés en parallèle sont enregistrés sous verrou de ligne
+        (SELECT ... FOR UPDATE) : aucun n'est perdu de received_parts.
+        """
+        self._ensure_open(session)
+        if session.status == 'assembled':
+            raise errors.FileValidationError(
+                f"L'upload {session.id} est déjà assemblé, plus aucun morceau n'est accepté",
+                error_code="UPLOAD_ASSEMBLED",
+                details={"status": session.status}
+            )
+
+        if not 1 <= part_number <= session.total_chunks:
+            raise errors.FileValidationError(
+                f"Numéro de morceau invalide: {part_number} (1..{session.total_chunks})",
+                error_code="INVALID_PART_NUMBER",
+                details={"part_number": part_number, "total_chunks": session.total_chunks}
+            )
+
+        expected_size = self._expected_part_size(session, part_number)
+        if len(data) != expected_size:
+            raise errors.FileValidationError(
+                f"Taille du morceau {part_number} incorrecte: {len(data)} bytes, attendu {expected_size}",
+                error_code="INVALID_PART_SIZE",
+                details={"part_number": part_number, "received": len(data), "expected": expected_size}
+            )
+
+        try:
+            get_storage_client().upload_part(session.object_path, part_number, data)
+        except StorageClientError as e:
+            raise errors.StorageError(str(e), error_code="PART_UPLOAD_FAILED")
+
+        # Relecture verrouillée : received_parts contient les morceaux commités entre-temps
+        db.refresh(session, with_for_update=True)
+        if session.status not in ('initiated', 'uploading'):
+            db.rollback()
+            raise errors.FileValidationError(
+                f"L'upload {session.id} n'accepte plus de morceaux (statut {session.status})",
+                error_code="UPLOAD_CLOSED",
+                details={"status": session.status}
+            )
+        session.received_parts[str(part_number)] = len(data)
+        flag_modified(session, 'received_parts')
+        session.status = 'uploading'
+        db.commit()
+        return session
+
+    def assemble(self, db: Session, session: models.UploadSession) -> models.UploadSession:
+        """
+        Assemble les morceaux dans l'objet final (côté stockage, sans téléchargement).
+
+        Idempotent : une session déjà assemblée (ingestion échouée puis relancée)
+        n'est pas réassemblée.
+
+        Raises:
+            FileValidationError: si des morceaux manquent
+        """
+        # Verrou de ligne : aucun morceau ne peut être enregistré pendant l'assemblage
+        db.refresh(session, with_for_update=True)
+        self._ensure_open(session)
+        if session.status == 'assembled':
+            db.commit()
+            return session
+
+        missing = self.missing_parts(session)
+        if missing:
+            raise errors.FileValidationError(
+                f"{len(missing)} morceau(x) manquant(s), l'upload ne peut pas être finalisé",
+                error_code="MISSING_PARTS",
+                details={"missing_parts": missing[:100]}
+            )
+
+        try:
+            get_storage_client().complete_parts(session.object_path, list(range(1, session.total_chunks + 1)))
+        except StorageClientError as e:
+            raise errors.StorageError(str(e), error_code="ASSEMBLY_FAILED")
+
+        session.status = 'assembled'
+        db.commit()
+        logger.info(f"Upload {session.id} assemblé dans {session.object_path}")
+        return session
+
+    def abort(self, db: Session, session: models.UploadSession, reason: Optional[str] = None) -> models.UploadSession:
+        """Abandonne une session et supprime les morceaux déjà stockés."""
+        if session.status in ('completed', 'aborted'):
+            return session
+
+        if session.status == 'assembled':
+            # Les morceaux ont déjà été fusionnés : supprimer l'objet final
+            get_storage_client().delete_file(session.object_path)
+            session.status = 'aborted'
+            session.error_message = reason
+            db.commit()
+            return session
+
+        try:
+            get_storage_client().abort_parts(session.object_path, [int(n) for n in session.received_parts.keys()])
+        except StorageClientError as e:
+            logger.warning(f"Nettoyage des morceaux impossible pour l'upload {session.id}: {str(e)}")
+
+        session.status = 'aborted'
+        session.error_message = reason
+        db.commit()
+        logger.info(f"Upload résumable abandonné: {session.id}")
+        return session
+
+    def mark_completed(self, db: Session, session: models.UploadSession) -> models.UploadSession:
+        """Marque la session comme terminée une fois le dataset ingéré."""
+        session.status = 'completed'
+        db.commit()
+        return session
+
+    def missing_parts(self, session: models.UploadSession) -> list:
+        """Liste des numéros de morceaux non encore reçus."""
+        received = session.received_parts or {}
+        return [n for n in range(1, session.total_chunks + 1) if str(n) not in received]
+
+    def to_schema(self, session: models.UploadSession) -> schemas.UploadSessionRead:
+        """Convertit une session en réponse API."""
+        received = session.received_parts or {}
+        return schemas.UploadSessionRead(
+            upload_id=session.id,
+            dataset_id=session.dataset_id,
+            status=session.status,
+            filename=session.original_filename,
+            total_size=session.total_size,
+            chunk_size=session.chunk_size,
+            total_chunks=session.total_chunks,
+            received_parts=sorted(int(n) for n in received.keys()),
+            missing_parts=self.missing_parts(session),
+            bytes_received=sum(received.values()),
+            error_message=session.error_message,
+            expires_at=session.expires_at
+        )
+
+    def _expected_part_size(self, session: models.UploadSession, part_number: int) -> int:
+        """Tous les morceaux font chunk_size, sauf le dernier qui contient le reste."""
+        if part_number < session.total_chunks:
+            return session.chunk_size
+        return session.total_size - session.chunk_size * (session.total_chunks - 1)
+
+    def _ensure_open(self, session: models.UploadSession) -> None:
+        """Vérifie qu'une session accepte encore des opérations."""
+        if session.status in ('completed', 'aborted'):
+            raise errors.FileValidationError(
+                f"L'upload {session.id} est déjà {session.status}",
+                error_code="UPLOAD_CLOSED",
+                details={"status": session.status}
+            )
+        if session.expires_at and session.expires_at.replace(tzinfo=None) < datetime.utcnow():
+            raise errors.FileValidationError(
+                f"L'upload {session.id} a expiré",
+                error_code="UPLOAD_EXPIRED",
+                details={"expires_at": session.expires_at.isoformat()}
+            )
+
+
+# Instance globale pour réutilisation
+resumable_upload_manager = ResumableUploadManager()